@@ -4,6 +4,7 @@ from sqlalchemy.orm import sessionmaker
 import urllib.parse
 
 from .utils.config_reader import config
+from .utils.query_log import instrument_engine
 
 username = config['database']['username']
 password = config['database']['password']
@@ -15,5 +16,6 @@ encoded_password = urllib.parse.quote_plus(password)
 DATABASE_URL = f"postgresql://{username}:{encoded_password}@{host}/{database_name}"
 
 engine = create_engine(DATABASE_URL)
+instrument_engine(engine)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
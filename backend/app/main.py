@@ -1,17 +1,23 @@
 """Function"""
+import asyncio
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from app.models.base import Base
 from app.database import engine
 from app.routers import auth,user,roles,projects,organizations,user_projects,Dynamic_db
 from app.utils.config_reader import config
-from app.routers import admin
+from app.routers import admin, monitoring, Dynamic_db_transfer, Dynamic_db_changes, Dynamic_db_stats, Dynamic_db_indexes, Dynamic_db_search, dashboard
 from app.utils.hashing import hash_password
+from app.utils.middleware import RequestContextMiddleware, CompressionMiddleware
+from app.utils.logger import LoggerSetup
+from app.utils.loop_monitor import loop_monitor
+from app.utils.responses import FastJSONResponse
+from app.utils.change_feed import change_feed_hub
 
 
 Base.metadata.create_all(bind=engine)
 
-app = FastAPI()
+app = FastAPI(default_response_class=FastJSONResponse)
 
 app.add_middleware(
     CORSMiddleware,
@@ -19,7 +25,10 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Request-ID", "ETag"],
 )
+app.add_middleware(CompressionMiddleware)
+app.add_middleware(RequestContextMiddleware)
 
 app.include_router(auth.router, prefix="/auth", tags=["Auth"])
 app.include_router(admin.router, tags=["Admin"])
@@ -29,6 +38,31 @@ app.include_router(projects.router, tags=["Projects"])
 app.include_router(organizations.router, tags=["Organizations"])
 app.include_router(user_projects.router,tags=["User Projects"])
 app.include_router(Dynamic_db.router,tags=["Dynamic_db"])
+app.include_router(Dynamic_db_transfer.router, tags=["Dynamic_db"])
+app.include_router(Dynamic_db_changes.router, tags=["Dynamic_db"])
+app.include_router(Dynamic_db_stats.router, tags=["Dynamic_db"])
+app.include_router(Dynamic_db_indexes.router, tags=["Dynamic_db"])
+app.include_router(Dynamic_db_search.router, tags=["Dynamic_db"])
+app.include_router(dashboard.router, tags=["Dashboard"])
+app.include_router(monitoring.router, tags=["Monitoring"])
+
+# Long-running maintenance tasks started with the app and cancelled on shutdown
+background_tasks = []
+
+@app.on_event("startup")
+async def start_background_tasks():
+    background_tasks.append(asyncio.create_task(LoggerSetup.retention_loop(config['logging']['log_dir'])))
+    background_tasks.append(asyncio.create_task(loop_monitor.run()))
+    background_tasks.append(asyncio.create_task(Dynamic_db.pool_warmup_loop()))
+
+@app.on_event("shutdown")
+async def stop_background_tasks():
+    for task in background_tasks:
+        task.cancel()
+    await asyncio.gather(*background_tasks, return_exceptions=True)
+    background_tasks.clear()
+    await change_feed_hub.close_all()
+
 # Debug: Print all registered routes
 # @app.on_event("startup")
 # async def startup_event():
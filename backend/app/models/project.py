@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, ForeignKey, DateTime
+from sqlalchemy import Column, Integer, String, Text, ForeignKey, DateTime, Boolean
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from app.models.base import Base
@@ -35,4 +35,25 @@ class Proj_db_detail(Base):
     host = Column(String, nullable=False,default="localhost")  
     port = Column(Integer, nullable=False, default=5432)  
 
-    project = relationship("Project")
\ No newline at end of file
+    project = relationship("Project")
+
+class Proj_db_settings(Base):
+    __tablename__ = "proj_db_settings"
+    id = Column(Integer, primary_key=True)
+    proj_db_id = Column(Integer, ForeignKey("proj_db_detail.id", ondelete="CASCADE"), unique=True, nullable=False)
+    statement_timeout_ms = Column(Integer, nullable=True)
+    max_rows = Column(Integer, nullable=True)
+    # Opt-in for pre-creating the connection pool at startup and on the warm-up interval
+    prewarm = Column(Boolean, nullable=False, default=False, server_default="false")
+
+    proj_db = relationship("Proj_db_detail")
+
+
+class Proj_db_usage(Base):
+    __tablename__ = "proj_db_usage"
+    id = Column(Integer, primary_key=True)
+    proj_db_id = Column(Integer, ForeignKey("proj_db_detail.id", ondelete="CASCADE"), unique=True, nullable=False)
+    last_used_at = Column(DateTime, nullable=False, index=True)
+    use_count = Column(Integer, nullable=False, default=0)
+
+    proj_db = relationship("Proj_db_detail")
@@ -0,0 +1,10 @@
+from sqlalchemy import Column, String, BigInteger
+from app.models.base import Base
+
+
+# Change counter per dashboard table, bumped in the same transaction as every ORM write;
+# used to build ETags without re-running the queries behind a response
+class TableVersion(Base):
+    __tablename__ = "table_versions"
+    table_name = Column(String, primary_key=True)
+    version = Column(BigInteger, nullable=False, default=0)
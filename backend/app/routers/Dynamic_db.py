@@ -1,4 +1,4 @@
-from fastapi import APIRouter,FastAPI, HTTPException, Depends
+from fastapi import APIRouter,FastAPI, HTTPException, Depends, Request
 from fastapi.responses import JSONResponse
 from pydantic import BaseModel, Field
 from typing import Optional, List, Dict, Any, Union
@@ -7,24 +7,84 @@ import asyncio
 from contextlib import asynccontextmanager
 import logging
 import json
-from app.schemas.Dynamic_db_schema import DatabaseConfig,DatabaseCredentials,DatabaseResponse,Column,CreateDatabaseRequest,CreateTableRequest,InsertDataRequest,Optional,FetchDataRequest,Union,DeleteDataRequest,DropTableRequest,TableSchemaRequest,UpdateDataRequest,ListTablesRequest
+from app.schemas.Dynamic_db_schema import DatabaseConfig,DatabaseCredentials,DatabaseResponse,Column,CreateDatabaseRequest,CreateTableRequest,InsertDataRequest,Optional,FetchDataRequest,Union,DeleteDataRequest,DropTableRequest,TableSchemaRequest,UpdateDataRequest,ListTablesRequest,ProjectDatabaseSettings,BatchOperation,BatchRequest,UpsertDataRequest
 from app.models.project import Proj_db_detail 
 from app.utils.logger import LoggerSetup
+from app.utils.config_reader import config as app_config
+from app.utils.metrics import record_cache_lookup
+from app.utils.query_log import record_query, should_explain, schedule_explain
+from app.utils.index_advisor import fetch_shape_stats
+from app.utils.admission import admission_controller, AdmissionRejected
+from app.utils.jwt import decode_token
+from app.utils.responses import FastJSONResponse
+import time
+import uuid
 import os
 
 
 logger = LoggerSetup.setup_logger('dynamic_db', os.path.join(os.getcwd(), 'logs'))
+conf = app_config["dynamic_db"]
+
+DEFAULT_STATEMENT_TIMEOUT_MS = int(conf["default_statement_timeout_ms"])
+MAX_STATEMENT_TIMEOUT_MS = int(conf["max_statement_timeout_ms"])
+DEFAULT_MAX_ROWS = int(conf["default_max_rows"])
+CLIENT_TIMEOUT_GRACE = float(conf["client_timeout_grace"])
+TOMBSTONE_RETENTION_DAYS = int(conf["tombstone_retention_days"])
+TOMBSTONE_PURGE_INTERVAL = float(conf["tombstone_purge_interval"])
+
+# Accept value selecting the column-oriented /dbfetch result format
+COLUMNAR_MEDIA_TYPE = "application/vnd.dynamicdb.columnar+json"
+
+# Dashboard database holding proj_db_detail and related tables
+DASHBOARD_DB_CONFIG = DatabaseConfig(
+    host=app_config["database"]["host"],
+    port=int(app_config["database"].get("port", 5432)),
+    user=app_config["database"]["username"],
+    password=app_config["database"]["password"],
+    database=app_config["database"]["database_name"]
+)
 
 # Global connection pool storage
 connection_pools = {}
 
+# Per-project query limits keyed like connection_pools, refreshed from proj_db_settings
+project_limits = {"expires": 0.0, "limits": {}}
+
+# Uses of each target database since the last flush to proj_db_usage, keyed like connection_pools
+pending_usage = {}
+
+# Column metadata per (pool key, table), with expiry; dropped when the table is created or dropped here
+table_schema_cache = {}
+
+# Time of the last tombstone purge per (pool key, table)
+tombstone_purges = {}
+
 
 # Helper Functions
-async def get_connection_pool(config: DatabaseConfig):
-    """Get or create connection pool for database"""
+def get_pool_key(config) -> str:
+    """Key identifying a target database in connection_pools"""
     database_name = getattr(config, 'database', None) or getattr(config, 'dbname', None) or 'postgres'
-    key = f"{config.host}:{config.port}:{config.user}:{database_name}"
+    return f"{config.host}:{config.port}:{config.user}:{database_name}"
+
+async def get_connection_pool(config: DatabaseConfig, record_usage: bool = True):
+    """Get or create connection pool for database
+
+    ``record_usage`` counts the call as a use of the database for pool warm-up;
+    warm-up itself passes False.
+    """
+    key = get_pool_key(config)
    
+    if record_usage:
+        usage = pending_usage.get(key)
+        if usage is None:
+            usage = pending_usage[key] = {
+                "host": config.host, "port": config.port, "user": config.user,
+                "dbname": config.database or 'postgres', "count": 0
+            }
+        usage["count"] += 1
+        usage["last_used_at"] = time.time()
+    
+    record_cache_lookup("connection_pool", key in connection_pools)
     if key not in connection_pools:
         try:
             pool = await asyncpg.create_pool(
@@ -34,7 +94,9 @@ async def get_connection_pool(config: DatabaseConfig):
                 password=config.password,
                 database=config.database or 'postgres',
                 min_size=1,
-                max_size=10
+                max_size=10,
+                # Safety net for statements that do not set their own timeout
+                server_settings={'statement_timeout': str(DEFAULT_STATEMENT_TIMEOUT_MS)}
             )
             connection_pools[key] = pool
             logger.info(f"Created new connection pool for {key}")
@@ -44,28 +106,262 @@ async def get_connection_pool(config: DatabaseConfig):
     
     return connection_pools[key]
 
-async def execute_query(pool, query: str, params: tuple = None, fetch: bool = True):
-    """Execute query using connection pool"""
+async def get_dashboard_pool():
+    """Connection pool for the dashboard database"""
+    return await get_connection_pool(DASHBOARD_DB_CONFIG, record_usage=False)
+
+async def load_project_limits() -> dict:
+    """Per-project statement timeout and row cap, keyed like connection_pools"""
+    now = time.time()
+    if project_limits["expires"] > now:
+        return project_limits["limits"]
+    try:
+        pool = await get_dashboard_pool()
+        rows = await execute_query(pool, """
+            SELECT d.host, d.port, d."user", d.dbname, s.statement_timeout_ms, s.max_rows
+            FROM proj_db_settings s
+            JOIN proj_db_detail d ON d.id = s.proj_db_id
+        """)
+        project_limits["limits"] = {
+            f"{row['host']}:{row['port']}:{row['user']}:{row['dbname']}": row
+            for row in rows
+        }
+    except Exception as e:
+        # Keep serving with the previous (or default) limits if the dashboard DB is unavailable
+        logger.error(f"Failed to load project database settings: {str(e)}")
+    project_limits["expires"] = now + float(conf["settings_cache_seconds"])
+    return project_limits["limits"]
+
+async def get_query_limits(config: DatabaseConfig):
+    """Resolve (statement_timeout_ms, max_rows) for a request.
+
+    The project's setting wins over the global default, and a per-request
+    statement_timeout_ms override is capped at max_statement_timeout_ms.
+    """
+    settings = (await load_project_limits()).get(get_pool_key(config)) or {}
+    timeout_ms = settings.get("statement_timeout_ms") or DEFAULT_STATEMENT_TIMEOUT_MS
+    if config.statement_timeout_ms:
+        timeout_ms = min(config.statement_timeout_ms, MAX_STATEMENT_TIMEOUT_MS)
+    max_rows = settings.get("max_rows") or DEFAULT_MAX_ROWS
+    return timeout_ms, max_rows
+
+async def flush_pool_usage():
+    """Persist the uses collected in pending_usage to proj_db_usage"""
+    if not pending_usage:
+        return
+    batch = dict(pending_usage)
+    pending_usage.clear()
+    try:
+        await write_pool_usage(list(batch.values()))
+    except Exception:
+        # Merge the batch back so the uses are written on the next flush
+        for key, usage in batch.items():
+            current = pending_usage.get(key)
+            if current is None:
+                pending_usage[key] = usage
+            else:
+                current["count"] += usage["count"]
+                current["last_used_at"] = max(current["last_used_at"], usage["last_used_at"])
+        raise
+
+async def write_pool_usage(batch: list):
+    pool = await get_dashboard_pool()
+    async with pool.acquire() as conn:
+        await conn.executemany("""
+            INSERT INTO proj_db_usage (proj_db_id, last_used_at, use_count)
+            SELECT d.id, to_timestamp($5) AT TIME ZONE 'UTC', $6
+            FROM proj_db_detail d
+            WHERE d.host = $1 AND d.port = $2 AND d."user" = $3 AND d.dbname = $4
+            ON CONFLICT (proj_db_id) DO UPDATE
+            SET last_used_at = GREATEST(proj_db_usage.last_used_at, EXCLUDED.last_used_at),
+                use_count = proj_db_usage.use_count + EXCLUDED.use_count
+        """, [
+            (u["host"], u["port"], u["user"], u["dbname"], u["last_used_at"], u["count"])
+            for u in batch
+        ])
+
+async def warm_up_pools():
+    """Pre-create pools for the most recently used project databases that opted in"""
+    warmup_conf = app_config["warmup"]
+    pool = await get_dashboard_pool()
+    rows = await execute_query(pool, """
+        SELECT d.host, d.port, d."user", d.password, d.dbname
+        FROM proj_db_usage u
+        JOIN proj_db_detail d ON d.id = u.proj_db_id
+        LEFT JOIN proj_db_settings s ON s.proj_db_id = d.id
+        WHERE COALESCE(s.prewarm, $1)
+          AND u.last_used_at > (now() AT TIME ZONE 'UTC') - make_interval(days => $2)
+        ORDER BY u.last_used_at DESC
+        LIMIT $3
+    """, (warmup_conf["default_opt_in"].lower() == "true", int(warmup_conf["recent_days"]), int(warmup_conf["max_pools"])))
+    
+    warmed = 0
+    for row in rows:
+        config = DatabaseConfig(host=row["host"], port=row["port"], user=row["user"],
+                                password=row["password"], database=row["dbname"])
+        if get_pool_key(config) in connection_pools:
+            continue
+        try:
+            # Warm-up itself is not a use of the database
+            await get_connection_pool(config, record_usage=False)
+            warmed += 1
+        except HTTPException as e:
+            logger.warning(f"Pool warm-up failed for {get_pool_key(config)}: {e.detail}")
+    if warmed:
+        logger.info(f"Warmed {warmed} connection pool(s)")
+
+async def pool_warmup_loop():
+    """Warm pools at startup, then flush usage and re-warm every interval"""
+    interval = float(app_config["warmup"]["interval"])
+    while True:
+        try:
+            await flush_pool_usage()
+            await warm_up_pools()
+        except Exception as e:
+            logger.error(f"Pool warm-up run failed: {str(e)}")
+        await asyncio.sleep(interval)
+
+async def get_cached_table_schema(config: DatabaseConfig, pool, tablename: str) -> list:
+    """Columns of a table in ordinal order, served from table_schema_cache when fresh"""
+    key = (get_pool_key(config), tablename)
+    entry = table_schema_cache.get(key)
+    hit = entry is not None and entry[0] > time.time()
+    record_cache_lookup("table_schema", hit)
+    if hit:
+        return entry[1]
+    rows = await execute_query(pool, """
+        SELECT column_name, data_type, is_nullable, column_default, is_generated
+        FROM information_schema.columns 
+        WHERE table_name = $1 AND table_schema = 'public'
+        ORDER BY ordinal_position
+    """, (tablename,))
+    table_schema_cache[key] = (time.time() + float(conf["schema_cache_seconds"]), rows)
+    return rows
+
+def read_columns(schema: list) -> Optional[List[str]]:
+    """Columns reads select, or None for SELECT *; the internal search vector column is left out"""
+    if not any(row["column_name"] == SEARCH_VECTOR_COLUMN for row in schema):
+        return None
+    return [row["column_name"] for row in schema if row["column_name"] != SEARCH_VECTOR_COLUMN]
+
+def data_columns(schema: list) -> List[str]:
+    """Columns holding the table's own data: read_columns without the change-tracking bookkeeping"""
+    columns = [row["column_name"] for row in schema if row["column_name"] != SEARCH_VECTOR_COLUMN]
+    if CHANGE_TXID_COLUMN in columns:
+        columns = [column for column in columns if column not in CHANGE_TRACKING_COLUMNS]
+    return columns
+
+def writable_columns(schema: list) -> List[str]:
+    """Columns that can be written: all but generated ones"""
+    return [row["column_name"] for row in schema if row["is_generated"] != "ALWAYS"]
+
+def invalidate_table_schema(config: DatabaseConfig, tablename: str):
+    table_schema_cache.pop((get_pool_key(config), tablename), None)
+
+# Callbacks (pool_key, tablename) run after a table's contents change through these endpoints,
+# so caches derived from its data can drop their entries
+table_write_listeners = []
+
+def notify_table_write(config: DatabaseConfig, tablename: str):
+    pool_key = get_pool_key(config)
+    for listener in table_write_listeners:
+        listener(pool_key, tablename)
+
+def get_caller_key(raw_request: Request) -> str:
+    """Identify the caller for admission control: JWT subject when present, else client address"""
+    authorization = raw_request.headers.get("authorization")
+    if authorization:
+        payload = decode_token(authorization)
+        if payload and payload.get("sub"):
+            return f"user:{payload['sub']}"
+    return f"ip:{raw_request.client.host if raw_request.client else 'unknown'}"
+
+@asynccontextmanager
+async def admit(config: DatabaseConfig, raw_request: Request):
+    """Hold an admission slot for the target database, rejecting with 429 when overloaded"""
+    database, caller = get_pool_key(config), get_caller_key(raw_request)
+    try:
+        await admission_controller.acquire(database, caller)
+    except AdmissionRejected as e:
+        logger.warning(f"Admission rejected ({e.reason}) for {caller} on {database}")
+        raise HTTPException(
+            status_code=429,
+            detail=create_error_response(e.message, e.reason),
+            headers={"Retry-After": "1"}
+        )
+    try:
+        yield
+    finally:
+        admission_controller.release(database, caller)
+
+async def run_until_disconnected(raw_request: Request, coro):
+    """Await coro, cancelling it if the HTTP client disconnects first.
+
+    Cancelling a task blocked in an asyncpg call makes asyncpg send a cancel
+    request to Postgres, so the query stops and its connection returns to the pool.
+    """
+    task = asyncio.ensure_future(coro)
+    poll_interval = float(conf["disconnect_poll_interval"])
+    try:
+        while True:
+            done, _ = await asyncio.wait({task}, timeout=poll_interval)
+            if done:
+                return task.result()
+            if await raw_request.is_disconnected():
+                logger.warning(f"Client disconnected, cancelling query for {raw_request.url.path}")
+                task.cancel()
+                await asyncio.gather(task, return_exceptions=True)
+                raise HTTPException(
+                    status_code=499,
+                    detail=create_error_response("Client closed request")
+                )
+    finally:
+        if not task.done():
+            task.cancel()
+
+async def execute_query(pool, query: str, params: tuple = None, fetch: bool = True, explain: bool = False,
+                        timeout_ms: int = None):
+    """Execute query using connection pool
+
+    Statements over the slow-query threshold are logged; with ``explain`` set, a
+    sample of slow fetches also gets an EXPLAIN plan captured.
+    ``timeout_ms`` sets statement_timeout for this statement; the client also gives
+    up (cancelling the query) shortly after it in case the server never answers.
+    """
     async with pool.acquire() as conn:
         try:
+            timeout = None
+            if timeout_ms:
+                if timeout_ms != DEFAULT_STATEMENT_TIMEOUT_MS:
+                    # Reset to the pool default by asyncpg's RESET ALL when the connection is released
+                    await conn.execute(f"SET statement_timeout = {int(timeout_ms)}")
+                timeout = timeout_ms / 1000 + CLIENT_TIMEOUT_GRACE
             if fetch:
+                start = time.perf_counter()
                 if params:
-                    result = await conn.fetch(query, *params)
+                    result = await conn.fetch(query, *params, timeout=timeout)
                 else:
-                    result = await conn.fetch(query)
+                    result = await conn.fetch(query, timeout=timeout)
+                if record_query(query, params, time.perf_counter() - start, "asyncpg") and explain and should_explain():
+                    schedule_explain(pool, query, params)
                 # Convert asyncpg Records to dictionaries
                 return [dict(record) for record in result]
             else:
+                start = time.perf_counter()
                 if params:
-                    result = await conn.execute(query, *params)
+                    result = await conn.execute(query, *params, timeout=timeout)
                 else:
-                    result = await conn.execute(query)
+                    result = await conn.execute(query, timeout=timeout)
+                record_query(query, params, time.perf_counter() - start, "asyncpg")
                 # Extract affected row count from result string
                 if result.startswith('INSERT'):
                     return 1
                 elif result.startswith('UPDATE') or result.startswith('DELETE'):
                     return int(result.split()[-1]) if result.split()[-1].isdigit() else 0
                 return 0
+        except (asyncpg.exceptions.QueryCanceledError, asyncio.TimeoutError):
+            logger.warning(f"Query exceeded its {timeout_ms}ms timeout: {query[:200]}")
+            raise
         except Exception as e:
             logger.error(f"Query execution error: {str(e)}")
             raise
@@ -78,6 +374,38 @@ def create_success_response(message: str, data: Any = None):
         "data": data
     }
 
+def wants_columnar(raw_request: Request) -> bool:
+    """True when the client asked for the column-oriented result format"""
+    return COLUMNAR_MEDIA_TYPE in raw_request.headers.get("accept", "")
+
+def create_columnar_response(message: str, rows: List[dict], schema: list, **extra):
+    """Success response with rows transposed into one value list per column.
+
+    Column names and types are sent once in a schema header instead of being
+    repeated as keys on every row, which shrinks wide results considerably.
+    """
+    types = {column["column_name"]: column["data_type"] for column in schema}
+    names = list(rows[0].keys()) if rows else list(types)
+    values = [list(column) for column in zip(*(row.values() for row in rows))] if rows else [[] for _ in names]
+    return FastJSONResponse(
+        content=create_success_response(message, {
+            "format": "columnar",
+            "columns": [{"name": name, "type": types.get(name)} for name in names],
+            "values": values,
+            "count": len(rows),
+            **extra
+        }),
+        media_type=COLUMNAR_MEDIA_TYPE,
+        headers={"Vary": "Accept"}
+    )
+
+def raise_timeout_error(timeout_ms: int):
+    """Translate a cancelled or timed-out statement into a 504 response"""
+    raise HTTPException(
+        status_code=504,
+        detail=create_error_response("Query timed out", f"Statement exceeded {timeout_ms}ms")
+    )
+
 def create_error_response(message: str, error: str = None):
     """Create standardized error response"""
     response = {
@@ -117,12 +445,307 @@ def convert_mysql_to_postgres_type(mysql_type: str) -> str:
     
     return mysql_type  # Return as-is if no mapping found
 
+def build_where_clause(where: Dict[str, Any], params: list) -> str:
+    """Append the where values to params and return the AND-ed equality conditions"""
+    conditions = []
+    for key, value in where.items():
+        params.append(value)
+        conditions.append(f'"{key}" = ${len(params)}')
+    return " AND ".join(conditions)
+
+def build_fetch_query(tablename: str, where: Optional[Dict[str, Any]] = None, order_by=None,
+                      limit: Optional[int] = None, offset: int = 0, columns: Optional[List[str]] = None):
+    """SELECT of columns (all when None) with optional equality filters, ordering and pagination;
+    returns (query, params)"""
+    select = ", ".join(f'"{column}"' for column in columns) if columns else "*"
+    query = f'SELECT {select} FROM "{tablename}"'
+    params = []
+    
+    if where:
+        query += f" WHERE {build_where_clause(where, params)}"
+    
+    if order_by:
+        query += f' ORDER BY "{order_by.column}" {order_by.direction}'
+    
+    if limit:
+        query += f" LIMIT ${len(params) + 1} OFFSET ${len(params) + 2}"
+        params.extend([limit, offset])
+    
+    return query, params
+
+def build_insert_query(tablename: str, columns: List[str]) -> str:
+    placeholders = ", ".join([f"${i+1}" for i in range(len(columns))])
+    column_names = ", ".join([f'"{col}"' for col in columns])
+    return f'INSERT INTO "{tablename}" ({column_names}) VALUES ({placeholders})'
+
+def build_update_query(tablename: str, data: Dict[str, Any], where: Dict[str, Any]):
+    params = []
+    set_columns = []
+    for key, value in data.items():
+        params.append(value)
+        set_columns.append(f'"{key}" = ${len(params)}')
+    query = f'UPDATE "{tablename}" SET {", ".join(set_columns)} WHERE {build_where_clause(where, params)}'
+    return query, params
+
+def build_delete_query(tablename: str, where: Dict[str, Any]):
+    params = []
+    query = f'DELETE FROM "{tablename}" WHERE {build_where_clause(where, params)}'
+    return query, params
+
+def build_upsert_query(tablename: str, columns: List[str], key_columns: List[str], update_columns: List[str],
+                       source: str) -> str:
+    """INSERT ... ON CONFLICT from source (a VALUES list or SELECT) that returns inserted and total counts.
+
+    xmax is 0 only for freshly inserted tuples, which separates inserts from updates.
+    """
+    column_names = ", ".join([f'"{col}"' for col in columns])
+    conflict_target = ", ".join([f'"{col}"' for col in key_columns])
+    if update_columns:
+        action = "UPDATE SET " + ", ".join([f'"{col}" = EXCLUDED."{col}"' for col in update_columns])
+    else:
+        action = "NOTHING"
+    return (
+        f'WITH upserted AS (INSERT INTO "{tablename}" ({column_names}) {source} '
+        f'ON CONFLICT ({conflict_target}) DO {action} RETURNING (xmax = 0) AS inserted) '
+        f'SELECT count(*) FILTER (WHERE inserted) AS inserted, count(*) AS affected FROM upserted'
+    )
+
+async def estimate_row_count(pool, tablename: str, where: Optional[Dict[str, Any]] = None,
+                             timeout_ms: int = None) -> int:
+    """Planner's row estimate for the (filtered) table, from statistics rather than a scan"""
+    query, params = build_fetch_query(tablename, where)
+    rows = await execute_query(pool, f"EXPLAIN (FORMAT JSON) {query}", tuple(params) if params else None,
+                               timeout_ms=timeout_ms)
+    plan = rows[0]["QUERY PLAN"]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+def apply_row_cap(limit: Optional[int], max_rows: int) -> Optional[int]:
+    """Cap a requested LIMIT at the project's row limit (0 means no cap)"""
+    if max_rows:
+        return min(limit, max_rows) if limit else max_rows
+    return limit
+
+def parse_affected_rows(status: str) -> int:
+    """Row count from an asyncpg command status such as 'UPDATE 3' or 'INSERT 0 1'"""
+    count = status.split()[-1] if status else ""
+    return int(count) if count.isdigit() else 0
+
+# Change tracking for tables created with track_changes: every insert/update stamps the row
+# with the writing transaction's id, and deletes leave a tombstone with the row's key
+CHANGE_TXID_COLUMN = "_changed_txid"
+CHANGE_TRACKING_COLUMNS = (CHANGE_TXID_COLUMN, "_updated_at")
+
+# Stored generated tsvector column added by /search/enable; internal, so reads leave it out
+SEARCH_VECTOR_COLUMN = "_search_vector"
+
+# Retention bookkeeping; part of CHANGE_TRACKING_SETUP, and run on its own for databases
+# whose tables were tracked before tombstones were purged
+TOMBSTONE_RETENTION_SETUP = """
+CREATE INDEX IF NOT EXISTS dynamic_db_tombstones_table_deleted_at_idx ON dynamic_db_tombstones (table_name, deleted_at);
+
+-- Newest tombstone txid removed by retention per table; older change tokens can no longer be served
+CREATE TABLE IF NOT EXISTS dynamic_db_tombstone_purges (
+    table_name text PRIMARY KEY,
+    purged_txid bigint NOT NULL
+);
+"""
+
+CHANGE_TRACKING_SETUP = """
+CREATE TABLE IF NOT EXISTS dynamic_db_tombstones (
+    id bigserial PRIMARY KEY,
+    table_name text NOT NULL,
+    key jsonb NOT NULL,
+    txid bigint NOT NULL,
+    deleted_at timestamptz NOT NULL DEFAULT now()
+);
+CREATE INDEX IF NOT EXISTS dynamic_db_tombstones_table_txid_idx ON dynamic_db_tombstones (table_name, txid);
+""" + TOMBSTONE_RETENTION_SETUP + """
+
+CREATE OR REPLACE FUNCTION dynamic_db_stamp_change() RETURNS trigger LANGUAGE plpgsql AS $$
+BEGIN
+    NEW._changed_txid := txid_current();
+    NEW._updated_at := now();
+    RETURN NEW;
+END
+$$;
+
+CREATE OR REPLACE FUNCTION dynamic_db_record_delete() RETURNS trigger LANGUAGE plpgsql AS $$
+BEGIN
+    INSERT INTO dynamic_db_tombstones (table_name, key, txid)
+    SELECT TG_TABLE_NAME,
+           CASE WHEN TG_NARGS = 0 THEN to_jsonb(OLD)
+                ELSE (SELECT jsonb_object_agg(e.key, e.value) FROM jsonb_each(to_jsonb(OLD)) e
+                      WHERE e.key = ANY(TG_ARGV)) END,
+           txid_current();
+    RETURN OLD;
+END
+$$;
+"""
+
+async def enable_change_tracking(conn, tablename: str, key_columns: List[str]):
+    """Add the managed watermark columns, index and triggers to a table"""
+    await conn.execute(CHANGE_TRACKING_SETUP)
+    await conn.execute(
+        f'ALTER TABLE "{tablename}" '
+        f'ADD COLUMN IF NOT EXISTS "{CHANGE_TXID_COLUMN}" bigint NOT NULL DEFAULT txid_current(), '
+        f'ADD COLUMN IF NOT EXISTS "_updated_at" timestamptz NOT NULL DEFAULT now()'
+    )
+    await conn.execute(f'CREATE INDEX IF NOT EXISTS "{tablename}_changed_txid_idx" ON "{tablename}" ("{CHANGE_TXID_COLUMN}")')
+    arguments = ", ".join("'" + column.replace("'", "''") + "'" for column in key_columns)
+    await conn.execute(f'DROP TRIGGER IF EXISTS "dynamic_db_stamp_change" ON "{tablename}"')
+    await conn.execute(
+        f'CREATE TRIGGER "dynamic_db_stamp_change" BEFORE INSERT OR UPDATE ON "{tablename}" '
+        f'FOR EACH ROW EXECUTE PROCEDURE dynamic_db_stamp_change()'
+    )
+    await conn.execute(f'DROP TRIGGER IF EXISTS "dynamic_db_record_delete" ON "{tablename}"')
+    await conn.execute(
+        f'CREATE TRIGGER "dynamic_db_record_delete" AFTER DELETE ON "{tablename}" '
+        f'FOR EACH ROW EXECUTE PROCEDURE dynamic_db_record_delete({arguments})'
+    )
+
+PURGE_TOMBSTONES = """
+WITH purged AS (
+    DELETE FROM dynamic_db_tombstones
+    WHERE table_name = $1 AND deleted_at < now() - make_interval(days => $2)
+    RETURNING txid
+)
+INSERT INTO dynamic_db_tombstone_purges (table_name, purged_txid)
+SELECT $1, max(txid) FROM purged HAVING count(*) > 0
+ON CONFLICT (table_name) DO UPDATE
+SET purged_txid = GREATEST(dynamic_db_tombstone_purges.purged_txid, EXCLUDED.purged_txid)
+"""
+
+async def purge_tombstones(config: DatabaseConfig, pool, tablename: str):
+    """Delete a table's tombstones older than the retention window, at most once per purge interval.
+
+    The newest purged txid is recorded so fetch_changes can reject tokens from before
+    it, whose deletes can no longer be reported.
+    """
+    key = (get_pool_key(config), tablename)
+    now = time.time()
+    if tombstone_purges.get(key, 0.0) > now - TOMBSTONE_PURGE_INTERVAL:
+        return
+    tombstone_purges[key] = now
+    try:
+        async with pool.acquire() as conn:
+            try:
+                await conn.execute(PURGE_TOMBSTONES, tablename, TOMBSTONE_RETENTION_DAYS)
+            except asyncpg.exceptions.UndefinedTableError:
+                # Tracked before retention existed: add the purge table once, then purge
+                await conn.execute(TOMBSTONE_RETENTION_SETUP)
+                await conn.execute(PURGE_TOMBSTONES, tablename, TOMBSTONE_RETENTION_DAYS)
+    except Exception as e:
+        logger.error(f"Error purging tombstones for {tablename}: {str(e)}")
+
+def parse_change_token(token: str) -> int:
+    if not token.isdigit():
+        raise HTTPException(status_code=400, detail=create_error_response("Invalid change token", token))
+    return int(token)
+
+async def fetch_changes(pool, request: FetchDataRequest, max_rows: int, timeout_ms: int,
+                        columns: Optional[List[str]] = None) -> dict:
+    """Rows inserted or updated since request.since, tombstones for rows deleted since then, and the next token.
+
+    The token is the oldest transaction still running when the read started
+    (txid_snapshot_xmin), so writes that commit after the read are picked up by the
+    next one; a row may be returned twice but never skipped. A page cut short by
+    the row cap resumes at its last transaction, but never past that horizon: a
+    transaction still running has a smaller txid than rows that are already visible.
+    When such a transaction is older than since itself, the token cannot move and
+    stalled is set: the same page comes back until it ends, so clients should wait
+    before asking again. Tokens older than the tombstone retention window are
+    rejected with 410.
+    """
+    since = parse_change_token(request.since)
+    await purge_tombstones(request, pool, request.tablename)
+    params = [since]
+    base_query, _ = build_fetch_query(request.tablename, columns=columns)
+    base_query += f' WHERE "{CHANGE_TXID_COLUMN}" >= $1'
+    if request.where:
+        base_query += f" AND {build_where_clause(request.where, params)}"
+    query = base_query + f' ORDER BY "{CHANGE_TXID_COLUMN}"'
+    if max_rows:
+        query += f" LIMIT {int(max_rows)}"
+
+    async with pool.acquire() as conn:
+        if timeout_ms != DEFAULT_STATEMENT_TIMEOUT_MS:
+            await conn.execute(f"SET statement_timeout = {int(timeout_ms)}")
+        timeout = timeout_ms / 1000 + CLIENT_TIMEOUT_GRACE
+        async with conn.transaction(isolation="repeatable_read", readonly=True):
+            horizon, has_purges = await conn.fetchrow("""
+                SELECT txid_snapshot_xmin(txid_current_snapshot()),
+                       to_regclass('dynamic_db_tombstone_purges') IS NOT NULL
+            """)
+            if since and has_purges:
+                purged_txid = await conn.fetchval(
+                    "SELECT purged_txid FROM dynamic_db_tombstone_purges WHERE table_name = $1", request.tablename
+                )
+                if purged_txid is not None and since <= purged_txid:
+                    raise HTTPException(
+                        status_code=410,
+                        detail=create_error_response(
+                            "Change token expired",
+                            "Deletes before it are past retention; fetch again with since=0"
+                        )
+                    )
+            start = time.perf_counter()
+            rows = [dict(record) for record in await conn.fetch(query, *params, timeout=timeout)]
+            record_query(query, params, time.perf_counter() - start, "asyncpg")
+            complete = not max_rows or len(rows) < max_rows
+            token = horizon
+            if not complete:
+                last_txid = rows[-1][CHANGE_TXID_COLUMN]
+                if last_txid > since:
+                    # Resume at the last transaction seen; its rows are sent again next time
+                    token = min(last_txid, horizon)
+                else:
+                    # A single transaction changed more rows than the cap; send all of them
+                    rows = [dict(record) for record in await conn.fetch(
+                        f'{base_query} AND "{CHANGE_TXID_COLUMN}" = ${len(params) + 1}', *params, since, timeout=timeout
+                    )]
+                    token = min(since + 1, horizon)
+
+            # Only deletes below the token: later ones are reported by the read that starts there
+            tombstone_query = ("SELECT key, txid FROM dynamic_db_tombstones "
+                               "WHERE table_name = $1 AND txid >= $2 AND txid < $3 ORDER BY txid")
+            if max_rows:
+                tombstones = await conn.fetch(
+                    f"{tombstone_query} LIMIT {int(max_rows)}", request.tablename, since, token, timeout=timeout
+                )
+                if len(tombstones) == max_rows:
+                    complete = False
+                    last_txid = tombstones[-1]["txid"]
+                    if last_txid > since:
+                        token = last_txid
+                    else:
+                        tombstones = await conn.fetch(
+                            tombstone_query, request.tablename, since, since + 1, timeout=timeout
+                        )
+                        token = since + 1
+            else:
+                tombstones = await conn.fetch(tombstone_query, request.tablename, since, token, timeout=timeout)
+
+    return {
+        "records": rows,
+        "deleted": [{"key": json.loads(row["key"]), "txid": row["txid"]} for row in tombstones],
+        "count": len(rows),
+        "token": str(token),
+        "complete": complete,
+        "stalled": not complete and token == since,
+    }
+
 # FastAPI App
 router = APIRouter(prefix="/Dynamic_db")
 
 @router.on_event("shutdown")
 async def shutdown_event():
     """Close all connection pools on shutdown"""
+    try:
+        await flush_pool_usage()
+    except Exception as e:
+        logger.error(f"Failed to flush pool usage on shutdown: {str(e)}")
     for pool in connection_pools.values():
         await pool.close()
 
@@ -200,7 +823,17 @@ async def create_table(request: CreateTableRequest):
         columns_str = ", ".join(column_defs)
         query = f'CREATE TABLE IF NOT EXISTS "{request.tablename}" ({columns_str})'
         
-        await execute_query(pool, query, fetch=False)
+        if request.track_changes:
+            async with pool.acquire() as conn:
+                async with conn.transaction():
+                    await conn.execute(query)
+                    await enable_change_tracking(
+                        conn, request.tablename, [col.name for col in request.columns if col.primary]
+                    )
+        else:
+            await execute_query(pool, query, fetch=False)
+        invalidate_table_schema(request, request.tablename)
+        notify_table_write(request, request.tablename)
         
         return create_success_response(
             f"Table '{request.tablename}' created successfully",
@@ -215,7 +848,7 @@ async def create_table(request: CreateTableRequest):
         )
 
 @router.post("/dbinsert")
-async def insert_data(request: InsertDataRequest):
+async def insert_data(request: InsertDataRequest, raw_request: Request):
     """Insert data into table"""
     try:
         pool = await get_connection_pool(request)
@@ -224,22 +857,20 @@ async def insert_data(request: InsertDataRequest):
         records = request.data if isinstance(request.data, list) else [request.data]
         inserted_count = 0
         
-        async with pool.acquire() as conn:
+        async with admit(request, raw_request), pool.acquire() as conn:
             for record in records:
-                columns = list(record.keys())
-                values = list(record.values())
-                placeholders = ", ".join([f"${i+1}" for i in range(len(values))])
-                column_names = ", ".join([f'"{col}"' for col in columns])
-                
-                query = f'INSERT INTO "{request.tablename}" ({column_names}) VALUES ({placeholders})'
-                await conn.execute(query, *values)
+                query = build_insert_query(request.tablename, list(record.keys()))
+                await conn.execute(query, *record.values())
                 inserted_count += 1
+        notify_table_write(request, request.tablename)
         
         return create_success_response(
             f"{inserted_count} record(s) inserted successfully",
             {"inserted_count": inserted_count}
         )
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error inserting data: {str(e)}")
         raise HTTPException(
@@ -247,41 +878,83 @@ async def insert_data(request: InsertDataRequest):
             detail=create_error_response("Failed to insert data", str(e))
         )
 
+async def run_fetch(pool, request: FetchDataRequest, query: str, params: list, timeout_ms: int) -> list:
+    """Run a built fetch query, recording its filter and sort shape for the index advisor"""
+    start = time.perf_counter()
+    rows = await execute_query(pool, query, tuple(params) if params else None, explain=True, timeout_ms=timeout_ms)
+    fetch_shape_stats.add(get_pool_key(request), request.tablename, request.where, request.order_by,
+                          time.perf_counter() - start)
+    return rows
+
+async def run_fetch_with_total(pool, request: FetchDataRequest, query: str, params: list, timeout_ms: int) -> tuple:
+    """run_fetch followed by the planner's estimate of all matching rows.
+
+    The two run one after the other so a request never holds more than the one
+    pool connection its admission slot accounts for; planning the EXPLAIN is cheap.
+    """
+    rows = await run_fetch(pool, request, query, params, timeout_ms)
+    total = await estimate_row_count(pool, request.tablename, request.where, timeout_ms)
+    return rows, total
+
 @router.post("/dbfetch")
-async def fetch_data(request: FetchDataRequest):
-    """Fetch data from table with filtering, sorting, and pagination"""
+async def fetch_data(request: FetchDataRequest, raw_request: Request):
+    """Fetch data from table with filtering, sorting, and pagination
+
+    Send ``Accept: application/vnd.dynamicdb.columnar+json`` to get the result as
+    per-column value lists with a schema header instead of a list of row objects.
+    """
     try:
         pool = await get_connection_pool(request)
+        timeout_ms, max_rows = await get_query_limits(request)
+        schema = await get_cached_table_schema(request, pool, request.tablename)
+        columns = read_columns(schema)
+        
+        if request.since is not None:
+            if not any(column["column_name"] == CHANGE_TXID_COLUMN for column in schema):
+                raise HTTPException(
+                    status_code=400,
+                    detail=create_error_response("Change tracking is not enabled for this table")
+                )
+            async with admit(request, raw_request):
+                changes = await run_until_disconnected(
+                    raw_request,
+                    fetch_changes(pool, request, apply_row_cap(request.limit, max_rows), timeout_ms, columns)
+                )
+            return FastJSONResponse(
+                create_success_response("Changes fetched successfully", changes),
+                headers={"Retry-After": "1"} if changes["stalled"] else None
+            )
         
-        query = f'SELECT * FROM "{request.tablename}"'
-        params = []
-        param_counter = 1
-        
-        # Add WHERE clause
-        if request.where:
-            conditions = []
-            for key, value in request.where.items():
-                conditions.append(f'"{key}" = ${param_counter}')
-                params.append(value)
-                param_counter += 1
-            query += f" WHERE {' AND '.join(conditions)}"
-        
-        # Add ORDER BY
-        if request.order_by:
-            query += f' ORDER BY "{request.order_by.column}" {request.order_by.direction}'
+        # LIMIT is capped by the project's row limit
+        query, params = build_fetch_query(
+            request.tablename, request.where, request.order_by,
+            apply_row_cap(request.limit, max_rows), request.offset, columns
+        )
         
-        # Add LIMIT and OFFSET
-        if request.limit:
-            query += f" LIMIT ${param_counter} OFFSET ${param_counter + 1}"
-            params.extend([request.limit, request.offset])
+        extra = {}
+        async with admit(request, raw_request):
+            if request.include_total:
+                rows, extra["total_estimate"] = await run_until_disconnected(
+                    raw_request, run_fetch_with_total(pool, request, query, params, timeout_ms)
+                )
+            else:
+                rows = await run_until_disconnected(raw_request, run_fetch(pool, request, query, params, timeout_ms))
         
-        rows = await execute_query(pool, query, tuple(params) if params else None)
+        if wants_columnar(raw_request):
+            if columns is not None:
+                schema = [row for row in schema if row["column_name"] in columns]
+            return create_columnar_response("Data fetched successfully", rows, schema, **extra)
         
-        return create_success_response(
+        # Rows are plain dicts of asyncpg values; render them directly without jsonable_encoder
+        return FastJSONResponse(create_success_response(
             "Data fetched successfully",
-            {"records": rows, "count": len(rows)}
-        )
+            {"records": rows, "count": len(rows), **extra}
+        ))
         
+    except HTTPException:
+        raise
+    except (asyncpg.exceptions.QueryCanceledError, asyncio.TimeoutError):
+        raise_timeout_error(timeout_ms)
     except Exception as e:
         logger.error(f"Error fetching data: {str(e)}")
         raise HTTPException(
@@ -290,37 +963,30 @@ async def fetch_data(request: FetchDataRequest):
         )
 
 @router.post("/dbupdate")
-async def update_data(request: UpdateDataRequest):
+async def update_data(request: UpdateDataRequest, raw_request: Request):
     """Update data in table"""
     try:
         pool = await get_connection_pool(request)
+        timeout_ms, _ = await get_query_limits(request)
         
-        param_counter = 1
-        set_columns = []
-        params = []
-        
-        # Build SET clause
-        for key, value in request.data.items():
-            set_columns.append(f'"{key}" = ${param_counter}')
-            params.append(value)
-            param_counter += 1
+        query, params = build_update_query(request.tablename, request.data, request.where)
         
-        # Build WHERE clause
-        where_columns = []
-        for key, value in request.where.items():
-            where_columns.append(f'"{key}" = ${param_counter}')
-            params.append(value)
-            param_counter += 1
-        
-        query = f'UPDATE "{request.tablename}" SET {", ".join(set_columns)} WHERE {" AND ".join(where_columns)}'
-        
-        affected_rows = await execute_query(pool, query, tuple(params), fetch=False)
+        async with admit(request, raw_request):
+            affected_rows = await run_until_disconnected(
+                raw_request,
+                execute_query(pool, query, tuple(params), fetch=False, timeout_ms=timeout_ms)
+            )
+        notify_table_write(request, request.tablename)
         
         return create_success_response(
             f"{affected_rows} record(s) updated successfully",
             {"affected_rows": affected_rows}
         )
         
+    except HTTPException:
+        raise
+    except (asyncpg.exceptions.QueryCanceledError, asyncio.TimeoutError):
+        raise_timeout_error(timeout_ms)
     except Exception as e:
         logger.error(f"Error updating data: {str(e)}")
         raise HTTPException(
@@ -329,29 +995,30 @@ async def update_data(request: UpdateDataRequest):
         )
 
 @router.post("/dbdelete")
-async def delete_data(request: DeleteDataRequest):
+async def delete_data(request: DeleteDataRequest, raw_request: Request):
     """Delete data from table"""
     try:
         pool = await get_connection_pool(request)
+        timeout_ms, _ = await get_query_limits(request)
         
-        param_counter = 1
-        where_columns = []
-        params = []
-        
-        for key, value in request.where.items():
-            where_columns.append(f'"{key}" = ${param_counter}')
-            params.append(value)
-            param_counter += 1
+        query, params = build_delete_query(request.tablename, request.where)
         
-        query = f'DELETE FROM "{request.tablename}" WHERE {" AND ".join(where_columns)}'
-        
-        affected_rows = await execute_query(pool, query, tuple(params), fetch=False)
+        async with admit(request, raw_request):
+            affected_rows = await run_until_disconnected(
+                raw_request,
+                execute_query(pool, query, tuple(params), fetch=False, timeout_ms=timeout_ms)
+            )
+        notify_table_write(request, request.tablename)
         
         return create_success_response(
             f"{affected_rows} record(s) deleted successfully",
             {"affected_rows": affected_rows}
         )
         
+    except HTTPException:
+        raise
+    except (asyncpg.exceptions.QueryCanceledError, asyncio.TimeoutError):
+        raise_timeout_error(timeout_ms)
     except Exception as e:
         logger.error(f"Error deleting data: {str(e)}")
         raise HTTPException(
@@ -359,6 +1026,266 @@ async def delete_data(request: DeleteDataRequest):
             detail=create_error_response("Failed to delete data", str(e))
         )
 
+def validate_batch_operation(index: int, operation: BatchOperation):
+    """Reject operations that are missing the fields their type needs"""
+    if operation.op == "insert" and not operation.data:
+        problem = "insert requires data"
+    elif operation.op == "update" and (not isinstance(operation.data, dict) or not operation.data or not operation.where):
+        problem = "update requires a data object and where"
+    elif operation.op == "delete" and not operation.where:
+        problem = "delete requires where"
+    else:
+        return
+    raise HTTPException(
+        status_code=400,
+        detail={**create_error_response(f"Invalid batch operation {index}", problem), "failed_index": index}
+    )
+
+async def run_batch_operation(conn, operation: BatchOperation, max_rows: int) -> dict:
+    """Run one batch operation on conn and return its result entry"""
+    if operation.op == "insert":
+        records = operation.data if isinstance(operation.data, list) else [operation.data]
+        # Consecutive records with the same columns share one prepared statement and are
+        # sent with executemany, which pipelines them in a single round trip
+        start = 0
+        while start < len(records):
+            columns = list(records[start].keys())
+            end = start + 1
+            while end < len(records) and list(records[end].keys()) == columns:
+                end += 1
+            query = build_insert_query(operation.tablename, columns)
+            began = time.perf_counter()
+            await conn.executemany(query, [tuple(record.values()) for record in records[start:end]])
+            record_query(query, tuple(records[start].values()), time.perf_counter() - began, "asyncpg")
+            start = end
+        return {"inserted_count": len(records)}
+    
+    if operation.op == "fetch":
+        query, params = build_fetch_query(
+            operation.tablename, operation.where, operation.order_by,
+            apply_row_cap(operation.limit, max_rows), operation.offset
+        )
+        began = time.perf_counter()
+        rows = await conn.fetch(query, *params)
+        record_query(query, params, time.perf_counter() - began, "asyncpg")
+        records = [dict(record) for record in rows]
+        for record in records:
+            record.pop(SEARCH_VECTOR_COLUMN, None)
+        return {"records": records, "count": len(rows)}
+    
+    if operation.op == "update":
+        query, params = build_update_query(operation.tablename, operation.data, operation.where)
+    else:
+        query, params = build_delete_query(operation.tablename, operation.where)
+    began = time.perf_counter()
+    status = await conn.execute(query, *params)
+    record_query(query, params, time.perf_counter() - began, "asyncpg")
+    return {"affected_rows": parse_affected_rows(status)}
+
+async def run_batch(pool, operations: List[BatchOperation], timeout_ms: int, max_rows: int) -> list:
+    """Run all operations on one connection inside one transaction"""
+    results = []
+    async with pool.acquire() as conn:
+        async with conn.transaction():
+            await conn.execute(f"SET LOCAL statement_timeout = {int(timeout_ms)}")
+            for index, operation in enumerate(operations):
+                start = time.perf_counter()
+                try:
+                    result = await run_batch_operation(conn, operation, max_rows)
+                except (asyncpg.exceptions.QueryCanceledError, asyncio.TimeoutError):
+                    raise
+                except Exception as e:
+                    # Leaving the transaction block with an exception rolls back every operation
+                    raise HTTPException(
+                        status_code=500,
+                        detail={
+                            **create_error_response(f"Batch operation {index} ({operation.op}) failed; batch rolled back", str(e)),
+                            "failed_index": index
+                        }
+                    )
+                results.append({
+                    "index": index,
+                    "op": operation.op,
+                    "tablename": operation.tablename,
+                    **result,
+                    "duration_ms": round((time.perf_counter() - start) * 1000, 2)
+                })
+    return results
+
+@router.post("/batch")
+async def batch_operations(request: BatchRequest, raw_request: Request):
+    """Run an ordered list of insert, update, delete and fetch operations in a single transaction"""
+    try:
+        max_operations = int(conf["max_batch_operations"])
+        if len(request.operations) > max_operations:
+            raise HTTPException(
+                status_code=400,
+                detail=create_error_response(f"A batch may contain at most {max_operations} operations")
+            )
+        for index, operation in enumerate(request.operations):
+            validate_batch_operation(index, operation)
+        
+        pool = await get_connection_pool(request)
+        timeout_ms, max_rows = await get_query_limits(request)
+        
+        start = time.perf_counter()
+        async with admit(request, raw_request):
+            results = await run_until_disconnected(
+                raw_request,
+                run_batch(pool, request.operations, timeout_ms, max_rows)
+            )
+        for tablename in {operation.tablename for operation in request.operations if operation.op != "fetch"}:
+            notify_table_write(request, tablename)
+        
+        return create_success_response(
+            f"{len(results)} operation(s) committed successfully",
+            {"results": results, "duration_ms": round((time.perf_counter() - start) * 1000, 2)}
+        )
+        
+    except HTTPException:
+        raise
+    except (asyncpg.exceptions.QueryCanceledError, asyncio.TimeoutError):
+        raise_timeout_error(timeout_ms)
+    except Exception as e:
+        logger.error(f"Error running batch: {str(e)}")
+        raise HTTPException(
+            status_code=500,
+            detail=create_error_response("Failed to run batch", str(e))
+        )
+
+# Postgres accepts at most 32767 bind parameters per statement
+MAX_BIND_PARAMS = 32767
+
+def dedupe_upsert_rows(rows: List[Dict[str, Any]], key_columns: List[str]) -> List[Dict[str, Any]]:
+    """One row per key, the last one sent winning.
+
+    ON CONFLICT DO UPDATE cannot touch the same row twice in one statement, so
+    repeated keys would otherwise fail the whole upsert.
+    """
+    unique = {}
+    for row in rows:
+        unique[json.dumps([row[col] for col in key_columns], sort_keys=True, default=str)] = row
+    return list(unique.values())
+
+async def upsert_with_insert(conn, request: UpsertDataRequest, rows: List[Dict[str, Any]], columns: List[str],
+                             update_columns: List[str]):
+    """Upsert in chunks of multi-row INSERT ... ON CONFLICT statements"""
+    chunk_size = max(1, min(int(conf["upsert_chunk_size"]), MAX_BIND_PARAMS // len(columns)))
+    inserted = affected = 0
+    for start in range(0, len(rows), chunk_size):
+        chunk = rows[start:start + chunk_size]
+        params = []
+        values = []
+        for row in chunk:
+            placeholders = []
+            for col in columns:
+                params.append(row[col])
+                placeholders.append(f"${len(params)}")
+            values.append(f"({', '.join(placeholders)})")
+        query = build_upsert_query(request.tablename, columns, request.key_columns, update_columns,
+                                   f"VALUES {', '.join(values)}")
+        result = await conn.fetchrow(query, *params)
+        inserted += result["inserted"]
+        affected += result["affected"]
+    return inserted, affected
+
+async def upsert_with_copy(conn, request: UpsertDataRequest, rows: List[Dict[str, Any]], columns: List[str],
+                           update_columns: List[str]):
+    """Stage all rows into a temp table with binary COPY, then merge them with one statement"""
+    stage = f"_upsert_stage_{uuid.uuid4().hex[:12]}"
+    column_names = ", ".join([f'"{col}"' for col in columns])
+    # Same column types as the target but no constraints or defaults
+    await conn.execute(
+        f'CREATE TEMP TABLE "{stage}" ON COMMIT DROP AS SELECT {column_names} FROM "{request.tablename}" WITH NO DATA'
+    )
+    await conn.copy_records_to_table(
+        stage, records=[tuple(row[col] for col in columns) for row in rows], columns=columns
+    )
+    query = build_upsert_query(request.tablename, columns, request.key_columns, update_columns,
+                               f'SELECT {column_names} FROM "{stage}"')
+    result = await conn.fetchrow(query)
+    return result["inserted"], result["affected"]
+
+async def run_upsert(pool, request: UpsertDataRequest, rows: List[Dict[str, Any]], columns: List[str],
+                     update_columns: List[str], use_copy: bool, timeout_ms: int):
+    async with pool.acquire() as conn:
+        async with conn.transaction():
+            await conn.execute(f"SET LOCAL statement_timeout = {int(timeout_ms)}")
+            if use_copy:
+                return await upsert_with_copy(conn, request, rows, columns, update_columns)
+            return await upsert_with_insert(conn, request, rows, columns, update_columns)
+
+@router.post("/dbupsert")
+async def upsert_data(request: UpsertDataRequest, raw_request: Request):
+    """Insert rows or update them when a row with the same key columns already exists"""
+    try:
+        columns = list(request.rows[0].keys())
+        if any(set(row.keys()) != set(columns) for row in request.rows):
+            raise HTTPException(
+                status_code=400,
+                detail=create_error_response("All rows must have the same columns")
+            )
+        missing_keys = [col for col in request.key_columns if col not in columns]
+        if missing_keys:
+            raise HTTPException(
+                status_code=400,
+                detail=create_error_response("Key columns missing from rows", ", ".join(missing_keys))
+            )
+        if request.update_columns is None:
+            update_columns = [col for col in columns if col not in request.key_columns]
+        else:
+            update_columns = request.update_columns
+            unknown = [col for col in update_columns if col not in columns]
+            if unknown:
+                raise HTTPException(
+                    status_code=400,
+                    detail=create_error_response("Update columns missing from rows", ", ".join(unknown))
+                )
+        
+        rows = dedupe_upsert_rows(request.rows, request.key_columns)
+        
+        if request.method == "auto":
+            use_copy = len(rows) >= int(conf["upsert_copy_threshold"])
+        else:
+            use_copy = request.method == "copy"
+        
+        pool = await get_connection_pool(request)
+        timeout_ms, _ = await get_query_limits(request)
+        
+        start = time.perf_counter()
+        async with admit(request, raw_request):
+            inserted, affected = await run_until_disconnected(
+                raw_request,
+                run_upsert(pool, request, rows, columns, update_columns, use_copy, timeout_ms)
+            )
+        elapsed = time.perf_counter() - start
+        notify_table_write(request, request.tablename)
+        
+        return create_success_response(
+            f"{affected} record(s) upserted successfully",
+            {
+                "inserted_count": inserted,
+                "updated_count": affected - inserted,
+                # Only DO NOTHING leaves conflicting rows untouched; DO UPDATE affects every row
+                "unchanged_count": None if update_columns else len(rows) - affected,
+                "duplicate_count": len(request.rows) - len(rows),
+                "method": "copy" if use_copy else "insert",
+                "duration_ms": round(elapsed * 1000, 2),
+                "rows_per_second": round(len(request.rows) / elapsed) if elapsed else None
+            }
+        )
+        
+    except HTTPException:
+        raise
+    except (asyncpg.exceptions.QueryCanceledError, asyncio.TimeoutError):
+        raise_timeout_error(timeout_ms)
+    except Exception as e:
+        logger.error(f"Error upserting data: {str(e)}")
+        raise HTTPException(
+            status_code=500,
+            detail=create_error_response("Failed to upsert data", str(e))
+        )
+
 @router.post("/dblist")
 async def list_databases(request: DatabaseConfig):
     """List all databases"""
@@ -416,12 +1343,7 @@ async def get_table_schema(request: TableSchemaRequest):
     """Get table schema/structure"""
     try:
         pool = await get_connection_pool(request)
-        rows = await execute_query(pool, """
-            SELECT column_name, data_type, is_nullable, column_default
-            FROM information_schema.columns 
-            WHERE table_name = $1 AND table_schema = 'public'
-            ORDER BY ordinal_position
-        """, (request.tablename,))
+        rows = await get_cached_table_schema(request, pool, request.tablename)
         
         return create_success_response(
             "Table schema retrieved successfully",
@@ -441,6 +1363,8 @@ async def drop_table(request: DropTableRequest):
     try:
         pool = await get_connection_pool(request)
         await execute_query(pool, f'DROP TABLE IF EXISTS "{request.tablename}"', fetch=False)
+        invalidate_table_schema(request, request.tablename)
+        notify_table_write(request, request.tablename)
         
         return create_success_response(
             f"Table '{request.tablename}' dropped successfully",
@@ -647,4 +1571,80 @@ async def get_database_credentials(request: BaseModel):
         raise HTTPException(
             status_code=500,
             detail=create_error_response("Failed to fetch database credentials", str(e))
-        )
\ No newline at end of file
+        )
+@router.get("/projects/{project_id}/databases/{database_id}/settings")
+async def get_project_database_settings(project_id: int, database_id: int):
+    """Get the query limits configured for a project database"""
+    try:
+        pool = await get_dashboard_pool()
+        rows = await execute_query(pool, """
+            SELECT d.id AS database_id, s.statement_timeout_ms, s.max_rows, COALESCE(s.prewarm, false) AS prewarm
+            FROM proj_db_detail d
+            LEFT JOIN proj_db_settings s ON s.proj_db_id = d.id
+            WHERE d.id = $1 AND d.project_id = $2
+        """, (database_id, project_id))
+        
+        if not rows:
+            raise HTTPException(
+                status_code=404,
+                detail=create_error_response("Project database not found")
+            )
+        
+        settings = rows[0]
+        return create_success_response(
+            "Project database settings retrieved successfully",
+            {
+                **settings,
+                "effective_statement_timeout_ms": settings["statement_timeout_ms"] or DEFAULT_STATEMENT_TIMEOUT_MS,
+                "effective_max_rows": settings["max_rows"] or DEFAULT_MAX_ROWS
+            }
+        )
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error fetching project database settings: {str(e)}")
+        raise HTTPException(
+            status_code=500,
+            detail=create_error_response("Failed to fetch project database settings", str(e))
+        )
+
+@router.put("/projects/{project_id}/databases/{database_id}/settings")
+async def update_project_database_settings(project_id: int, database_id: int, request: ProjectDatabaseSettings):
+    """Set the default statement timeout, row cap and pool warm-up opt-in for a project database"""
+    try:
+        pool = await get_dashboard_pool()
+        exists = await execute_query(pool, 
+            "SELECT 1 FROM proj_db_detail WHERE id = $1 AND project_id = $2", (database_id, project_id))
+        if not exists:
+            raise HTTPException(
+                status_code=404,
+                detail=create_error_response("Project database not found")
+            )
+        
+        # prewarm is left unchanged when the request omits it
+        rows = await execute_query(pool, """
+            INSERT INTO proj_db_settings (proj_db_id, statement_timeout_ms, max_rows, prewarm)
+            VALUES ($1, $2, $3, COALESCE($4, false))
+            ON CONFLICT (proj_db_id) DO UPDATE
+            SET statement_timeout_ms = EXCLUDED.statement_timeout_ms, max_rows = EXCLUDED.max_rows,
+                prewarm = COALESCE($4, proj_db_settings.prewarm)
+            RETURNING statement_timeout_ms, max_rows, prewarm
+        """, (database_id, request.statement_timeout_ms, request.max_rows, request.prewarm))
+        
+        # Pick up the new limits on the next request
+        project_limits["expires"] = 0.0
+        
+        return create_success_response(
+            "Project database settings updated successfully",
+            {"database_id": database_id, **rows[0]}
+        )
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error updating project database settings: {str(e)}")
+        raise HTTPException(
+            status_code=500,
+            detail=create_error_response("Failed to update project database settings", str(e))
+        )
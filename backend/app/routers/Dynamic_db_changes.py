@@ -0,0 +1,215 @@
+from fastapi import APIRouter, HTTPException
+import asyncpg
+import asyncio
+import json
+import secrets
+import time
+import os
+from app.schemas.Dynamic_db_schema import ChangeFeedTableRequest, ChangeFeedSubscribeRequest
+from app.routers.Dynamic_db import (
+    get_connection_pool, get_pool_key, get_cached_table_schema, execute_query,
+    create_success_response, create_error_response
+)
+from app.utils.change_feed import change_feed_hub, change_events_sent_total, CHANNEL, MAX_KEYS
+from app.utils.responses import ManagedStreamingResponse
+from app.utils.logger import LoggerSetup
+from app.utils.config_reader import config as app_config
+
+
+logger = LoggerSetup.setup_logger('dynamic_db_changes', os.path.join(os.getcwd(), 'logs'))
+conf = app_config["change_feed"]
+
+COALESCE_WINDOW = float(conf["coalesce_ms"]) / 1000
+HEARTBEAT_SECONDS = float(conf["heartbeat_seconds"])
+TOKEN_TTL = float(conf["token_ttl"])
+# How long EventSource waits before reconnecting after the stream ends
+RECONNECT_MS = 3000
+
+TRIGGER_FUNCTION = "dynamic_db_notify_change"
+TRIGGER_OPS = {"insert": "NEW TABLE AS changed_rows", "update": "NEW TABLE AS changed_rows",
+               "delete": "OLD TABLE AS changed_rows"}
+
+# Statement-level trigger: one notification per statement carrying the primary keys of the
+# changed rows (or only the count when there are too many to fit in a NOTIFY payload)
+CREATE_TRIGGER_FUNCTION = f"""
+CREATE OR REPLACE FUNCTION {TRIGGER_FUNCTION}() RETURNS trigger LANGUAGE plpgsql AS $$
+DECLARE
+    changed bigint;
+    keys json;
+    payload text;
+BEGIN
+    SELECT count(*) INTO changed FROM changed_rows;
+    IF changed = 0 THEN
+        RETURN NULL;
+    END IF;
+    IF TG_NARGS > 0 AND changed <= {MAX_KEYS} THEN
+        SELECT json_agg((SELECT jsonb_object_agg(e.key, e.value) FROM jsonb_each(to_jsonb(r)) e
+                         WHERE e.key = ANY(TG_ARGV)))
+        INTO keys FROM changed_rows r;
+    END IF;
+    payload := json_build_object('table', TG_TABLE_NAME, 'op', lower(TG_OP), 'count', changed, 'keys', keys)::text;
+    IF octet_length(payload) > 7900 THEN
+        payload := json_build_object('table', TG_TABLE_NAME, 'op', lower(TG_OP), 'count', changed, 'keys', NULL)::text;
+    END IF;
+    PERFORM pg_notify('{CHANNEL}', payload);
+    RETURN NULL;
+END
+$$
+"""
+
+# Subscription tokens for EventSource, which cannot send a request body or headers
+subscription_tokens = {}
+
+router = APIRouter(prefix="/Dynamic_db")
+
+
+def trigger_name(op: str) -> str:
+    return f"dynamic_db_change_{op}"
+
+
+async def get_primary_key(pool, tablename: str) -> list:
+    rows = await execute_query(pool, """
+        SELECT a.attname
+        FROM pg_index i
+        JOIN pg_attribute a ON a.attrelid = i.indrelid AND a.attnum = ANY(i.indkey)
+        WHERE i.indrelid = to_regclass(quote_ident($1)) AND i.indisprimary
+        ORDER BY array_position(i.indkey::int2[], a.attnum)
+    """, (tablename,))
+    return [row["attname"] for row in rows]
+
+
+@router.post("/changefeed/enable")
+async def enable_change_feed(request: ChangeFeedTableRequest):
+    """Install change-capture triggers that NOTIFY on every insert, update and delete of a table"""
+    try:
+        pool = await get_connection_pool(request)
+        if not await get_cached_table_schema(request, pool, request.tablename):
+            raise HTTPException(status_code=404, detail=create_error_response(f"Table '{request.tablename}' not found"))
+        key_columns = await get_primary_key(pool, request.tablename)
+        arguments = ", ".join("'" + column.replace("'", "''") + "'" for column in key_columns)
+
+        async with pool.acquire() as conn:
+            async with conn.transaction():
+                await conn.execute(CREATE_TRIGGER_FUNCTION)
+                for op, referencing in TRIGGER_OPS.items():
+                    await conn.execute(f'DROP TRIGGER IF EXISTS "{trigger_name(op)}" ON "{request.tablename}"')
+                    await conn.execute(
+                        f'CREATE TRIGGER "{trigger_name(op)}" AFTER {op.upper()} ON "{request.tablename}" '
+                        f'REFERENCING {referencing} FOR EACH STATEMENT '
+                        f'EXECUTE PROCEDURE {TRIGGER_FUNCTION}({arguments})'
+                    )
+
+        logger.info(f"Change feed enabled for {request.tablename} on {get_pool_key(request)}")
+        return create_success_response(
+            f"Change feed enabled for '{request.tablename}'",
+            {"tablename": request.tablename, "key_columns": key_columns}
+        )
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error enabling change feed: {str(e)}")
+        raise HTTPException(
+            status_code=500,
+            detail=create_error_response("Failed to enable change feed", str(e))
+        )
+
+
+@router.post("/changefeed/disable")
+async def disable_change_feed(request: ChangeFeedTableRequest):
+    """Remove the change-capture triggers from a table"""
+    try:
+        pool = await get_connection_pool(request)
+        async with pool.acquire() as conn:
+            async with conn.transaction():
+                for op in TRIGGER_OPS:
+                    await conn.execute(f'DROP TRIGGER IF EXISTS "{trigger_name(op)}" ON "{request.tablename}"')
+
+        return create_success_response(f"Change feed disabled for '{request.tablename}'")
+
+    except Exception as e:
+        logger.error(f"Error disabling change feed: {str(e)}")
+        raise HTTPException(
+            status_code=500,
+            detail=create_error_response("Failed to disable change feed", str(e))
+        )
+
+
+@router.post("/changefeed/subscribe")
+async def create_subscription(request: ChangeFeedSubscribeRequest):
+    """Issue a token for GET /Dynamic_db/changefeed/stream/{token}"""
+    now = time.time()
+    for token, entry in list(subscription_tokens.items()):
+        if entry["expires"] <= now:
+            del subscription_tokens[token]
+
+    token = secrets.token_urlsafe(24)
+    subscription_tokens[token] = {
+        "expires": now + TOKEN_TTL,
+        "config": request,
+        "tables": set(request.tables) if request.tables else None,
+    }
+    return create_success_response("Change feed subscription created", {
+        "token": token,
+        "stream_url": f"/Dynamic_db/changefeed/stream/{token}",
+        "expires_in": TOKEN_TTL,
+    })
+
+
+def format_event(event: str, data) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+async def stream_changes(subscription):
+    """SSE body: coalesced change events, heartbeats while idle, and a reset event if the listener is lost"""
+    yield f"retry: {RECONNECT_MS}\n\n"
+    yield format_event("ready", {"database": subscription.database})
+    while True:
+        try:
+            batch = await asyncio.wait_for(subscription.next_batch(COALESCE_WINDOW), timeout=HEARTBEAT_SECONDS)
+        except asyncio.TimeoutError:
+            yield ": keep-alive\n\n"
+            continue
+        for change in batch:
+            change_events_sent_total.inc()
+            yield format_event("change", change)
+        if subscription.closed_reason is not None:
+            # Changes may have been missed; clients should refetch and reconnect
+            yield format_event("reset", {"reason": subscription.closed_reason})
+            return
+
+
+@router.get("/changefeed/stream/{token}")
+async def stream_change_feed(token: str):
+    """Server-Sent Events stream of table changes for a subscription token.
+
+    Notifications are merged per table over a short window, and a slow client
+    only ever has one pending event per table, so bursts of writes cannot build
+    up an unbounded backlog. Events carry the changed primary keys so the client
+    can fetch just those rows; keys is null when the whole table should be refetched.
+    """
+    entry = subscription_tokens.get(token)
+    if entry is None or entry["expires"] <= time.time():
+        raise HTTPException(status_code=404, detail=create_error_response("Unknown or expired subscription token"))
+    entry["expires"] = time.time() + TOKEN_TTL
+
+    config = entry["config"]
+    connect_kwargs = dict(host=config.host, port=config.port, user=config.user,
+                          password=config.password, database=config.database)
+    try:
+        subscription = await change_feed_hub.subscribe(get_pool_key(config), connect_kwargs, entry["tables"])
+    except (OSError, asyncpg.PostgresError) as e:
+        logger.error(f"Error starting change feed listener: {str(e)}")
+        raise HTTPException(
+            status_code=502,
+            detail=create_error_response("Failed to listen for changes", str(e))
+        )
+
+    # The subscription (and the listener connection, if it was the last one) is released
+    # by the response itself, so a disconnect or a stream that never starts cannot leak it
+    return ManagedStreamingResponse(
+        stream_changes(subscription),
+        cleanup=lambda: change_feed_hub.unsubscribe(subscription),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
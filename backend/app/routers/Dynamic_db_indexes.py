@@ -0,0 +1,245 @@
+from fastapi import APIRouter, HTTPException, Request
+import asyncpg
+import asyncio
+import time
+import os
+from app.schemas.Dynamic_db_schema import CreateIndexRequest, DropIndexRequest, ListIndexesRequest, IndexAdvisorRequest
+from app.routers.Dynamic_db import (
+    get_connection_pool, get_pool_key, get_cached_table_schema, execute_query, admit,
+    raise_timeout_error, create_success_response, create_error_response
+)
+from app.routers.Dynamic_db_stats import read_table_stats, estimate_rows
+from app.utils.index_advisor import fetch_shape_stats, suggest_indexes, index_name
+from app.utils.logger import LoggerSetup
+from app.utils.config_reader import config as app_config
+
+
+logger = LoggerSetup.setup_logger('dynamic_db_indexes', os.path.join(os.getcwd(), 'logs'))
+conf = app_config["index_advisor"]
+
+MIN_COUNT = int(conf["min_count"])
+MIN_ROWS = int(conf["min_rows"])
+BUILD_TIMEOUT_MS = int(conf["build_timeout_ms"])
+TEXT_TYPES = {"text", "character varying", "character"}
+
+router = APIRouter(prefix="/Dynamic_db")
+
+
+async def list_table_indexes(pool, tablename: str) -> list:
+    return await execute_query(pool, """
+        SELECT ic.relname AS name, am.amname AS method,
+               ARRAY(
+                   SELECT a.attname
+                   FROM unnest(i.indkey::int2[]) WITH ORDINALITY AS k(attnum, position)
+                   LEFT JOIN pg_attribute a ON a.attrelid = i.indrelid AND a.attnum = k.attnum
+                   WHERE k.position <= i.indnkeyatts
+                   ORDER BY k.position
+               ) AS columns,
+               i.indisunique AS is_unique, i.indisprimary AS is_primary, i.indisvalid AS is_valid,
+               pg_get_indexdef(i.indexrelid) AS definition,
+               pg_relation_size(i.indexrelid) AS size_bytes,
+               s.idx_scan AS scans
+        FROM pg_index i
+        JOIN pg_class ic ON ic.oid = i.indexrelid
+        JOIN pg_am am ON am.oid = ic.relam
+        LEFT JOIN pg_stat_user_indexes s ON s.indexrelid = i.indexrelid
+        WHERE i.indrelid = to_regclass(quote_ident($1))
+        ORDER BY ic.relname
+    """, (tablename,))
+
+
+async def relation_exists(pool, name: str) -> bool:
+    rows = await execute_query(pool, "SELECT to_regclass(quote_ident($1)) IS NOT NULL AS exists", (name,))
+    return rows[0]["exists"]
+
+
+async def drop_invalid_index(pool, name: str):
+    """Remove the INVALID index a failed or cancelled CREATE INDEX CONCURRENTLY leaves behind"""
+    try:
+        rows = await execute_query(pool, """
+            SELECT NOT indisvalid AS invalid FROM pg_index WHERE indexrelid = to_regclass(quote_ident($1))
+        """, (name,))
+        if rows and rows[0]["invalid"]:
+            await execute_query(pool, f'DROP INDEX CONCURRENTLY IF EXISTS "{name}"', fetch=False,
+                                timeout_ms=BUILD_TIMEOUT_MS)
+    except Exception as e:
+        logger.error(f"Error removing invalid index {name}: {str(e)}")
+
+
+@router.post("/indexcreate")
+async def create_index(request: CreateIndexRequest, raw_request: Request):
+    """Build an index with CREATE INDEX CONCURRENTLY, so writes to the table are not blocked.
+
+    With trigram the columns' text is indexed with pg_trgm operator classes (the
+    extension is created if missing), which serves LIKE/ILIKE with leading
+    wildcards and similarity searches. A failed build's invalid index is dropped.
+    """
+    method = "gin" if request.trigram and request.method == "btree" else request.method
+    if request.trigram and method not in ("gin", "gist"):
+        raise HTTPException(status_code=400, detail=create_error_response("Trigram indexes must use gin or gist"))
+    if request.unique and method != "btree":
+        raise HTTPException(status_code=400, detail=create_error_response("Only btree indexes can be unique"))
+
+    timeout_ms = BUILD_TIMEOUT_MS
+    try:
+        pool = await get_connection_pool(request)
+        schema = await get_cached_table_schema(request, pool, request.tablename)
+        if not schema:
+            raise HTTPException(status_code=404, detail=create_error_response(f"Table '{request.tablename}' not found"))
+        data_types = {row["column_name"]: row["data_type"] for row in schema}
+        unknown = [column for column in request.columns if column not in data_types]
+        if unknown:
+            raise HTTPException(status_code=400, detail=create_error_response("Unknown columns", ", ".join(unknown)))
+
+        suffix = "trgm_idx" if request.trigram else "idx" if method == "btree" else f"{method}_idx"
+        name = request.name or index_name(request.tablename, request.columns, suffix)
+        if await relation_exists(pool, name):
+            raise HTTPException(status_code=409, detail=create_error_response(f"Relation '{name}' already exists"))
+
+        if request.trigram:
+            await execute_query(pool, "CREATE EXTENSION IF NOT EXISTS pg_trgm", fetch=False)
+            opclass = f"{method}_trgm_ops"
+            columns = ", ".join(
+                f'"{column}" {opclass}' if data_types[column] in TEXT_TYPES else f'("{column}"::text) {opclass}'
+                for column in request.columns
+            )
+        else:
+            columns = ", ".join(f'"{column}"' for column in request.columns)
+        query = (f'CREATE {"UNIQUE " if request.unique else ""}INDEX CONCURRENTLY "{name}" '
+                 f'ON "{request.tablename}" USING {method} ({columns})')
+
+        start = time.perf_counter()
+        async with admit(request, raw_request):
+            try:
+                await execute_query(pool, query, fetch=False, timeout_ms=timeout_ms)
+            except Exception:
+                await drop_invalid_index(pool, name)
+                raise
+        duration_ms = round((time.perf_counter() - start) * 1000, 2)
+        logger.info(f"Created index {name} on {request.tablename} in {duration_ms}ms")
+
+        return create_success_response(
+            f"Index '{name}' created successfully",
+            {"name": name, "tablename": request.tablename, "columns": request.columns, "method": method,
+             "trigram": request.trigram, "unique": request.unique, "duration_ms": duration_ms}
+        )
+
+    except HTTPException:
+        raise
+    except (asyncpg.exceptions.QueryCanceledError, asyncio.TimeoutError):
+        raise_timeout_error(timeout_ms)
+    except Exception as e:
+        logger.error(f"Error creating index: {str(e)}")
+        raise HTTPException(
+            status_code=500,
+            detail=create_error_response("Failed to create index", str(e))
+        )
+
+
+@router.post("/indexdrop")
+async def drop_index(request: DropIndexRequest, raw_request: Request):
+    """Drop an index of a table with DROP INDEX CONCURRENTLY"""
+    timeout_ms = BUILD_TIMEOUT_MS
+    try:
+        pool = await get_connection_pool(request)
+        rows = await execute_query(pool, """
+            SELECT 1 FROM pg_index
+            WHERE indexrelid = to_regclass(quote_ident($1)) AND indrelid = to_regclass(quote_ident($2))
+        """, (request.name, request.tablename))
+        if not rows:
+            raise HTTPException(
+                status_code=404,
+                detail=create_error_response(f"Index '{request.name}' not found on '{request.tablename}'")
+            )
+
+        async with admit(request, raw_request):
+            await execute_query(pool, f'DROP INDEX CONCURRENTLY "{request.name}"', fetch=False, timeout_ms=timeout_ms)
+
+        return create_success_response(
+            f"Index '{request.name}' dropped successfully",
+            {"name": request.name, "tablename": request.tablename}
+        )
+
+    except HTTPException:
+        raise
+    except (asyncpg.exceptions.QueryCanceledError, asyncio.TimeoutError):
+        raise_timeout_error(timeout_ms)
+    except Exception as e:
+        logger.error(f"Error dropping index: {str(e)}")
+        raise HTTPException(
+            status_code=500,
+            detail=create_error_response("Failed to drop index", str(e))
+        )
+
+
+@router.post("/indexlist")
+async def list_indexes(request: ListIndexesRequest):
+    """Indexes of a table with their columns, method, size and scan count"""
+    try:
+        pool = await get_connection_pool(request)
+        indexes = await list_table_indexes(pool, request.tablename)
+        return create_success_response(
+            "Indexes retrieved successfully",
+            {"tablename": request.tablename, "indexes": indexes}
+        )
+
+    except Exception as e:
+        logger.error(f"Error listing indexes: {str(e)}")
+        raise HTTPException(
+            status_code=500,
+            detail=create_error_response("Failed to list indexes", str(e))
+        )
+
+
+@router.post("/indexadvisor")
+async def advise_indexes(request: IndexAdvisorRequest):
+    """Suggest btree indexes from the filter and sort shapes /dbfetch has run on this database.
+
+    Shapes count when they ran at least min_count times or were slow at least once;
+    tables under min_rows estimated rows are skipped, and shapes an existing valid
+    btree index already serves are ignored. Suggestions are ordered by the total
+    fetch time they would have served and carry a ready CREATE INDEX statement.
+    """
+    try:
+        pool = await get_connection_pool(request)
+        by_table = {}
+        for shape in fetch_shape_stats.shapes(get_pool_key(request), request.tablename):
+            by_table.setdefault(shape["tablename"], []).append(shape)
+
+        suggestions = []
+        skipped = {}
+        for tablename, shapes in by_table.items():
+            stats = await read_table_stats(pool, tablename)
+            if stats is None:
+                continue
+            rows = estimate_rows(stats)
+            if rows < MIN_ROWS:
+                skipped[tablename] = f"{rows} estimated rows, below min_rows"
+                continue
+            existing = [
+                index["columns"] for index in await list_table_indexes(pool, tablename)
+                if index["method"] == "btree" and index["is_valid"]
+            ]
+            for suggestion in suggest_indexes(shapes, existing, MIN_COUNT):
+                name = index_name(tablename, suggestion["columns"])
+                columns = ", ".join(f'"{column}"' for column in suggestion["columns"])
+                suggestions.append({
+                    "tablename": tablename,
+                    "estimated_rows": rows,
+                    "name": name,
+                    "statement": f'CREATE INDEX CONCURRENTLY "{name}" ON "{tablename}" ({columns})',
+                    **suggestion,
+                })
+
+        suggestions.sort(key=lambda suggestion: suggestion["total_ms"], reverse=True)
+        return create_success_response(
+            f"{len(suggestions)} index suggestion(s)",
+            {"suggestions": suggestions, "skipped_tables": skipped}
+        )
+
+    except Exception as e:
+        logger.error(f"Error suggesting indexes: {str(e)}")
+        raise HTTPException(
+            status_code=500,
+            detail=create_error_response("Failed to suggest indexes", str(e))
+        )
@@ -0,0 +1,242 @@
+from fastapi import APIRouter, HTTPException, Request
+import asyncpg
+import asyncio
+import time
+import os
+from app.schemas.Dynamic_db_schema import SearchIndexRequest, DisableSearchRequest, SearchRequest
+from app.routers.Dynamic_db import (
+    get_connection_pool, get_cached_table_schema, invalidate_table_schema, notify_table_write, get_query_limits,
+    execute_query, admit, run_until_disconnected, apply_row_cap, raise_timeout_error, read_columns,
+    create_success_response, create_error_response, SEARCH_VECTOR_COLUMN
+)
+from app.routers.Dynamic_db_stats import escape_like
+from app.routers.Dynamic_db_indexes import drop_invalid_index, BUILD_TIMEOUT_MS, TEXT_TYPES
+from app.utils.index_advisor import index_name
+from app.utils.responses import FastJSONResponse
+from app.utils.logger import LoggerSetup
+from app.utils.config_reader import config as app_config
+
+
+logger = LoggerSetup.setup_logger('dynamic_db_search', os.path.join(os.getcwd(), 'logs'))
+conf = app_config["search"]
+
+DEFAULT_LANGUAGE = conf["default_language"]
+DEFAULT_LIMIT = int(conf["default_limit"])
+
+# Search columns are weighted in the order given; columns past the fourth all get D
+WEIGHTS = "ABCD"
+
+router = APIRouter(prefix="/Dynamic_db")
+
+
+def quote_literal(text: str) -> str:
+    return "'" + text.replace("'", "''") + "'"
+
+
+def build_search_vector(columns: list, language: str) -> str:
+    """tsvector expression over the columns, weighted by their order"""
+    return " || ".join(
+        f"setweight(to_tsvector({quote_literal(language)}::regconfig, coalesce(\"{column}\", '')), "
+        f"'{WEIGHTS[min(index, len(WEIGHTS) - 1)]}')"
+        for index, column in enumerate(columns)
+    )
+
+
+@router.post("/search/enable")
+async def enable_search(request: SearchIndexRequest, raw_request: Request):
+    """Add a stored generated tsvector column over the chosen text columns and a GIN index on it.
+
+    Adding the column rewrites the table under an exclusive lock; the index is then
+    built with CREATE INDEX CONCURRENTLY. Enabling again replaces the column, so it
+    can be used to change the columns or language. Both run under an admission slot.
+    """
+    language = request.language or DEFAULT_LANGUAGE
+    index = index_name(request.tablename, [SEARCH_VECTOR_COLUMN])
+    try:
+        pool = await get_connection_pool(request)
+        schema = await get_cached_table_schema(request, pool, request.tablename)
+        if not schema:
+            raise HTTPException(status_code=404, detail=create_error_response(f"Table '{request.tablename}' not found"))
+        data_types = {row["column_name"]: row["data_type"] for row in schema}
+        not_text = [column for column in request.columns if data_types.get(column) not in TEXT_TYPES]
+        if not_text:
+            raise HTTPException(
+                status_code=400,
+                detail=create_error_response("Search columns must be existing text columns", ", ".join(not_text))
+            )
+        if not await execute_query(pool, "SELECT 1 FROM pg_ts_config WHERE cfgname = $1", (language,)):
+            raise HTTPException(status_code=400, detail=create_error_response("Unknown text search language", language))
+
+        start = time.perf_counter()
+        async with admit(request, raw_request):
+            async with pool.acquire() as conn:
+                async with conn.transaction():
+                    await conn.execute(f"SET LOCAL statement_timeout = {BUILD_TIMEOUT_MS}")
+                    # Dropping the old column drops its index with it
+                    await conn.execute(
+                        f'ALTER TABLE "{request.tablename}" DROP COLUMN IF EXISTS "{SEARCH_VECTOR_COLUMN}"'
+                    )
+                    await conn.execute(
+                        f'ALTER TABLE "{request.tablename}" ADD COLUMN "{SEARCH_VECTOR_COLUMN}" tsvector '
+                        f'GENERATED ALWAYS AS ({build_search_vector(request.columns, language)}) STORED'
+                    )
+                    # The column's comment records the text search configuration it was built with
+                    await conn.execute(
+                        f'COMMENT ON COLUMN "{request.tablename}"."{SEARCH_VECTOR_COLUMN}" IS {quote_literal(language)}'
+                    )
+            invalidate_table_schema(request, request.tablename)
+            notify_table_write(request, request.tablename)
+
+            try:
+                await execute_query(
+                    pool,
+                    f'CREATE INDEX CONCURRENTLY "{index}" ON "{request.tablename}" '
+                    f'USING gin ("{SEARCH_VECTOR_COLUMN}")',
+                    fetch=False,
+                    timeout_ms=BUILD_TIMEOUT_MS
+                )
+            except Exception:
+                await drop_invalid_index(pool, index)
+                raise
+        duration_ms = round((time.perf_counter() - start) * 1000, 2)
+        logger.info(f"Search enabled on {request.tablename} ({', '.join(request.columns)}) in {duration_ms}ms")
+
+        return create_success_response(
+            f"Search enabled for '{request.tablename}'",
+            {"tablename": request.tablename, "columns": request.columns, "language": language,
+             "index": index, "duration_ms": duration_ms}
+        )
+
+    except HTTPException:
+        raise
+    except (asyncpg.exceptions.QueryCanceledError, asyncio.TimeoutError):
+        raise_timeout_error(BUILD_TIMEOUT_MS)
+    except Exception as e:
+        logger.error(f"Error enabling search: {str(e)}")
+        raise HTTPException(
+            status_code=500,
+            detail=create_error_response("Failed to enable search", str(e))
+        )
+
+
+@router.post("/search/disable")
+async def disable_search(request: DisableSearchRequest, raw_request: Request):
+    """Drop the search column and its index; /search falls back to ILIKE/trigram matching"""
+    try:
+        pool = await get_connection_pool(request)
+        async with admit(request, raw_request):
+            await execute_query(
+                pool,
+                f'ALTER TABLE "{request.tablename}" DROP COLUMN IF EXISTS "{SEARCH_VECTOR_COLUMN}"',
+                fetch=False
+            )
+        invalidate_table_schema(request, request.tablename)
+        notify_table_write(request, request.tablename)
+
+        return create_success_response(f"Search disabled for '{request.tablename}'")
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error disabling search: {str(e)}")
+        raise HTTPException(
+            status_code=500,
+            detail=create_error_response("Failed to disable search", str(e))
+        )
+
+
+def build_fulltext_query(tablename: str, columns: list, language: str):
+    """Ranked tsvector match returning columns; $1 is the search text in websearch syntax, $2/$3 LIMIT/OFFSET"""
+    select = ", ".join(f't."{column}"' for column in columns)
+    return (
+        f"SELECT {select}, ts_rank_cd(t.\"{SEARCH_VECTOR_COLUMN}\", q) AS _rank "
+        f"FROM \"{tablename}\" t, websearch_to_tsquery({quote_literal(language)}::regconfig, $1) q "
+        f"WHERE t.\"{SEARCH_VECTOR_COLUMN}\" @@ q "
+        f"ORDER BY _rank DESC LIMIT $2 OFFSET $3"
+    )
+
+
+def build_substring_query(tablename: str, columns: list, trigram: bool):
+    """Case-insensitive substring match on any column; $1 is the LIKE pattern, $2 the raw search
+    text for trigram similarity ranking, then LIMIT/OFFSET"""
+    matches = " OR ".join(f'"{column}"::text ILIKE $1' for column in columns)
+    if trigram:
+        rank = "GREATEST(" + ", ".join(f'similarity("{column}"::text, $2)' for column in columns) + ")"
+        return (f'SELECT *, {rank} AS _rank FROM "{tablename}" WHERE {matches} '
+                f'ORDER BY _rank DESC LIMIT $3 OFFSET $4')
+    return f'SELECT * FROM "{tablename}" WHERE {matches} LIMIT $2 OFFSET $3'
+
+
+async def run_search(pool, request: SearchRequest, schema: list, limit: int, timeout_ms: int) -> dict:
+    info = (await execute_query(pool, """
+        SELECT col_description(to_regclass(quote_ident($1)),
+                               (SELECT attnum FROM pg_attribute
+                                WHERE attrelid = to_regclass(quote_ident($1)) AND attname = $2 AND NOT attisdropped)
+               ) AS language,
+               EXISTS (SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm') AS has_trigram
+    """, (request.tablename, SEARCH_VECTOR_COLUMN)))[0]
+
+    # Both paths fetch one extra row, which tells whether there is a next page without counting every match
+    if any(row["column_name"] == SEARCH_VECTOR_COLUMN for row in schema):
+        mode = "fulltext"
+        language = info["language"] or DEFAULT_LANGUAGE
+        query = build_fulltext_query(request.tablename, read_columns(schema), language)
+        params = (request.query, limit + 1, request.offset)
+    else:
+        mode = "trigram" if info["has_trigram"] else "ilike"
+        columns = request.columns or [row["column_name"] for row in schema if row["data_type"] in TEXT_TYPES]
+        if not columns:
+            raise HTTPException(status_code=400, detail=create_error_response("Table has no text columns to search"))
+        pattern = f"%{escape_like(request.query)}%"
+        query = build_substring_query(request.tablename, columns, info["has_trigram"])
+        if info["has_trigram"]:
+            params = (pattern, request.query, limit + 1, request.offset)
+        else:
+            params = (pattern, limit + 1, request.offset)
+
+    rows = await execute_query(pool, query, params, explain=True, timeout_ms=timeout_ms)
+    return {"records": rows[:limit], "count": min(len(rows), limit), "has_more": len(rows) > limit, "mode": mode}
+
+
+@router.post("/search")
+async def search(request: SearchRequest, raw_request: Request):
+    """Search a table, best matches first, a page at a time.
+
+    Tables with search enabled are matched against their tsvector column through
+    its GIN index (websearch syntax: quoted phrases, OR, -word) and ranked with
+    ts_rank_cd. Other tables fall back to ILIKE substring matching on the text
+    columns, ranked by trigram similarity when pg_trgm is installed; a trigram
+    index from /indexcreate keeps that fast too. mode says which path answered.
+    """
+    timeout_ms = None
+    try:
+        pool = await get_connection_pool(request)
+        schema = await get_cached_table_schema(request, pool, request.tablename)
+        if not schema:
+            raise HTTPException(status_code=404, detail=create_error_response(f"Table '{request.tablename}' not found"))
+        if request.columns:
+            known = {row["column_name"] for row in schema}
+            unknown = [column for column in request.columns if column not in known]
+            if unknown:
+                raise HTTPException(status_code=400, detail=create_error_response("Unknown columns", ", ".join(unknown)))
+
+        timeout_ms, max_rows = await get_query_limits(request)
+        limit = apply_row_cap(request.limit or DEFAULT_LIMIT, max_rows)
+        async with admit(request, raw_request):
+            result = await run_until_disconnected(raw_request, run_search(pool, request, schema, limit, timeout_ms))
+
+        return FastJSONResponse(create_success_response(
+            "Search completed successfully",
+            dict(result, limit=limit, offset=request.offset)
+        ))
+
+    except HTTPException:
+        raise
+    except (asyncpg.exceptions.QueryCanceledError, asyncio.TimeoutError):
+        raise_timeout_error(timeout_ms)
+    except Exception as e:
+        logger.error(f"Error searching table: {str(e)}")
+        raise HTTPException(
+            status_code=500,
+            detail=create_error_response("Failed to search table", str(e))
+        )
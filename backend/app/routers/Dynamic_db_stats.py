@@ -0,0 +1,477 @@
+from fastapi import APIRouter, HTTPException, Request
+from collections import Counter, OrderedDict
+import asyncpg
+import asyncio
+import time
+import os
+from app.schemas.Dynamic_db_schema import TableStatsRequest, TableProfileRequest, DistinctValuesRequest
+from app.routers.Dynamic_db import (
+    get_connection_pool, get_pool_key, get_cached_table_schema, data_columns, get_query_limits, execute_query, admit,
+    run_until_disconnected, raise_timeout_error, table_write_listeners, create_success_response, create_error_response
+)
+from app.utils.logger import LoggerSetup
+from app.utils.config_reader import config as app_config
+from app.utils.metrics import record_cache_lookup
+
+
+logger = LoggerSetup.setup_logger('dynamic_db_stats', os.path.join(os.getcwd(), 'logs'))
+stats_conf = app_config["table_stats"]
+
+EXACT_COUNT_TIMEOUT_MS = int(stats_conf["exact_count_timeout_ms"])
+MAX_EXACT_COUNT_TIMEOUT_MS = int(stats_conf["max_exact_count_timeout_ms"])
+PROFILE_CACHE_SECONDS = float(stats_conf["profile_cache_seconds"])
+STALE_FRACTION = float(stats_conf["stale_fraction"])
+SAMPLE_ROWS = int(stats_conf["sample_rows"])
+MOST_COMMON_VALUES = int(stats_conf["most_common_values"])
+HISTOGRAM_BUCKETS = int(stats_conf["histogram_buckets"])
+DISTINCT_CACHE_COLUMNS = int(stats_conf["distinct_cache_columns"])
+DISTINCT_CACHE_SECONDS = float(stats_conf["distinct_cache_seconds"])
+DISTINCT_DEFAULT_LIMIT = int(stats_conf["distinct_default_limit"])
+DISTINCT_MAX_LIMIT = int(stats_conf["distinct_max_limit"])
+TEXT_TYPES = ("text", "character varying", "character")
+
+# {(pool_key, tablename): (expires, profile)}, dropped whenever the table is written through the API
+table_profile_cache = {}
+# LRU of {(pool_key, tablename, column): {(prefix, case_sensitive, limit): (expires, result)}}
+distinct_values_cache = OrderedDict()
+
+router = APIRouter(prefix="/Dynamic_db")
+
+
+async def read_table_stats(pool, tablename: str):
+    rows = await execute_query(pool, """
+        SELECT c.reltuples, c.relpages,
+               pg_relation_size(c.oid) / current_setting('block_size')::int AS current_pages,
+               pg_total_relation_size(c.oid) AS total_bytes,
+               pg_relation_size(c.oid) AS table_bytes,
+               pg_indexes_size(c.oid) AS index_bytes,
+               s.n_live_tup, s.n_dead_tup, s.n_tup_ins, s.n_tup_upd, s.n_tup_del,
+               s.n_mod_since_analyze, s.seq_scan, s.idx_scan,
+               s.last_vacuum, s.last_autovacuum, s.last_analyze, s.last_autoanalyze
+        FROM pg_class c
+        LEFT JOIN pg_stat_user_tables s ON s.relid = c.oid
+        WHERE c.oid = to_regclass(quote_ident($1))
+    """, (tablename,))
+    return rows[0] if rows else None
+
+
+def estimate_rows(stats: dict) -> int:
+    """Row estimate the way the planner makes it: tuple density from the last ANALYZE times the current size"""
+    reltuples, relpages = stats["reltuples"], stats["relpages"]
+    if reltuples is not None and reltuples >= 0 and relpages:
+        return int(round(reltuples / relpages * stats["current_pages"]))
+    if reltuples is not None and reltuples > 0:
+        return int(reltuples)
+    # Never analyzed (reltuples is -1 or 0); the statistics collector still tracks live tuples
+    return int(stats["n_live_tup"] or 0)
+
+
+async def exact_row_count(pool, tablename: str, timeout_ms: int):
+    """count(*) of the table, or None when it does not finish within timeout_ms"""
+    try:
+        rows = await execute_query(pool, f'SELECT count(*) AS count FROM "{tablename}"', timeout_ms=timeout_ms)
+        return rows[0]["count"]
+    except (asyncpg.exceptions.QueryCanceledError, asyncio.TimeoutError):
+        return None
+
+
+@router.post("/tablestats")
+async def get_table_stats(request: TableStatsRequest, raw_request: Request):
+    """Estimated row count, on-disk sizes and activity counters of a table, without scanning it.
+
+    With exact_count, count(*) also runs under a short statement timeout; if it
+    does not finish in time exact_count is null and the estimate still comes back.
+    """
+    try:
+        pool = await get_connection_pool(request)
+        stats = await read_table_stats(pool, request.tablename)
+        if stats is None:
+            raise HTTPException(status_code=404, detail=create_error_response(f"Table '{request.tablename}' not found"))
+
+        data = {
+            "tablename": request.tablename,
+            "estimated_rows": estimate_rows(stats),
+            "total_bytes": stats["total_bytes"],
+            "table_bytes": stats["table_bytes"],
+            "index_bytes": stats["index_bytes"],
+            "live_rows": stats["n_live_tup"],
+            "dead_rows": stats["n_dead_tup"],
+            "inserted": stats["n_tup_ins"],
+            "updated": stats["n_tup_upd"],
+            "deleted": stats["n_tup_del"],
+            "modified_since_analyze": stats["n_mod_since_analyze"],
+            "seq_scans": stats["seq_scan"],
+            "index_scans": stats["idx_scan"],
+            "last_vacuum": max(filter(None, [stats["last_vacuum"], stats["last_autovacuum"]]), default=None),
+            "last_analyze": max(filter(None, [stats["last_analyze"], stats["last_autoanalyze"]]), default=None),
+        }
+
+        if request.exact_count:
+            timeout_ms = min(request.exact_count_timeout_ms or EXACT_COUNT_TIMEOUT_MS, MAX_EXACT_COUNT_TIMEOUT_MS)
+            async with admit(request, raw_request):
+                data["exact_count"] = await run_until_disconnected(
+                    raw_request, exact_row_count(pool, request.tablename, timeout_ms)
+                )
+            data["exact_count_timed_out"] = data["exact_count"] is None
+
+        return create_success_response("Table statistics retrieved successfully", data)
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error reading table statistics: {str(e)}")
+        raise HTTPException(
+            status_code=500,
+            detail=create_error_response("Failed to get table statistics", str(e))
+        )
+
+
+def invalidate_table_profile(pool_key: str, tablename: str):
+    table_profile_cache.pop((pool_key, tablename), None)
+
+
+def invalidate_distinct_values(pool_key: str, tablename: str):
+    for key in [key for key in distinct_values_cache if key[:2] == (pool_key, tablename)]:
+        del distinct_values_cache[key]
+
+
+table_write_listeners.append(invalidate_table_profile)
+table_write_listeners.append(invalidate_distinct_values)
+
+
+def stats_are_stale(stats: dict, rows: int) -> bool:
+    """True when the table was never analyzed or too much of it changed since"""
+    if not (stats["last_analyze"] or stats["last_autoanalyze"]):
+        return True
+    return (stats["n_mod_since_analyze"] or 0) > STALE_FRACTION * max(rows, 1)
+
+
+async def read_column_stats(pool, tablename: str) -> dict:
+    rows = await execute_query(pool, """
+        SELECT attname, null_frac, n_distinct, avg_width, correlation,
+               most_common_vals::text::text[] AS most_common_vals, most_common_freqs,
+               histogram_bounds::text::text[] AS histogram_bounds
+        FROM pg_stats
+        WHERE schemaname = 'public' AND tablename = $1
+    """, (tablename,))
+    return {row["attname"]: row for row in rows}
+
+
+def profile_from_pg_stats(row: dict, rows: int) -> dict:
+    n_distinct = row["n_distinct"]
+    # Negative n_distinct is minus the fraction of rows that are distinct, so it scales with the table
+    distinct = -n_distinct * rows if n_distinct < 0 else n_distinct
+    return {
+        "null_frac": row["null_frac"],
+        "n_distinct": int(round(distinct)),
+        "most_common_vals": row["most_common_vals"] or [],
+        "most_common_freqs": row["most_common_freqs"] or [],
+        "histogram_bounds": row["histogram_bounds"] or [],
+        "avg_width": row["avg_width"],
+        "correlation": row["correlation"],
+    }
+
+
+async def sample_table(pool, tablename: str, columns: list, rows: int, timeout_ms: int) -> list:
+    """Up to SAMPLE_ROWS rows read with TABLESAMPLE SYSTEM, each column both as-is and as text"""
+    # SYSTEM samples whole pages, so ask for twice the needed fraction to still fill the sample
+    percent = min(100.0, SAMPLE_ROWS * 200.0 / max(rows, 1))
+    select = ", ".join(f'"{column}", "{column}"::text' for column in columns)
+    return await execute_query(
+        pool,
+        f'SELECT {select} FROM "{tablename}" TABLESAMPLE SYSTEM ($1) LIMIT {SAMPLE_ROWS}',
+        (percent,),
+        timeout_ms=timeout_ms
+    )
+
+
+def estimate_distinct(counts: Counter, sampled: int, total: int) -> int:
+    """Haas-Stokes estimator, the one ANALYZE uses, scaling distinct values in a sample to the table"""
+    seen = len(counts)
+    if sampled == 0:
+        return 0
+    once = sum(1 for count in counts.values() if count == 1)
+    if sampled >= total or once == 0:
+        return seen
+    if once == sampled:
+        # Every sampled value was unique; assume the column is too
+        return total
+    estimate = sampled * seen / (sampled - once + once * sampled / total)
+    return int(round(min(max(estimate, seen), total)))
+
+
+def profile_from_sample(sample: list, index: int, rows: int) -> dict:
+    """pg_stats-shaped profile of the index-th sampled column, values reported as text like pg_stats"""
+    values = [(record[2 * index], record[2 * index + 1]) for record in sample if record[2 * index] is not None]
+    null_frac = 1 - len(values) / len(sample) if sample else 0.0
+    counts = Counter(text for _, text in values)
+    total = int(round(rows * (1 - null_frac)))
+
+    # Like ANALYZE, only values seen more than once can be common
+    common = [(text, count) for text, count in counts.most_common(MOST_COMMON_VALUES) if count > 1]
+    common_texts = {text for text, _ in common}
+    rest = [value for value in values if value[1] not in common_texts]
+    try:
+        rest.sort(key=lambda value: value[0])
+    except TypeError:
+        rest.sort(key=lambda value: value[1])
+    bounds = []
+    if len({text for _, text in rest}) > 1:
+        last = len(rest) - 1
+        positions = sorted({round(i * last / HISTOGRAM_BUCKETS) for i in range(HISTOGRAM_BUCKETS + 1)})
+        bounds = [rest[position][1] for position in positions]
+
+    return {
+        "null_frac": round(null_frac, 6),
+        "n_distinct": estimate_distinct(counts, len(values), max(total, len(values))),
+        "most_common_vals": [text for text, _ in common],
+        "most_common_freqs": [round(count / len(sample), 6) for _, count in common],
+        "histogram_bounds": bounds,
+        "avg_width": None,
+        "correlation": None,
+    }
+
+
+def table_not_found(tablename: str) -> HTTPException:
+    return HTTPException(status_code=404, detail=create_error_response(f"Table '{tablename}' not found"))
+
+
+async def build_table_profile(pool, tablename: str, columns: list, timeout_ms: int) -> dict:
+    stats = await read_table_stats(pool, tablename)
+    if stats is None:
+        # Dropped since its schema was cached
+        raise table_not_found(tablename)
+    rows = estimate_rows(stats)
+    column_stats = await read_column_stats(pool, tablename)
+    stale = stats_are_stale(stats, rows) or any(column not in column_stats for column in columns)
+
+    sampled_rows = None
+    if not stale:
+        profiles = {column: profile_from_pg_stats(column_stats[column], rows) for column in columns}
+        source = "pg_stats"
+    else:
+        sample = await sample_table(pool, tablename, columns, rows, timeout_ms)
+        profiles = await asyncio.to_thread(
+            lambda: {column: profile_from_sample(sample, index, rows) for index, column in enumerate(columns)}
+        )
+        source = "sample"
+        sampled_rows = len(sample)
+
+    return {
+        "tablename": tablename,
+        "source": source,
+        "estimated_rows": rows,
+        "sampled_rows": sampled_rows,
+        "last_analyze": max(filter(None, [stats["last_analyze"], stats["last_autoanalyze"]]), default=None),
+        "modified_since_analyze": stats["n_mod_since_analyze"],
+        "profiled_at": time.time(),
+        "columns": profiles,
+    }
+
+
+@router.post("/tableprofile")
+async def get_table_profile(request: TableProfileRequest, raw_request: Request):
+    """Per-column null fraction, distinct count, most common values and histogram bounds.
+
+    Read from pg_stats when the table has been analyzed recently; otherwise (never
+    analyzed, or more than stale_fraction of rows modified since) estimated from a
+    TABLESAMPLE of sample_rows rows, reported with source "sample". Profiles are
+    cached per table and dropped when the table is written through this API.
+    """
+    timeout_ms = None
+    try:
+        pool = await get_connection_pool(request)
+        schema = await get_cached_table_schema(request, pool, request.tablename)
+        if not schema:
+            raise HTTPException(status_code=404, detail=create_error_response(f"Table '{request.tablename}' not found"))
+        # Internal search and change-tracking columns are neither profiled nor accepted
+        columns = data_columns(schema)
+        if request.columns:
+            unknown = [column for column in request.columns if column not in columns]
+            if unknown:
+                raise HTTPException(
+                    status_code=400,
+                    detail=create_error_response("Unknown columns", ", ".join(unknown))
+                )
+
+        key = (get_pool_key(request), request.tablename)
+        entry = table_profile_cache.get(key)
+        hit = not request.refresh and entry is not None and entry[0] > time.time()
+        record_cache_lookup("table_profile", hit)
+        if hit:
+            profile = entry[1]
+        else:
+            timeout_ms, _ = await get_query_limits(request)
+            async with admit(request, raw_request):
+                profile = await run_until_disconnected(
+                    raw_request, build_table_profile(pool, request.tablename, columns, timeout_ms)
+                )
+            table_profile_cache[key] = (time.time() + PROFILE_CACHE_SECONDS, profile)
+
+        wanted = request.columns or columns
+        data = dict(profile, cached=hit, columns=[
+            {"column": column, **profile["columns"][column]} for column in wanted if column in profile["columns"]
+        ])
+        return create_success_response("Table profile retrieved successfully", data)
+
+    except HTTPException:
+        raise
+    except (asyncpg.exceptions.QueryCanceledError, asyncio.TimeoutError):
+        raise_timeout_error(timeout_ms)
+    except Exception as e:
+        logger.error(f"Error profiling table: {str(e)}")
+        raise HTTPException(
+            status_code=500,
+            detail=create_error_response("Failed to profile table", str(e))
+        )
+
+
+def get_cached_distinct_values(column_key: tuple, lookup: tuple):
+    entries = distinct_values_cache.get(column_key)
+    entry = entries.get(lookup) if entries is not None else None
+    hit = entry is not None and entry[0] > time.time()
+    record_cache_lookup("distinct_values", hit)
+    if not hit:
+        return None
+    distinct_values_cache.move_to_end(column_key)
+    return entry[1]
+
+
+def cache_distinct_values(column_key: tuple, lookup: tuple, result: dict):
+    entries = distinct_values_cache.setdefault(column_key, {})
+    entries[lookup] = (time.time() + DISTINCT_CACHE_SECONDS, result)
+    distinct_values_cache.move_to_end(column_key)
+    while len(distinct_values_cache) > DISTINCT_CACHE_COLUMNS:
+        distinct_values_cache.popitem(last=False)
+
+
+async def has_leading_btree_index(pool, tablename: str, column: str) -> bool:
+    """Whether some btree index on the table starts with column, so grouping by it need not sort the heap"""
+    rows = await execute_query(pool, """
+        SELECT 1
+        FROM pg_index i
+        JOIN pg_class c ON c.oid = i.indexrelid
+        JOIN pg_am am ON am.oid = c.relam
+        JOIN pg_attribute a ON a.attrelid = i.indrelid AND a.attnum = i.indkey[0]
+        WHERE i.indrelid = to_regclass(quote_ident($1)) AND a.attname = $2 AND am.amname = 'btree'
+        LIMIT 1
+    """, (tablename, column))
+    return bool(rows)
+
+
+def escape_like(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+async def count_distinct_values(pool, request: DistinctValuesRequest, column_type: str, limit: int,
+                                timeout_ms: int, percent=None):
+    """GROUP BY count of the column's non-null values, over a TABLESAMPLE of percent when given"""
+    params = []
+    conditions = [f'"{request.column}" IS NOT NULL']
+    if request.prefix:
+        params.append(escape_like(request.prefix) + "%")
+        operator = "LIKE" if request.case_sensitive else "ILIKE"
+        # Text columns are compared as they are, so a btree index on them stays usable
+        cast = "" if column_type in TEXT_TYPES else "::text"
+        conditions.append(f'"{request.column}"{cast} {operator} ${len(params)}')
+    sample = ""
+    if percent is not None:
+        params.append(percent)
+        sample = f" TABLESAMPLE SYSTEM (${len(params)})"
+    values = await execute_query(
+        pool,
+        f'SELECT "{request.column}"::text AS value, count(*) AS count '
+        f'FROM "{request.tablename}"{sample} '
+        f'WHERE {" AND ".join(conditions)} '
+        f'GROUP BY "{request.column}" ORDER BY count DESC, value LIMIT {int(limit)}',
+        tuple(params),
+        timeout_ms=timeout_ms
+    )
+    if percent is not None:
+        # Scale sampled counts up to the whole table
+        values = [{"value": row["value"], "count": int(round(row["count"] * 100 / percent))} for row in values]
+    return values
+
+
+async def query_distinct_values(pool, request: DistinctValuesRequest, column_type: str, limit: int,
+                                timeout_ms: int) -> dict:
+    """Most frequent values of a column, counted exactly when a small table or a btree index makes
+    that cheap and estimated from a TABLESAMPLE otherwise.
+
+    The index only helps with no prefix or a case-sensitive prefix on a text column;
+    ILIKE and casts to text cannot use it. An exact count that does not finish within
+    exact_count_timeout_ms falls back to the sample instead of failing the request.
+    """
+    stats = await read_table_stats(pool, request.tablename)
+    if stats is None:
+        raise table_not_found(request.tablename)
+    rows = estimate_rows(stats)
+    indexable = not request.prefix or (request.case_sensitive and column_type in TEXT_TYPES)
+    if rows <= SAMPLE_ROWS:
+        source = "scan"
+    elif indexable and await has_leading_btree_index(pool, request.tablename, request.column):
+        source = "index"
+    else:
+        source = None
+
+    if source is not None:
+        try:
+            values = await count_distinct_values(
+                pool, request, column_type, limit, min(EXACT_COUNT_TIMEOUT_MS, timeout_ms)
+            )
+            return {"values": values, "source": source, "exact": True, "approximate": False}
+        except (asyncpg.exceptions.QueryCanceledError, asyncio.TimeoutError):
+            logger.warning(f"Exact distinct values of {request.tablename}.{request.column} timed out; sampling")
+
+    percent = min(100.0, SAMPLE_ROWS * 100.0 / max(rows, 1))
+    values = await count_distinct_values(pool, request, column_type, limit, timeout_ms, percent)
+    return {"values": values, "source": "sample", "exact": False, "approximate": True}
+
+
+@router.post("/distinctvalues")
+async def get_distinct_values(request: DistinctValuesRequest, raw_request: Request):
+    """Distinct values of a column with their counts, most frequent first, for filter dropdowns and typeahead.
+
+    Counts are exact when the table is small or the column leads a btree index the
+    filter can use, and estimated from a TABLESAMPLE otherwise or when the exact count
+    runs too long (approximate is true). Results are cached per column, least
+    recently used first out, and dropped when the table is written.
+    """
+    limit = min(request.limit or DISTINCT_DEFAULT_LIMIT, DISTINCT_MAX_LIMIT)
+    timeout_ms = None
+    try:
+        pool = await get_connection_pool(request)
+        schema = await get_cached_table_schema(request, pool, request.tablename)
+        if not schema:
+            raise HTTPException(status_code=404, detail=create_error_response(f"Table '{request.tablename}' not found"))
+        if request.column not in data_columns(schema):
+            raise HTTPException(status_code=400, detail=create_error_response("Unknown column", request.column))
+        column_type = next(row["data_type"] for row in schema if row["column_name"] == request.column)
+
+        column_key = (get_pool_key(request), request.tablename, request.column)
+        lookup = (request.prefix or "", request.case_sensitive, limit)
+        result = get_cached_distinct_values(column_key, lookup)
+        cached = result is not None
+        if not cached:
+            timeout_ms, _ = await get_query_limits(request)
+            async with admit(request, raw_request):
+                result = await run_until_disconnected(
+                    raw_request, query_distinct_values(pool, request, column_type, limit, timeout_ms)
+                )
+            cache_distinct_values(column_key, lookup, result)
+
+        return create_success_response(
+            f"{len(result['values'])} distinct value(s) retrieved",
+            dict(result, tablename=request.tablename, column=request.column, prefix=request.prefix, cached=cached)
+        )
+
+    except HTTPException:
+        raise
+    except (asyncpg.exceptions.QueryCanceledError, asyncio.TimeoutError):
+        raise_timeout_error(timeout_ms)
+    except Exception as e:
+        logger.error(f"Error reading distinct values: {str(e)}")
+        raise HTTPException(
+            status_code=500,
+            detail=create_error_response("Failed to get distinct values", str(e))
+        )
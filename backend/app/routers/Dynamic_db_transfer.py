@@ -0,0 +1,425 @@
+from fastapi import APIRouter, HTTPException, Request, Form, File, UploadFile
+from typing import Optional
+from collections import OrderedDict
+from contextlib import AsyncExitStack
+import anyio
+import asyncpg
+import asyncio
+import codecs
+import csv
+import io
+import json
+import time
+import uuid
+import zlib
+import os
+from app.schemas.Dynamic_db_schema import DatabaseConfig, ExportDataRequest
+from app.routers.Dynamic_db import (
+    get_connection_pool, get_cached_table_schema, get_query_limits, admit, run_until_disconnected,
+    create_success_response, create_error_response, raise_timeout_error, parse_affected_rows,
+    build_fetch_query, apply_row_cap, notify_table_write, writable_columns, MAX_STATEMENT_TIMEOUT_MS
+)
+from app.utils.logger import LoggerSetup
+from app.utils.config_reader import config as app_config
+from app.utils.query_log import record_query
+from app.utils.responses import ManagedStreamingResponse
+
+
+logger = LoggerSetup.setup_logger('dynamic_db_transfer', os.path.join(os.getcwd(), 'logs'))
+conf = app_config["transfer"]
+
+IMPORT_CHUNK_BYTES = int(conf["import_chunk_bytes"])
+COPY_TIMEOUT_MS = int(conf["copy_timeout_ms"])
+IMPORT_HISTORY = int(conf["import_history"])
+EXPORT_CHUNK_BYTES = int(conf["export_chunk_bytes"])
+EXPORT_QUEUE_CHUNKS = int(conf["export_queue_chunks"])
+GZIP_LEVEL = int(conf["gzip_level"])
+
+DELIMITERS = {"csv": ",", "tsv": "\t"}
+EXPORT_MEDIA_TYPES = {"csv": "text/csv", "tsv": "text/tab-separated-values", "binary": "application/octet-stream"}
+
+# Types whose text form is a valid value even when empty; every other column gets FORCE_NULL
+TEXT_TYPES = {"text", "character varying", "character", "json", "jsonb"}
+
+# Progress of running and recently finished imports, oldest first
+import_jobs = OrderedDict()
+
+router = APIRouter(prefix="/Dynamic_db")
+
+
+def parse_column_mapping(column_mapping: Optional[str]) -> dict:
+    """Decode the {file column: table column} JSON form field"""
+    if not column_mapping:
+        return {}
+    try:
+        mapping = json.loads(column_mapping)
+    except ValueError:
+        mapping = None
+    if not isinstance(mapping, dict) or not all(isinstance(v, str) for v in mapping.values()):
+        raise HTTPException(
+            status_code=400,
+            detail=create_error_response("Invalid column_mapping", "Expected a JSON object of file column to table column")
+        )
+    return mapping
+
+
+def get_copy_timeout(config: DatabaseConfig) -> int:
+    """statement_timeout for an import or export COPY: the request's override, else copy_timeout_ms.
+
+    Copies of large tables run far longer than regular queries, and an export also
+    waits on its client, so the project's query timeout does not apply to them.
+    """
+    if config.statement_timeout_ms:
+        return min(config.statement_timeout_ms, MAX_STATEMENT_TIMEOUT_MS)
+    return COPY_TIMEOUT_MS
+
+
+def get_upload_decoder(encoding: str):
+    """Incremental decoder for the upload, or None when it is UTF-8 and can go to COPY as is"""
+    if codecs.lookup(encoding).name == "utf-8":
+        return None
+    return codecs.getincrementaldecoder(encoding)()
+
+
+def read_header(file, delimiter: str, encoding: str, decoder) -> tuple:
+    """Read and parse the first record of the upload.
+
+    Returns the column names and the UTF-8 data read past the header, which goes to
+    COPY first. Other encodings are decoded through the upload's incremental
+    decoder, so multi-byte encodings such as UTF-16 stay aligned for the rest.
+    """
+    try:
+        if decoder is None:
+            text, rest = file.readline().decode("utf-8"), ""
+        else:
+            text = ""
+            while "\n" not in text:
+                raw = file.read(IMPORT_CHUNK_BYTES)
+                text += decoder.decode(raw, final=not raw)
+                if not raw:
+                    break
+            text, _, rest = text.partition("\n")
+    except UnicodeDecodeError:
+        raise HTTPException(status_code=400, detail=create_error_response("Header row is not valid " + encoding))
+    names = next(csv.reader(io.StringIO(text.lstrip("\ufeff")), delimiter=delimiter), [])
+    return names, rest.encode("utf-8")
+
+
+def resolve_import_columns(file_columns: list, mapping: dict, schema: list) -> list:
+    """Map file columns onto table columns, rejecting names the table does not have or that are generated"""
+    table_columns = {row["column_name"] for row in schema}
+    columns = [mapping.get(name, name).strip() for name in file_columns]
+    unknown = [name for name in columns if name not in table_columns]
+    if unknown:
+        raise HTTPException(
+            status_code=400,
+            detail=create_error_response("Unknown columns", f"Table has no column(s): {', '.join(unknown)}")
+        )
+    writable = set(writable_columns(schema))
+    generated = [name for name in columns if name not in writable]
+    if generated:
+        raise HTTPException(
+            status_code=400,
+            detail=create_error_response("Generated columns cannot be imported", ", ".join(generated))
+        )
+    if len(set(columns)) != len(columns):
+        raise HTTPException(status_code=400, detail=create_error_response("Duplicate columns in import"))
+    return columns
+
+
+def start_import_job(import_id: str, tablename: str, total_bytes: int) -> dict:
+    while len(import_jobs) >= IMPORT_HISTORY:
+        oldest = next(iter(import_jobs))
+        if import_jobs[oldest]["status"] == "running":
+            break
+        import_jobs.pop(oldest)
+    job = import_jobs[import_id] = {
+        "import_id": import_id, "tablename": tablename, "status": "running",
+        "bytes": 0, "total_bytes": total_bytes, "rows": 0, "started_at": time.time(), "elapsed_seconds": 0.0,
+    }
+    return job
+
+
+async def stream_upload(file, job: dict, decoder, pending: bytes):
+    """Yield pending and then the rest of the upload in chunks, transcoded to UTF-8, tracking progress in job"""
+    if pending:
+        job["rows"] += pending.count(b"\n")
+        yield pending
+    while True:
+        # The spooled upload may live on disk; keep the read off the event loop
+        raw = await asyncio.to_thread(file.read, IMPORT_CHUNK_BYTES)
+        job["bytes"] += len(raw)
+        job["elapsed_seconds"] = round(time.time() - job["started_at"], 3)
+        chunk = decoder.decode(raw, final=not raw).encode("utf-8") if decoder is not None else raw
+        # Approximate until COPY reports the exact count (quoted fields may contain newlines)
+        job["rows"] += chunk.count(b"\n")
+        if chunk:
+            yield chunk
+        if not raw:
+            return
+
+
+async def copy_upload(pool, tablename: str, columns: list, upload, job: dict, delimiter: str, decoder,
+                      pending: bytes, force_null: list, timeout_ms: int) -> int:
+    async with pool.acquire() as conn:
+        # No client-side timeout: statement_timeout bounds the COPY when one is set,
+        # and a client disconnect cancels it through run_until_disconnected
+        await conn.execute(f"SET statement_timeout = {int(timeout_ms)}")
+        start = time.perf_counter()
+        status = await conn.copy_to_table(
+            tablename,
+            source=stream_upload(upload, job, decoder, pending),
+            columns=columns,
+            format="csv",
+            delimiter=delimiter,
+            force_null=force_null or None
+        )
+        record_query(f'COPY "{tablename}" FROM STDIN', None, time.perf_counter() - start, "asyncpg")
+        return parse_affected_rows(status)
+
+
+@router.post("/import")
+async def import_file(
+    raw_request: Request,
+    host: str = Form(...),
+    user: str = Form(...),
+    password: str = Form(...),
+    database: str = Form(...),
+    tablename: str = Form(...),
+    file: UploadFile = File(...),
+    port: int = Form(5432),
+    file_format: str = Form("csv", alias="format"),
+    has_header: bool = Form(True),
+    column_mapping: Optional[str] = Form(None),
+    columns: Optional[str] = Form(None),
+    encoding: str = Form("utf-8"),
+    import_id: Optional[str] = Form(None),
+    statement_timeout_ms: Optional[int] = Form(None, gt=0),
+):
+    """Load a CSV or TSV upload into a table with COPY FROM STDIN.
+
+    The upload is spooled to disk by the multipart parser and streamed to Postgres
+    in chunks, so memory use does not grow with the file. Header names (or the
+    comma-separated ``columns`` field when there is no header) are renamed through
+    ``column_mapping`` and checked against the table's cached schema; Postgres
+    converts each field to its column type. The COPY runs under copy_timeout_ms
+    rather than the project's query timeout. Progress can be polled at
+    /Dynamic_db/import/{import_id} while the COPY runs.
+    """
+    delimiter = DELIMITERS.get(file_format.lower())
+    if delimiter is None:
+        raise HTTPException(status_code=400, detail=create_error_response("Unsupported format", "Use csv or tsv"))
+    try:
+        codecs.lookup(encoding)
+    except LookupError:
+        raise HTTPException(status_code=400, detail=create_error_response("Unknown encoding", encoding))
+
+    config = DatabaseConfig(host=host, port=port, user=user, password=password, database=database,
+                            statement_timeout_ms=statement_timeout_ms)
+    import_id = import_id or uuid.uuid4().hex
+    if import_jobs.get(import_id, {}).get("status") == "running":
+        raise HTTPException(status_code=409, detail=create_error_response("Import already running", import_id))
+    job = None
+    timeout_ms = get_copy_timeout(config)
+    try:
+        mapping = parse_column_mapping(column_mapping)
+        pool = await get_connection_pool(config)
+        schema = await get_cached_table_schema(config, pool, tablename)
+        if not schema:
+            raise HTTPException(status_code=404, detail=create_error_response(f"Table '{tablename}' not found"))
+
+        upload = file.file
+        upload.seek(0, io.SEEK_END)
+        file_size = upload.tell()
+        upload.seek(0)
+        decoder = get_upload_decoder(encoding)
+        pending = b""
+        if has_header:
+            file_columns, pending = await asyncio.to_thread(read_header, upload, delimiter, encoding, decoder)
+        elif columns:
+            file_columns = [name.strip() for name in columns.split(",")]
+        else:
+            file_columns = writable_columns(schema)
+        target_columns = resolve_import_columns(file_columns, mapping, schema)
+        data_types = {row["column_name"]: row["data_type"] for row in schema}
+        force_null = [name for name in target_columns if data_types[name] not in TEXT_TYPES]
+
+        job = start_import_job(import_id, tablename, file_size - upload.tell())
+        async with admit(config, raw_request):
+            rows = await run_until_disconnected(raw_request, copy_upload(
+                pool, tablename, target_columns, upload, job, delimiter, decoder, pending, force_null, timeout_ms
+            ))
+        notify_table_write(config, tablename)
+
+        job.update(status="completed", rows=rows, elapsed_seconds=round(time.time() - job["started_at"], 3))
+        logger.info(f"Imported {rows} rows ({job['bytes']} bytes) into {tablename} in {job['elapsed_seconds']}s")
+        return create_success_response(
+            f"Imported {rows} rows into '{tablename}'",
+            {
+                "import_id": import_id,
+                "rows": rows,
+                "bytes": job["bytes"],
+                "elapsed_seconds": job["elapsed_seconds"],
+                "rows_per_second": round(rows / job["elapsed_seconds"], 1) if job["elapsed_seconds"] else None,
+                "columns": target_columns,
+            }
+        )
+    except HTTPException as e:
+        if job is not None:
+            job.update(status="failed", error=str(e.detail))
+        raise
+    except (asyncpg.exceptions.QueryCanceledError, asyncio.TimeoutError):
+        if job is not None:
+            job.update(status="failed", error="timeout")
+        raise_timeout_error(timeout_ms)
+    except Exception as e:
+        if job is not None:
+            job.update(status="failed", error=str(e))
+        logger.error(f"Failed to import into {tablename}: {str(e)}")
+        raise HTTPException(
+            status_code=500,
+            detail=create_error_response("Failed to import file", str(e))
+        )
+    finally:
+        await file.close()
+
+
+@router.get("/import/{import_id}")
+async def get_import_progress(import_id: str):
+    """Progress of a running or recently finished import"""
+    job = import_jobs.get(import_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=create_error_response("Import not found"))
+    if job["status"] == "running":
+        job["elapsed_seconds"] = round(time.time() - job["started_at"], 3)
+    return create_success_response("Import progress", job)
+
+
+# Marks the end of COPY output on an export queue
+COPY_DONE = object()
+
+
+async def copy_query_to_queue(conn, query: str, params: list, queue: asyncio.Queue, request: ExportDataRequest,
+                              timeout_ms: int):
+    """Run COPY (query) TO STDOUT, handing output to queue; a full queue pauses the COPY"""
+    options = {"format": "binary"} if request.format == "binary" else {
+        "format": "csv", "delimiter": DELIMITERS[request.format], "header": request.header
+    }
+    try:
+        # The COPY is paused while a slow client drains the queue, so it gets no client-side
+        # timeout; a disconnect cancels it when the response is released
+        await conn.execute(f"SET statement_timeout = {int(timeout_ms)}")
+        start = time.perf_counter()
+        await conn.copy_from_query(query, *params, output=queue.put, **options)
+        record_query(f"COPY ({query}) TO STDOUT", params, time.perf_counter() - start, "asyncpg")
+        await queue.put(COPY_DONE)
+    except Exception as e:
+        await queue.put(e)
+
+
+async def release_export(copy_task: Optional[asyncio.Task], stack: AsyncExitStack):
+    """Cancel the COPY and return its connection and admission slot; safe to call more than once.
+
+    Shielded, because it runs while the request is being cancelled after a client disconnect.
+    """
+    with anyio.CancelScope(shield=True):
+        if copy_task is not None:
+            copy_task.cancel()
+            await asyncio.gather(copy_task, return_exceptions=True)
+        await stack.aclose()
+
+
+async def stream_export(queue: asyncio.Queue, first, compress: bool, tablename: str):
+    """Response body for an export: coalesce COPY output into chunks, optionally gzip it"""
+    compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31) if compress else None
+    buffer = bytearray()
+    sent = 0
+    try:
+        item = first
+        while item is not COPY_DONE:
+            if isinstance(item, BaseException):
+                raise item
+            buffer += item
+            if len(buffer) >= EXPORT_CHUNK_BYTES:
+                chunk = compressor.compress(bytes(buffer)) if compressor else bytes(buffer)
+                buffer.clear()
+                if chunk:
+                    sent += len(chunk)
+                    yield chunk
+            item = await queue.get()
+        tail = bytes(buffer)
+        if compressor:
+            tail = compressor.compress(tail) + compressor.flush()
+        if tail:
+            sent += len(tail)
+            yield tail
+        logger.info(f"Exported {tablename}: {sent} bytes sent")
+    except Exception as e:
+        # Raising after the response has started makes the server drop the connection
+        # without the final chunk, so clients see a broken transfer rather than a short file
+        logger.error(f"Export of {tablename} failed mid-stream after {sent} bytes: {str(e)}")
+        raise
+
+
+@router.post("/export")
+async def export_data(request: ExportDataRequest, raw_request: Request):
+    """Stream a table (or a filtered, ordered slice of it) as CSV, TSV or binary COPY output.
+
+    Takes the same where/order_by/limit/offset as /dbfetch. Generated columns are
+    left out so the file can be imported back. Rows go from COPY TO STDOUT to the
+    response through a small bounded queue, so memory use is constant regardless
+    of table size and a slow client pauses the query. The COPY runs under
+    copy_timeout_ms rather than the project's query timeout; if it fails after
+    streaming has started, the connection is aborted so the file is not mistaken
+    for a complete one.
+    """
+    stack = AsyncExitStack()
+    timeout_ms = None
+    copy_task = None
+    streaming = False
+    try:
+        pool = await get_connection_pool(request)
+        _, max_rows = await get_query_limits(request)
+        timeout_ms = get_copy_timeout(request)
+        schema = await get_cached_table_schema(request, pool, request.tablename)
+        if not schema:
+            raise HTTPException(status_code=404, detail=create_error_response(f"Table '{request.tablename}' not found"))
+        columns = writable_columns(schema)
+        query, params = build_fetch_query(
+            request.tablename, request.where, request.order_by,
+            apply_row_cap(request.limit, max_rows), request.offset,
+            columns if len(columns) < len(schema) else None
+        )
+
+        # The slot and connection are held until the body finishes streaming
+        await stack.enter_async_context(admit(request, raw_request))
+        conn = await stack.enter_async_context(pool.acquire())
+        queue = asyncio.Queue(maxsize=EXPORT_QUEUE_CHUNKS)
+        copy_task = asyncio.create_task(copy_query_to_queue(conn, query, params, queue, request, timeout_ms))
+        # Wait for the first chunk so errors such as an unknown column still get a proper status code
+        first = await run_until_disconnected(raw_request, queue.get())
+        if isinstance(first, BaseException):
+            raise first
+        streaming = True
+    except HTTPException:
+        raise
+    except (asyncpg.exceptions.QueryCanceledError, asyncio.TimeoutError):
+        raise_timeout_error(timeout_ms)
+    except Exception as e:
+        logger.error(f"Error exporting data: {str(e)}")
+        raise HTTPException(
+            status_code=500,
+            detail=create_error_response("Failed to export data", str(e))
+        )
+    finally:
+        if not streaming:
+            await release_export(copy_task, stack)
+
+    extension = "bin" if request.format == "binary" else request.format
+    filename = f"{request.tablename}.{extension}" + (".gz" if request.gzip else "")
+    return ManagedStreamingResponse(
+        stream_export(queue, first, request.gzip, request.tablename),
+        cleanup=lambda: release_export(copy_task, stack),
+        media_type="application/gzip" if request.gzip else EXPORT_MEDIA_TYPES[request.format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
@@ -1,10 +1,12 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlmodel import Session, select
 from app.models.users import User
 from app.database import engine
 from app.utils.jwt import get_current_user
 from app.schemas.user_schema import UserCreate, UserRead, UserUpdate
 from app.utils.logger import LoggerSetup
+from app.utils.query_log import slow_query_stats
+from app.utils.loop_monitor import loop_monitor
 import os
 
 router = APIRouter(prefix="/admin", tags=["Admin"])
@@ -136,4 +138,22 @@ def delete_user(user_id: int, current_user: User = Depends(get_current_user)):
             return {"message": "User deleted successfully"}
     except Exception as e:
         logger.error(f"Error deleting user {user_id} by admin {current_user.id}: {str(e)}")
-        raise
\ No newline at end of file
+        raise
+
+
+@router.get("/slow-queries")
+def get_slow_queries(
+    limit: int = Query(20, ge=1, le=200),
+    order_by: str = Query("max_ms", pattern="^(max_ms|total_ms|avg_ms|count)$"),
+    current_user: User = Depends(get_current_user)
+):
+    """List the slowest statement shapes seen by both the SQLAlchemy and Dynamic_db query paths"""
+    is_admin(current_user)
+    return {"statements": slow_query_stats.top(limit, order_by)}
+
+
+@router.get("/event-loop")
+async def get_event_loop_stalls(current_user: User = Depends(get_current_user)):
+    """Recent event-loop lag samples and stack snapshots of callbacks that blocked the loop"""
+    is_admin(current_user)
+    return loop_monitor.snapshot()
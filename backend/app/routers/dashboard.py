@@ -0,0 +1,164 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from typing import Optional
+import asyncio
+import time
+import os
+from app.models.users import User
+from app.models.project import Project, ProjectTeam
+from app.database import SessionLocal
+from app.schemas.Dynamic_db_schema import ListTablesRequest, TableSchemaRequest
+from app.routers import Dynamic_db
+from app.routers.user import load_user_profile
+from app.utils.jwt import get_current_user
+from app.utils.permissions import get_permissions_payload
+from app.utils.config_reader import config
+from app.utils.responses import FastJSONResponse
+from app.utils.logger import LoggerSetup
+
+router = APIRouter(prefix="/dashboard")
+logger = LoggerSetup.setup_logger('dashboard', os.path.join(os.getcwd(), 'logs'))
+
+conf = config["bootstrap"]
+PART_TIMEOUT = float(conf["part_timeout"])
+
+
+def load_permissions(user_id: int) -> dict:
+    """Same payload as GET /user/permissions"""
+    db = SessionLocal()
+    try:
+        return get_permissions_payload(db.get(User, user_id), db)
+    finally:
+        db.close()
+
+
+def load_profile(user_id: int) -> dict:
+    """Same payload as GET /user/me"""
+    db = SessionLocal()
+    try:
+        return load_user_profile(db, user_id).model_dump()
+    finally:
+        db.close()
+
+
+def is_project_member(user: User, project_id: int) -> bool:
+    """Whether the user owns the project or is on its team; admins can open any project"""
+    if user.role_id == 2:
+        return True
+    db = SessionLocal()
+    try:
+        project = db.get(Project, project_id)
+        if project is None:
+            return False
+        if project.owner_id == user.id:
+            return True
+        return db.query(ProjectTeam).filter(
+            ProjectTeam.project_id == project_id, ProjectTeam.user_id == user.id
+        ).first() is not None
+    finally:
+        db.close()
+
+
+async def load_databases(project_id: int, user: User) -> dict:
+    """The project's databases with their connection settings, for members of the project only"""
+    if not await asyncio.to_thread(is_project_member, user, project_id):
+        raise HTTPException(status_code=403, detail="Not a member of this project")
+    return (await Dynamic_db.get_project_databases(project_id))["data"]
+
+
+def without_passwords(databases: list) -> list:
+    return [{key: value for key, value in database.items() if key != "password"} for database in databases]
+
+
+async def run_part(name: str, coro) -> dict:
+    """Await one part of the bootstrap payload, capturing its result or error and how long it took"""
+    start = time.perf_counter()
+    try:
+        result = {"ok": True, "data": await asyncio.wait_for(coro, timeout=PART_TIMEOUT)}
+    except asyncio.TimeoutError:
+        result = {"ok": False, "error": f"Timed out after {PART_TIMEOUT}s"}
+    except HTTPException as e:
+        result = {"ok": False, "error": e.detail, "status_code": e.status_code}
+    except Exception as e:
+        logger.error(f"Bootstrap part '{name}' failed: {str(e)}")
+        result = {"ok": False, "error": str(e)}
+    result["duration_ms"] = round((time.perf_counter() - start) * 1000, 2)
+    return result
+
+
+def skipped_part(reason: str) -> dict:
+    return {"ok": False, "skipped": True, "error": reason, "duration_ms": 0.0}
+
+
+def select_database(databases: list, database_id: Optional[int]):
+    """The database the dashboard opens: the requested one, or the project's only database"""
+    if database_id is not None:
+        return next((db for db in databases if db["id"] == database_id), None)
+    return databases[0] if len(databases) == 1 else None
+
+
+async def unwrap(coro):
+    """Data of a Dynamic_db success response"""
+    return (await coro)["data"]
+
+
+@router.get("/bootstrap/{project_id}")
+async def bootstrap(
+    project_id: int,
+    database_id: Optional[int] = Query(None, description="Project database to open; defaults to the only one"),
+    tablename: Optional[str] = Query(None, description="Table whose schema to include"),
+    current_user: User = Depends(get_current_user)
+):
+    """Everything ProjectDashboard loads on mount, gathered concurrently in one response.
+
+    Each part reports ok/error and its duration independently, so one failing
+    part (e.g. an unreachable project database) does not fail the others. Tables
+    and schema depend on the selected database and are skipped when it is unknown.
+    Databases are only listed to members of the project, and never with passwords.
+    """
+    start = time.perf_counter()
+    permissions = asyncio.create_task(run_part("permissions", asyncio.to_thread(load_permissions, current_user.id)))
+    me = asyncio.create_task(run_part("me", asyncio.to_thread(load_profile, current_user.id)))
+
+    databases = await run_part("databases", load_databases(project_id, current_user))
+    selected = None
+    if databases["ok"]:
+        selected = select_database(databases["data"]["databases"], database_id)
+        databases["data"]["databases"] = without_passwords(databases["data"]["databases"])
+    if selected is None:
+        reason = "Project databases unavailable" if not databases["ok"] else "No database selected"
+        tables = schema = skipped_part(reason)
+    else:
+        target = dict(host=selected["host"], port=selected["port"], user=selected["user"],
+                      password=selected["password"], database=selected["dbname"])
+        table_parts = [run_part("tables", unwrap(Dynamic_db.list_tables(ListTablesRequest(**target))))]
+        if tablename:
+            table_parts.append(run_part("schema", unwrap(
+                Dynamic_db.get_table_schema(TableSchemaRequest(**target, tablename=tablename))
+            )))
+        results = await asyncio.gather(*table_parts)
+        tables = results[0]
+        schema = results[1] if tablename else skipped_part("No table selected")
+
+    parts = {
+        "permissions": await permissions,
+        "me": await me,
+        "databases": databases,
+        "tables": tables,
+        "schema": schema,
+    }
+    duration_ms = round((time.perf_counter() - start) * 1000, 2)
+    failed = [name for name, part in parts.items() if not part["ok"] and not part.get("skipped")]
+    if failed:
+        logger.warning(f"Bootstrap for project {project_id} returned partial data, failed parts: {failed}")
+    server_timing = ", ".join(f"{name};dur={part['duration_ms']}" for name, part in parts.items())
+    return FastJSONResponse(
+        {
+            "project_id": project_id,
+            "database_id": selected["id"] if selected else None,
+            "complete": not failed,
+            "failed": failed,
+            "duration_ms": duration_ms,
+            "parts": parts,
+        },
+        headers={"Server-Timing": f"{server_timing}, total;dur={duration_ms}"}
+    )
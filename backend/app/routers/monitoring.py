@@ -0,0 +1,130 @@
+import asyncio
+import time
+from fastapi import APIRouter
+from fastapi.responses import JSONResponse, PlainTextResponse
+from sqlalchemy import text
+from app.database import engine
+from app.routers.Dynamic_db import connection_pools
+from app.utils.config_reader import config
+from app.utils.metrics import registry, database_label
+from app.utils.loop_monitor import loop_monitor
+
+router = APIRouter()
+
+conf = config["health"]
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+STARTED_AT = time.time()
+
+_live_cache = {"expires": 0.0, "body": None}
+
+
+def _sqlalchemy_pool_collector():
+    """Checked-out, idle and overflow connections of the dashboard SQLAlchemy pool"""
+    pool = engine.pool
+    return [
+        ("sqlalchemy_pool_size", "gauge", "Configured size of the SQLAlchemy pool", [({}, pool.size())]),
+        ("sqlalchemy_pool_checked_out", "gauge", "SQLAlchemy connections currently checked out", [({}, pool.checkedout())]),
+        ("sqlalchemy_pool_checked_in", "gauge", "Idle SQLAlchemy connections in the pool", [({}, pool.checkedin())]),
+        ("sqlalchemy_pool_overflow", "gauge", "SQLAlchemy connections opened beyond pool size", [({}, pool.overflow())]),
+    ]
+
+
+def _asyncpg_pool_collector():
+    """Per-pool sizes of the Dynamic_db asyncpg pools"""
+    sizes, idle, max_sizes = [], [], []
+    for key, pool in list(connection_pools.items()):
+        labels = {"pool": database_label(key)}
+        sizes.append((labels, pool.get_size()))
+        idle.append((labels, pool.get_idle_size()))
+        max_sizes.append((labels, pool.get_max_size()))
+    return [
+        ("asyncpg_pools", "gauge", "Number of Dynamic_db asyncpg pools", [({}, len(connection_pools))]),
+        ("asyncpg_pool_size", "gauge", "Open connections per asyncpg pool", sizes),
+        ("asyncpg_pool_idle", "gauge", "Idle connections per asyncpg pool", idle),
+        ("asyncpg_pool_max_size", "gauge", "Maximum connections per asyncpg pool", max_sizes),
+    ]
+
+
+registry.register_collector(_sqlalchemy_pool_collector)
+registry.register_collector(_asyncpg_pool_collector)
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    """Process metrics in the Prometheus text exposition format"""
+    return PlainTextResponse(registry.render(), media_type=PROMETHEUS_CONTENT_TYPE)
+
+
+def _ping_dashboard_db():
+    with engine.connect() as conn:
+        conn.execute(text("SELECT 1"))
+
+
+async def _check_dashboard_db() -> dict:
+    max_latency_ms = float(conf["max_db_latency_ms"])
+    start = time.perf_counter()
+    try:
+        await asyncio.wait_for(asyncio.to_thread(_ping_dashboard_db), timeout=float(conf["db_timeout"]))
+    except asyncio.TimeoutError:
+        return {"ok": False, "error": "timeout"}
+    except Exception as e:
+        return {"ok": False, "error": str(e)}
+    latency_ms = round((time.perf_counter() - start) * 1000, 2)
+    return {"ok": latency_ms <= max_latency_ms, "latency_ms": latency_ms, "max_latency_ms": max_latency_ms}
+
+
+def _check_sqlalchemy_pool() -> dict:
+    pool = engine.pool
+    capacity = pool.size() + max(getattr(pool, "_max_overflow", 0), 0)
+    headroom = capacity - pool.checkedout()
+    return {"ok": headroom > 0, "checked_out": pool.checkedout(), "capacity": capacity, "headroom": headroom}
+
+
+def _check_dynamic_db_pools() -> dict:
+    max_saturation = float(conf["max_pool_saturation"])
+    saturated = {}
+    for key, pool in list(connection_pools.items()):
+        in_use = pool.get_size() - pool.get_idle_size()
+        saturation = in_use / pool.get_max_size()
+        if saturation >= max_saturation:
+            saturated[database_label(key)] = round(saturation, 2)
+    return {"ok": not saturated, "pools": len(connection_pools), "saturated": saturated, "max_saturation": max_saturation}
+
+
+async def _check_event_loop_lag() -> dict:
+    max_lag_ms = float(conf["max_loop_lag_ms"])
+    lag = loop_monitor.max_recent_lag()
+    if lag is None:
+        # Sampler has not produced a value yet; measure one turn of the loop directly
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        await asyncio.sleep(0)
+        lag = loop.time() - start
+    lag_ms = round(lag * 1000, 2)
+    return {"ok": lag_ms <= max_lag_ms, "lag_ms": lag_ms, "max_lag_ms": max_lag_ms}
+
+
+@router.get("/health/live")
+async def liveness():
+    """Cheap liveness probe; the body is cached for a few seconds"""
+    now = time.time()
+    if _live_cache["expires"] <= now:
+        _live_cache["body"] = {"status": "ok", "uptime_seconds": int(now - STARTED_AT)}
+        _live_cache["expires"] = now + float(conf["live_cache_seconds"])
+    return _live_cache["body"]
+
+
+@router.get("/health/ready")
+async def readiness():
+    """Readiness probe: returns 503 when the instance should be drained from the load balancer"""
+    checks = {
+        "dashboard_db": await _check_dashboard_db(),
+        "sqlalchemy_pool": _check_sqlalchemy_pool(),
+        "dynamic_db_pools": _check_dynamic_db_pools(),
+        "event_loop": await _check_event_loop_lag(),
+    }
+    ready = all(check["ok"] for check in checks.values())
+    return JSONResponse(
+        status_code=200 if ready else 503,
+        content={"status": "ready" if ready else "unavailable", "checks": checks}
+    )
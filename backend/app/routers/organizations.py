@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, status, Request, Response
 from sqlalchemy.orm import Session
 from typing import List
 from app.models.users import Organization, User
@@ -7,6 +7,7 @@ from app.schemas.organization_schema import OrganizationCreate, OrganizationUpda
 from app.utils.jwt import get_current_user, get_db
 from datetime import datetime
 from app.utils.logger import LoggerSetup
+from app.utils.etag import table_etag, not_modified
 import os
 
 logger = LoggerSetup.setup_logger('organizations', os.path.join(os.getcwd(), 'logs'))
@@ -15,12 +16,14 @@ router = APIRouter(prefix="/organizations")
 
 @router.get("/", response_model=List[OrganizationResponse])
 def get_all_organizations(
+    request: Request,
+    response: Response,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     """Get all organizations - Admin only"""
     try:
-        logger.info(f"User {current_user.id} requesting all organizations")
+        logger.debug(f"User {current_user.id} requesting all organizations")
         
         if current_user.role_id != 2:  # Admin role
             logger.warning(f"User {current_user.id} denied access to all organizations - not admin")
@@ -29,6 +32,11 @@ def get_all_organizations(
                 detail="Not enough permissions"
             )
         
+        etag = table_etag(db, ("organizations", "users", "projects"))
+        cached = not_modified(request, response, etag)
+        if cached:
+            return cached
+        
         organizations = db.query(Organization).all()
         logger.info(f"Retrieved {len(organizations)} organizations for admin {current_user.id}")
         
@@ -67,7 +75,7 @@ def get_organization(
     """Get organization by ID with users"""
     
     try:
-        logger.info(f"User {current_user.id} requesting organization {org_id}")
+        logger.debug(f"User {current_user.id} requesting organization {org_id}")
         
         if current_user.role_id != 2 and current_user.organization_id != org_id:
             logger.warning(f"User {current_user.id} denied access to organization {org_id} - insufficient permissions")
@@ -119,7 +127,7 @@ def get_organization_projects(
     """Get all projects for a specific organization"""
 
     try:
-        logger.info(f"User {current_user.id} requesting projects for organization {org_id}")
+        logger.debug(f"User {current_user.id} requesting projects for organization {org_id}")
         
         if current_user.role_id != 2 and current_user.organization_id != org_id:
             logger.warning(f"User {current_user.id} denied access to projects for organization {org_id} - insufficient permissions")
@@ -342,7 +350,7 @@ def get_organization_users(
 ):
     """Get all users in an organization"""
     try:
-        logger.info(f"User {current_user.id} requesting users for organization {org_id}")
+        logger.debug(f"User {current_user.id} requesting users for organization {org_id}")
         
         if current_user.role_id != 2 and current_user.organization_id != org_id:
             logger.warning(f"User {current_user.id} denied access to users for organization {org_id} - insufficient permissions")
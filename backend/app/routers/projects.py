@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
 from sqlalchemy.orm import Session, joinedload
 from app.models.project import Project, ProjectTeam
 from app.models.users import User,Organization
@@ -8,6 +8,8 @@ from app.schemas.project_schema import ProjectCreate, ProjectRead, ProjectUpdate
 from typing import List, Optional
 from datetime import datetime
 from app.utils.logger import LoggerSetup
+from app.utils.responses import FastJSONResponse
+from app.utils.etag import table_etag, not_modified
 import os
 
 router = APIRouter(prefix="/projects", tags=["Projects"])
@@ -31,6 +33,8 @@ def is_admin(user: User):
 
 @router.get("/", response_model=List[dict])
 def get_all_projects(
+    request: Request,
+    response: Response,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
     status: Optional[str] = Query(None, description="Filter by status"),
@@ -38,12 +42,17 @@ def get_all_projects(
     sort_by: Optional[str] = Query("name", description="Sort by: name, date, status, priority")
 ):
     """Get all projects (admin only) with filtering and sorting"""
-    logger.info(f"User {current_user.id} ({current_user.username}) accessing all projects list")
+    logger.debug(f"User {current_user.id} ({current_user.username}) accessing all projects list")
     logger.debug(f"Filters applied - status: {status}, search: {search}, sort_by: {sort_by}")
     
     try:
         is_admin(current_user)
         
+        etag = table_etag(db, ("projects", "users", "organizations", "projectteam"), status, search, sort_by)
+        cached = not_modified(request, response, etag)
+        if cached:
+            return cached
+        
         # Base query with join to get owner and organization information
         logger.debug("Building base query with joins for projects, users, and organizations")
         query = db.query(Project).join(User, Project.owner_id == User.id).outerjoin(Organization, Project.organization_id == Organization.id)
@@ -107,7 +116,7 @@ def get_all_projects(
             projects_response.sort(key=lambda x: x["status"])
         
         logger.info(f"Successfully returned {len(projects_response)} projects to user {current_user.id}")
-        return projects_response
+        return FastJSONResponse(projects_response, headers=dict(response.headers))
         
     except HTTPException as e:
         logger.error(f"HTTP Exception in get_all_projects: {e.detail}")
@@ -119,11 +128,11 @@ def get_all_projects(
 @router.get("/{project_id}", response_model=dict)
 def get_project(project_id: int, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
     """Get a specific project by ID"""
-    logger.info(f"User {current_user.id} ({current_user.username}) accessing project {project_id}")
+    logger.debug(f"User {current_user.id} ({current_user.username}) accessing project {project_id}")
     
     try:
         #is_admin(current_user)
-        logger.info(f"Admin check bypassed for user {current_user.id} on get_project")
+        logger.debug(f"Admin check bypassed for user {current_user.id} on get_project")
         
         logger.debug(f"Querying project {project_id} from database")
         project = db.query(Project).filter(Project.id == project_id).first()
@@ -179,7 +188,7 @@ def create_project(
     
     try:
         #is_admin(current_user)
-        logger.info(f"Admin check bypassed for user {current_user.id} on create_project")
+        logger.debug(f"Admin check bypassed for user {current_user.id} on create_project")
         
         # Verify owner exists (default to current user if not specified)
         owner_id = current_user.id
@@ -255,7 +264,7 @@ def update_project(
     
     try:
         #is_admin(current_user)
-        logger.info(f"Admin check bypassed for user {current_user.id} on update_project")
+        logger.debug(f"Admin check bypassed for user {current_user.id} on update_project")
         
         logger.debug(f"Querying project {project_id} for update")
         project = db.query(Project).filter(Project.id == project_id).first()
@@ -330,7 +339,7 @@ def delete_project(
     
     try:
         #is_admin(current_user)
-        logger.info(f"Admin check bypassed for user {current_user.id} on delete_project")
+        logger.debug(f"Admin check bypassed for user {current_user.id} on delete_project")
         
         logger.debug(f"Querying project {project_id} for deletion")
         project = db.query(Project).filter(Project.id == project_id).first()
@@ -375,7 +384,7 @@ def add_team_member(
     
     try:
         #is_admin(current_user)
-        logger.info(f"Admin check bypassed for user {current_user.id} on add_team_member")
+        logger.debug(f"Admin check bypassed for user {current_user.id} on add_team_member")
         
         logger.debug(f"Querying project {project_id} for team member addition")
         project = db.query(Project).filter(Project.id == project_id).first()
@@ -489,11 +498,11 @@ def get_project_team(
     current_user: User = Depends(get_current_user)
 ):
     """Get all team members for a project"""
-    logger.info(f"User {current_user.id} ({current_user.username}) accessing team for project {project_id}")
+    logger.debug(f"User {current_user.id} ({current_user.username}) accessing team for project {project_id}")
     
     try:
         #is_admin(current_user)
-        logger.info(f"Admin check bypassed for user {current_user.id} on get_project_team")
+        logger.debug(f"Admin check bypassed for user {current_user.id} on get_project_team")
         
         logger.debug(f"Querying project {project_id} for team listing")
         project = db.query(Project).filter(Project.id == project_id).first()
@@ -530,11 +539,11 @@ def get_available_users_for_project(
     current_user: User = Depends(get_current_user)
 ):
     """Get all users from the project's organization that can be added to the project"""
-    logger.info(f"User {current_user.id} ({current_user.username}) accessing available users for project {project_id}")
+    logger.debug(f"User {current_user.id} ({current_user.username}) accessing available users for project {project_id}")
     
     try:
         #is_admin(current_user)
-        logger.info(f"Admin check bypassed for user {current_user.id} on get_available_users_for_project")
+        logger.debug(f"Admin check bypassed for user {current_user.id} on get_available_users_for_project")
         
         logger.debug(f"Querying project {project_id} for available users")
         project = db.query(Project).filter(Project.id == project_id).first()
@@ -574,11 +583,11 @@ def get_available_users(
     current_user: User = Depends(get_current_user)
 ):
     """Get all users that can be added to projects (general endpoint)"""
-    logger.info(f"User {current_user.id} ({current_user.username}) accessing all available users")
+    logger.debug(f"User {current_user.id} ({current_user.username}) accessing all available users")
     
     try:
         #is_admin(current_user)
-        logger.info(f"Admin check bypassed for user {current_user.id} on get_available_users")
+        logger.debug(f"Admin check bypassed for user {current_user.id} on get_available_users")
         
         logger.debug("Loading all active users")
         users = db.query(User).filter(User.is_active == True).all()
@@ -605,11 +614,11 @@ def get_available_users(
 @router.get("/stats/summary")
 def get_project_stats(db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
     """Get project statistics summary"""
-    logger.info(f"User {current_user.id} ({current_user.username}) accessing project statistics")
+    logger.debug(f"User {current_user.id} ({current_user.username}) accessing project statistics")
     
     try:
         #is_admin(current_user)
-        logger.info(f"Admin check bypassed for user {current_user.id} on get_project_stats")
+        logger.debug(f"Admin check bypassed for user {current_user.id} on get_project_stats")
         
         logger.debug("Calculating project statistics")
         total_projects = db.query(Project).count()
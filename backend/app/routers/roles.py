@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, status, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
 from sqlalchemy.orm import Session, joinedload
 from typing import List, Optional
@@ -9,6 +9,7 @@ from app.utils.jwt import get_current_user
 from app.schemas.role_schema import PermissionRead,RoleCreate,RoleRead,RoleUpdate
 from datetime import datetime
 from app.utils.logger import LoggerSetup
+from app.utils.etag import table_etag, not_modified
 import os
 
 router = APIRouter(prefix="/admin/roles", tags=["Role Management"])
@@ -83,7 +84,7 @@ def get_all_permissions(
 ):
     """Get all available permissions"""
     try:
-        logger.info(f"User {current_user.username} requesting permissions list")
+        logger.debug(f"User {current_user.username} requesting permissions list")
         
         # Check admin privileges
         is_admin(current_user, db)
@@ -115,16 +116,23 @@ def get_all_permissions(
 
 @router.get("/", response_model=List[RoleRead])
 def get_all_roles(
+    request: Request,
+    response: Response,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """Get all roles with their permissions - Enhanced with system role handling"""
     try:
-        logger.info(f"User {current_user.username} requesting roles list")
+        logger.debug(f"User {current_user.username} requesting roles list")
         
         # Check admin privileges
         is_admin(current_user, db)
         
+        etag = table_etag(db, ("roles", "permissions", "role_permissions"))
+        cached = not_modified(request, response, etag)
+        if cached:
+            return cached
+        
         # Get all roles
         roles = db.query(Role).order_by(Role.name).all()
         logger.info(f"Found {len(roles)} roles in database")
@@ -1,10 +1,11 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
 from sqlalchemy.orm import Session, selectinload
 from app.models.users import User
 from app.database import SessionLocal
 from app.utils.jwt import get_current_user
 from app.schemas.user_schema import UserRead, UserUpdate
 from app.utils.logger import LoggerSetup
+from app.utils.etag import table_etag, not_modified
 import os
 
 router = APIRouter(
@@ -25,8 +26,29 @@ def get_db():
         db.close()
 
 # Get the current logged-in user's details
+def load_user_profile(db: Session, user_id: int):
+    """UserRead with role and organization names, or None if the user does not exist"""
+    user = db.query(User).options(
+        selectinload(User.role), 
+        selectinload(User.organization)
+    ).filter(User.id == user_id).first()
+    if not user:
+        return None
+    return UserRead(
+        id=user.id,
+        username=user.username,
+        email=user.email,
+        role_id=user.role_id,
+        organization_id=user.organization_id,
+        role_name=user.role.name if user.role else None,
+        organization_name=user.organization.name if user.organization else None
+    )
+
+
 @router.get("/me", response_model=UserRead)
 def get_my_profile(
+    request: Request,
+    response: Response,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
@@ -46,27 +68,18 @@ def get_my_profile(
     try:
         logger.info(f"User {current_user.id} requested their profile")
         
-        # Fetch user with relationships loaded
-        user = db.query(User).options(
-            selectinload(User.role), 
-            selectinload(User.organization)
-        ).filter(User.id == current_user.id).first()
+        etag = table_etag(db, ("users", "roles", "organizations"), current_user.id)
+        cached = not_modified(request, response, etag)
+        if cached:
+            return cached
         
-        if not user:
+        # Fetch user with role and organization names
+        user_data = load_user_profile(db, current_user.id)
+        
+        if not user_data:
             logger.warning(f"Profile not found for user {current_user.id}")
             raise HTTPException(status_code=404, detail="User not found")
         
-        # Create response with role and organization names
-        user_data = UserRead(
-            id=user.id,
-            username=user.username,
-            email=user.email,
-            role_id=user.role_id,
-            organization_id=user.organization_id,
-            role_name=user.role.name if user.role else None,
-            organization_name=user.organization.name if user.organization else None
-        )
-        
         logger.info(f"Successfully retrieved profile for user {current_user.id}")
         return user_data
     
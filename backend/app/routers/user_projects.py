@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
 from sqlalchemy.orm import Session
 from app.models.project import Project, ProjectTeam  
 from app.models.users import User,Role
@@ -6,6 +6,7 @@ from app.schemas.user_projects_schema import ProjectListItem,ProjectsResponse,Pr
 from app.database import SessionLocal
 from app.utils.jwt import get_current_user
 from app.utils.logger import LoggerSetup
+from app.utils.etag import table_etag, not_modified
 import os
 from datetime import datetime
 
@@ -27,12 +28,14 @@ def get_db():
 
 @router.get("/projects", response_model=ProjectsResponse)
 def get_user_organization_projects(
+    request: Request,
+    response: Response,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     """Get all projects belonging to the current user's organization"""
     try:
-        logger.info(f"User {current_user.id} requesting organization projects")
+        logger.debug(f"User {current_user.id} requesting organization projects")
         if not current_user.organization_id:
             logger.warning(f"User {current_user.id} not associated with any organization")
             raise HTTPException(
@@ -40,6 +43,12 @@ def get_user_organization_projects(
                 detail="User is not associated with any organization"
             )
         
+        # Status is derived from project age, so the tag also changes daily
+        etag = table_etag(db, ("projects", "users"), current_user.organization_id, datetime.utcnow().date())
+        cached = not_modified(request, response, etag)
+        if cached:
+            return cached
+        
         # Query projects that belong to the same organization as the user
         projects = db.query(Project).filter(
             Project.organization_id == current_user.organization_id
@@ -86,7 +95,7 @@ def get_user_project_detail(
 ):
     """Get detailed information about a specific project (only if it belongs to user's organization)"""
     try:
-        logger.info(f"User {current_user.id} requesting details of project {project_id}")
+        logger.debug(f"User {current_user.id} requesting details of project {project_id}")
         # Check if user has an organization
         if not current_user.organization_id:
             logger.warning(f"User {current_user.id} not associated with any organization")
@@ -148,7 +157,7 @@ def get_user_organization_project_stats(
 ):
     """Get project statistics for the user's organization"""
     try:
-        logger.info(f"User {current_user.id} requesting organization project stats")
+        logger.debug(f"User {current_user.id} requesting organization project stats")
         # Check if user has an organization
         if not current_user.organization_id:
             raise HTTPException(
@@ -195,7 +204,7 @@ def get_user_assigned_projects(
 ):
     """Get all projects where the current user is a team member"""
     try:
-        logger.info(f"User {current_user.id} requesting assigned projects")
+        logger.debug(f"User {current_user.id} requesting assigned projects")
         # Check if user has an organization
         if not current_user.organization_id:
             logger.warning(f"User {current_user.id} not associated with any organization")
@@ -256,7 +265,7 @@ def get_user_assigned_project_detail(
 ):
     """Get detailed information about a specific assigned project"""
     try:
-        logger.info(f"User {current_user.id} requesting details for assigned project {project_id}")
+        logger.debug(f"User {current_user.id} requesting details for assigned project {project_id}")
         # Check if user has an organization
         if not current_user.organization_id:
             logger.warning(f"User {current_user.id} not associated with any organization")
@@ -387,7 +396,7 @@ def get_user_team_project_stats(
 
 # Add this to your user_projects.py file
 
-from app.utils.permissions import get_user_permissions, user_has_permission
+from app.utils.permissions import get_permissions_payload, user_has_permission
 
 @router.get("/permissions", response_model=dict)
 def get_user_permissions_endpoint(
@@ -396,23 +405,8 @@ def get_user_permissions_endpoint(
 ):
     """Get all permissions for the current user"""
     try:
-        logger.info(f"User {current_user.id} requesting permissions")
-        # Get user permissions using the utility function
-        permissions = get_user_permissions(current_user, db)
-        
-        # Also get role information for additional context
-        role = db.query(Role).filter(Role.id == current_user.role_id).first() if current_user.role_id else None
-        
-        return {
-            "permissions": permissions,
-            "role": {
-                "id": role.id if role else None,
-                "name": role.name if role else None,
-                "is_system": role.is_system if role else False
-            } if role else None,
-            "user_id": current_user.id,
-            "organization_id": current_user.organization_id
-        }
+        logger.debug(f"User {current_user.id} requesting permissions")
+        return get_permissions_payload(current_user, db)
     except Exception as e:
         logger.error(f"Error retrieving permissions for user {current_user.id}: {str(e)}")
         raise
@@ -1,6 +1,6 @@
 
 from pydantic import BaseModel, Field
-from typing import Optional, List, Dict, Any, Union
+from typing import Optional, List, Dict, Any, Union, Literal
 
 class DatabaseCredentials(BaseModel):
     host: str
@@ -28,6 +28,8 @@ class DatabaseConfig(BaseModel):
     user: str
     password: str
     database: Optional[str] = None
+    # Overrides the project's statement timeout for this request, capped by max_statement_timeout_ms
+    statement_timeout_ms: Optional[int] = Field(None, gt=0)
 
 class Column(BaseModel):
     name: str
@@ -43,6 +45,8 @@ class CreateTableRequest(DatabaseConfig):
     database: str
     tablename: str
     columns: List[Column]
+    # Add managed _changed_txid/_updated_at columns and a delete log so /dbfetch can return changes since a token
+    track_changes: bool = False
 
 class InsertDataRequest(DatabaseConfig):
     database: str
@@ -60,6 +64,17 @@ class FetchDataRequest(DatabaseConfig):
     order_by: Optional[OrderBy] = None
     limit: Optional[int] = None
     offset: int = 0
+    # Change token from a previous fetch ("0" for everything); returns only rows changed since then
+    # plus tombstones for deleted rows. Requires a table created with track_changes.
+    since: Optional[str] = None
+    # Add the planner's estimate of the total matching rows (no full scan) for pagination
+    include_total: bool = False
+
+class ExportDataRequest(FetchDataRequest):
+    format: Literal["csv", "tsv", "binary"] = "csv"
+    header: bool = True
+    # Send the file gzip-compressed (application/gzip, .gz filename)
+    gzip: bool = False
 
 class UpdateDataRequest(DatabaseConfig):
     database: str
@@ -72,6 +87,31 @@ class DeleteDataRequest(DatabaseConfig):
     tablename: str
     where: Dict[str, Any]
 
+class BatchOperation(BaseModel):
+    op: Literal["insert", "update", "delete", "fetch"]
+    tablename: str
+    data: Optional[Union[Dict[str, Any], List[Dict[str, Any]]]] = None
+    where: Optional[Dict[str, Any]] = None
+    order_by: Optional[OrderBy] = None
+    limit: Optional[int] = None
+    offset: int = 0
+
+class BatchRequest(DatabaseConfig):
+    database: str
+    operations: List[BatchOperation] = Field(..., min_length=1)
+
+class UpsertDataRequest(DatabaseConfig):
+    database: str
+    tablename: str
+    rows: List[Dict[str, Any]] = Field(..., min_length=1)
+    # Columns of a primary key or unique constraint used as the conflict target
+    key_columns: List[str] = Field(..., min_length=1)
+    # Columns overwritten on conflict; defaults to every non-key column, [] means insert-only
+    update_columns: Optional[List[str]] = None
+    # "insert" sends chunked INSERT ... ON CONFLICT, "copy" stages rows with COPY first,
+    # "auto" picks copy for large row counts
+    method: Literal["auto", "insert", "copy"] = "auto"
+
 class ListTablesRequest(DatabaseConfig):
     database: str
 
@@ -81,4 +121,91 @@ class TableSchemaRequest(DatabaseConfig):
 
 class DropTableRequest(DatabaseConfig):
     database: str
-    tablename: str
\ No newline at end of file
+    tablename: str
+
+class TableStatsRequest(DatabaseConfig):
+    database: str
+    tablename: str
+    # Also run count(*), giving up after exact_count_timeout_ms
+    exact_count: bool = False
+    exact_count_timeout_ms: Optional[int] = Field(None, gt=0)
+
+class TableProfileRequest(DatabaseConfig):
+    database: str
+    tablename: str
+    # Only report these columns; None means every column
+    columns: Optional[List[str]] = None
+    # Skip the cached profile and rebuild it
+    refresh: bool = False
+
+class DistinctValuesRequest(DatabaseConfig):
+    database: str
+    tablename: str
+    column: str
+    # Only values starting with this text
+    prefix: Optional[str] = None
+    case_sensitive: bool = False
+    # Defaults to distinct_default_limit, capped at distinct_max_limit
+    limit: Optional[int] = Field(None, gt=0)
+
+class CreateIndexRequest(DatabaseConfig):
+    database: str
+    tablename: str
+    columns: List[str] = Field(..., min_length=1)
+    # Defaults to <table>_<columns>_idx
+    name: Optional[str] = None
+    method: Literal["btree", "hash", "gin", "gist", "brin"] = "btree"
+    # Index the text of the columns as trigrams (pg_trgm) for LIKE/ILIKE and similarity searches;
+    # uses GIN unless method is gist
+    trigram: bool = False
+    unique: bool = False
+
+class DropIndexRequest(DatabaseConfig):
+    database: str
+    tablename: str
+    name: str
+
+class ListIndexesRequest(DatabaseConfig):
+    database: str
+    tablename: str
+
+class IndexAdvisorRequest(DatabaseConfig):
+    database: str
+    # Only suggest indexes for this table; None means every table fetched through /dbfetch
+    tablename: Optional[str] = None
+
+class SearchIndexRequest(DatabaseConfig):
+    database: str
+    tablename: str
+    # Text columns to index, weighted A, B, C, D in this order (later ones share D)
+    columns: List[str] = Field(..., min_length=1)
+    # Text search configuration, e.g. english or simple; defaults to [search] default_language
+    language: Optional[str] = None
+
+class DisableSearchRequest(DatabaseConfig):
+    database: str
+    tablename: str
+
+class SearchRequest(DatabaseConfig):
+    database: str
+    tablename: str
+    query: str = Field(..., min_length=1)
+    # Columns matched by the ILIKE/trigram fallback; defaults to every text column
+    columns: Optional[List[str]] = None
+    limit: Optional[int] = Field(None, gt=0)
+    offset: int = Field(0, ge=0)
+
+class ChangeFeedTableRequest(DatabaseConfig):
+    database: str
+    tablename: str
+
+class ChangeFeedSubscribeRequest(DatabaseConfig):
+    database: str
+    # Only report changes to these tables; None means every table with a change feed
+    tables: Optional[List[str]] = None
+
+class ProjectDatabaseSettings(BaseModel):
+    statement_timeout_ms: Optional[int] = Field(None, gt=0)
+    max_rows: Optional[int] = Field(None, gt=0)
+    # None keeps the stored opt-in
+    prewarm: Optional[bool] = None
@@ -0,0 +1,175 @@
+import time
+import asyncio
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from app.utils.config_reader import config
+from app.utils.metrics import registry, database_label
+
+conf = config["admission"]
+
+QUEUE_WAIT_BUCKETS = (0.001, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+admission_queue_wait_seconds = registry.histogram(
+    "admission_queue_wait_seconds", "Time Dynamic_db requests waited for an admission slot", ("database",),
+    buckets=QUEUE_WAIT_BUCKETS)
+admission_rejections_total = registry.counter(
+    "admission_rejections_total", "Dynamic_db requests rejected by the admission controller", ("database", "reason"))
+
+
+class AdmissionRejected(Exception):
+    def __init__(self, reason: str, message: str):
+        super().__init__(message)
+        self.reason = reason
+        self.message = message
+
+
+class _DatabaseSlots:
+    """Admission state for one target database"""
+
+    def __init__(self):
+        self.active = 0
+        self.active_by_user = {}
+        # user -> deque of waiting futures; iteration order gives round-robin fairness
+        self.waiters = OrderedDict()
+        self.queued = 0
+
+    def can_run(self, user: str, max_active: int, max_per_user: int) -> bool:
+        return self.active < max_active and self.active_by_user.get(user, 0) < max_per_user
+
+    def grant(self, user: str):
+        self.active += 1
+        self.active_by_user[user] = self.active_by_user.get(user, 0) + 1
+
+    def release(self, user: str):
+        self.active -= 1
+        remaining = self.active_by_user.get(user, 1) - 1
+        if remaining:
+            self.active_by_user[user] = remaining
+        else:
+            self.active_by_user.pop(user, None)
+
+
+class AdmissionController:
+    """Limits concurrent work per target database and per user, with a bounded fair wait queue.
+
+    Requests beyond the concurrency limits wait in a per-database queue that is
+    served round-robin across users, so one user with many queued requests cannot
+    starve others. When the queue (or the user's share of it) is full, or the wait
+    exceeds queue_timeout, the request is rejected immediately instead of piling up.
+    """
+
+    def __init__(self, max_active: int, max_per_user: int, max_queue: int, max_queue_per_user: int,
+                 queue_timeout: float):
+        self.max_active = max_active
+        self.max_per_user = max_per_user
+        self.max_queue = max_queue
+        self.max_queue_per_user = max_queue_per_user
+        self.queue_timeout = queue_timeout
+        self._databases = {}
+
+    def _reject(self, database: str, reason: str, message: str):
+        admission_rejections_total.inc(database=database, reason=reason)
+        raise AdmissionRejected(reason, message)
+
+    def _dispatch(self, slots: _DatabaseSlots):
+        """Hand free slots to waiting users in round-robin order"""
+        progressed = True
+        while progressed and slots.active < self.max_active:
+            progressed = False
+            for user in list(slots.waiters):
+                queue = slots.waiters[user]
+                if not slots.can_run(user, self.max_active, self.max_per_user):
+                    continue
+                future = queue.popleft()
+                slots.queued -= 1
+                if not queue:
+                    del slots.waiters[user]
+                else:
+                    slots.waiters.move_to_end(user)
+                slots.grant(user)
+                future.set_result(None)
+                progressed = True
+                break
+
+    async def acquire(self, database: str, user: str):
+        slots = self._databases.setdefault(database, _DatabaseSlots())
+        if not slots.waiters and slots.can_run(user, self.max_active, self.max_per_user):
+            slots.grant(user)
+            admission_queue_wait_seconds.observe(0.0, database=database)
+            return
+
+        if slots.queued >= self.max_queue:
+            self._reject(database, "queue_full", "Too many requests queued for this database")
+        if len(slots.waiters.get(user, ())) >= self.max_queue_per_user:
+            self._reject(database, "user_queue_full", "Too many of your requests are queued for this database")
+
+        future = asyncio.get_running_loop().create_future()
+        slots.waiters.setdefault(user, deque()).append(future)
+        slots.queued += 1
+        # Other users' waiters may be blocked only by their own per-user limit
+        self._dispatch(slots)
+        start = time.perf_counter()
+        try:
+            await asyncio.wait_for(asyncio.shield(future), timeout=self.queue_timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            if future.done() and not future.cancelled():
+                if isinstance(e, asyncio.TimeoutError):
+                    # Granted at the same moment the wait timed out; keep the slot
+                    return
+                self.release(database, user)
+            else:
+                future.cancel()
+                queue = slots.waiters.get(user)
+                if queue is not None and future in queue:
+                    queue.remove(future)
+                    slots.queued -= 1
+                    if not queue:
+                        del slots.waiters[user]
+            if isinstance(e, asyncio.TimeoutError):
+                self._reject(database, "queue_timeout", "Timed out waiting for a free database slot")
+            raise
+        finally:
+            admission_queue_wait_seconds.observe(time.perf_counter() - start, database=database)
+
+    def release(self, database: str, user: str):
+        slots = self._databases[database]
+        slots.release(user)
+        self._dispatch(slots)
+        if not slots.active and not slots.waiters:
+            del self._databases[database]
+
+    @asynccontextmanager
+    async def admit(self, database: str, user: str):
+        await self.acquire(database, user)
+        try:
+            yield
+        finally:
+            self.release(database, user)
+
+    def snapshot(self) -> dict:
+        return {
+            database: {"active": slots.active, "queued": slots.queued, "users": len(slots.active_by_user)}
+            for database, slots in list(self._databases.items())
+        }
+
+
+admission_controller = AdmissionController(
+    max_active=int(conf["max_active_per_db"]),
+    max_per_user=int(conf["max_active_per_user"]),
+    max_queue=int(conf["max_queue_per_db"]),
+    max_queue_per_user=int(conf["max_queue_per_user"]),
+    queue_timeout=float(conf["queue_timeout"]),
+)
+
+
+def _admission_collector():
+    snapshot = admission_controller.snapshot()
+    return [
+        ("admission_active", "gauge", "Dynamic_db requests holding an admission slot",
+         [({"database": database_label(database)}, state["active"]) for database, state in snapshot.items()]),
+        ("admission_queued", "gauge", "Dynamic_db requests waiting for an admission slot",
+         [({"database": database_label(database)}, state["queued"]) for database, state in snapshot.items()]),
+    ]
+
+
+registry.register_collector(_admission_collector)
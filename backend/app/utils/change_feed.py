@@ -0,0 +1,181 @@
+import json
+import asyncio
+from collections import OrderedDict
+from typing import Optional
+import asyncpg
+from app.utils.config_reader import config
+from app.utils.logger import LoggerSetup
+from app.utils.metrics import registry, database_label
+
+conf = config["change_feed"]
+logger = LoggerSetup.setup_logger("change_feed", config["logging"]["log_dir"])
+
+CHANNEL = conf["channel"]
+MAX_KEYS = int(conf["max_keys"])
+
+change_notifications_total = registry.counter(
+    "change_feed_notifications_total", "Change notifications received from Postgres LISTEN connections")
+change_events_sent_total = registry.counter(
+    "change_feed_events_sent_total", "Coalesced change events handed to SSE subscribers")
+
+
+def merge_change(pending: OrderedDict, change: dict):
+    """Fold one notification into a subscriber's pending events, one entry per table.
+
+    Keys are unioned up to MAX_KEYS; past that (or when the trigger sent no keys)
+    the entry's keys become None, meaning "refetch the table".
+    """
+    entry = pending.get(change["table"])
+    if entry is None:
+        entry = pending[change["table"]] = {"table": change["table"], "ops": {}, "count": 0, "keys": {}}
+    op = change.get("op", "unknown")
+    entry["ops"][op] = entry["ops"].get(op, 0) + change.get("count", 1)
+    entry["count"] += change.get("count", 1)
+    keys = change.get("keys")
+    if entry["keys"] is None or keys is None:
+        entry["keys"] = None
+        return
+    for key in keys:
+        entry["keys"][json.dumps(key, sort_keys=True, default=str)] = key
+    if len(entry["keys"]) > MAX_KEYS:
+        entry["keys"] = None
+
+
+class Subscription:
+    """One SSE client's view of a database listener, with bounded, coalesced pending events"""
+
+    def __init__(self, database: str, tables: Optional[set]):
+        self.database = database
+        self.tables = tables
+        self.pending = OrderedDict()
+        self.closed_reason = None
+        self._ready = asyncio.Event()
+
+    def push(self, change: dict):
+        if self.tables is not None and change["table"] not in self.tables:
+            return
+        merge_change(self.pending, change)
+        self._ready.set()
+
+    def close(self, reason: str):
+        self.closed_reason = reason
+        self._ready.set()
+
+    async def next_batch(self, coalesce_window: float) -> list:
+        """Wait for changes, then keep collecting for coalesce_window so bursts go out as one event per table"""
+        await self._ready.wait()
+        if self.closed_reason is None and coalesce_window:
+            await asyncio.sleep(coalesce_window)
+        self._ready.clear()
+        batch = []
+        for entry in self.pending.values():
+            keys = entry["keys"]
+            batch.append(dict(entry, keys=list(keys.values()) if keys is not None else None))
+        self.pending.clear()
+        return batch
+
+
+class _DatabaseListener:
+    """A dedicated LISTEN connection to one database, shared by all its subscribers"""
+
+    def __init__(self, hub, database: str):
+        self.hub = hub
+        self.database = database
+        self.conn = None
+        self.subscribers = set()
+
+    async def start(self, connect_kwargs: dict):
+        self.conn = await asyncpg.connect(**connect_kwargs)
+        try:
+            self.conn.add_termination_listener(self._on_terminated)
+            await self.conn.add_listener(CHANNEL, self._on_notification)
+        except BaseException:
+            self.conn.terminate()
+            raise
+        logger.info(f"Listening for table changes on {self.database}")
+
+    def _on_notification(self, conn, pid, channel, payload):
+        change_notifications_total.inc()
+        try:
+            change = json.loads(payload)
+        except ValueError:
+            logger.warning(f"Ignoring malformed change notification on {self.database}")
+            return
+        for subscription in list(self.subscribers):
+            subscription.push(change)
+
+    def _on_terminated(self, conn):
+        logger.warning(f"Change feed connection to {self.database} was lost")
+        self.hub._drop(self, "listener connection lost")
+
+    async def close(self):
+        if self.conn is not None and not self.conn.is_closed():
+            try:
+                await self.conn.close(timeout=5)
+            except Exception as e:
+                logger.warning(f"Error closing change feed connection to {self.database}: {str(e)}")
+
+
+class ChangeFeedHub:
+    """Fans Postgres change notifications out to SSE subscribers, one listener connection per database"""
+
+    def __init__(self):
+        self._listeners = {}
+        # One lock per database, so connecting to a slow database does not hold up the others
+        self._locks = {}
+
+    def _lock(self, database: str) -> asyncio.Lock:
+        lock = self._locks.get(database)
+        if lock is None:
+            lock = self._locks[database] = asyncio.Lock()
+        return lock
+
+    async def subscribe(self, database: str, connect_kwargs: dict, tables: Optional[set]) -> Subscription:
+        async with self._lock(database):
+            listener = self._listeners.get(database)
+            if listener is None:
+                listener = _DatabaseListener(self, database)
+                await listener.start(connect_kwargs)
+                self._listeners[database] = listener
+            subscription = Subscription(database, tables)
+            listener.subscribers.add(subscription)
+            return subscription
+
+    async def unsubscribe(self, subscription: Subscription):
+        async with self._lock(subscription.database):
+            listener = self._listeners.get(subscription.database)
+            if listener is None:
+                return
+            listener.subscribers.discard(subscription)
+            if not listener.subscribers:
+                del self._listeners[subscription.database]
+                await listener.close()
+
+    def _drop(self, listener: _DatabaseListener, reason: str):
+        if self._listeners.get(listener.database) is listener:
+            del self._listeners[listener.database]
+        for subscription in listener.subscribers:
+            subscription.close(reason)
+
+    async def close_all(self):
+        for listener in list(self._listeners.values()):
+            self._drop(listener, "server shutting down")
+            await listener.close()
+
+    def snapshot(self) -> dict:
+        return {database: len(listener.subscribers) for database, listener in list(self._listeners.items())}
+
+
+change_feed_hub = ChangeFeedHub()
+
+
+def _change_feed_collector():
+    snapshot = change_feed_hub.snapshot()
+    return [
+        ("change_feed_listeners", "gauge", "Open LISTEN connections for change feeds", [({}, len(snapshot))]),
+        ("change_feed_subscribers", "gauge", "SSE change feed subscribers per database",
+         [({"database": database_label(database)}, count) for database, count in snapshot.items()]),
+    ]
+
+
+registry.register_collector(_change_feed_collector)
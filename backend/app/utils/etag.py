@@ -0,0 +1,57 @@
+import hashlib
+from typing import Iterable, Optional
+from fastapi import Request, Response
+from sqlalchemy import event, select, text
+from sqlalchemy.orm import Session
+from app.models.table_version import TableVersion
+
+# Clients must revalidate every time, but may reuse the body when the ETag still matches
+CACHE_CONTROL = "private, no-cache"
+
+_BUMP_VERSION = text(
+    "INSERT INTO table_versions (table_name, version) VALUES (:table_name, 1) "
+    "ON CONFLICT (table_name) DO UPDATE SET version = table_versions.version + 1"
+)
+
+
+def _bump(session: Session, table_names: Iterable[str]):
+    for table_name in sorted(set(table_names) - {TableVersion.__tablename__}):
+        session.connection().execute(_BUMP_VERSION, {"table_name": table_name})
+
+
+@event.listens_for(Session, "after_flush")
+def _after_flush(session, flush_context):
+    """Bump the version of every table written by this flush"""
+    changed = [obj for obj in session.new] + [obj for obj in session.deleted]
+    changed += [obj for obj in session.dirty if session.is_modified(obj, include_collections=False)]
+    _bump(session, (obj.__table__.name for obj in changed if hasattr(obj, "__table__")))
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _do_orm_execute(orm_execute_state):
+    """Bulk query.update() / query.delete() bypass the flush, so bump their table here"""
+    if orm_execute_state.is_update or orm_execute_state.is_delete:
+        table = getattr(orm_execute_state.statement, "table", None)
+        if table is not None:
+            _bump(orm_execute_state.session, [table.name])
+
+
+def table_etag(db: Session, tables: Iterable[str], *parts) -> str:
+    """Weak ETag from the current versions of tables plus request-specific parts (user, filters)"""
+    tables = sorted(tables)
+    versions = dict(db.execute(
+        select(TableVersion.table_name, TableVersion.version).where(TableVersion.table_name.in_(tables))
+    ).all())
+    key = "|".join([f"{table}={versions.get(table, 0)}" for table in tables] + [str(part) for part in parts])
+    return 'W/"' + hashlib.sha1(key.encode()).hexdigest()[:20] + '"'
+
+
+def not_modified(request: Request, response: Response, etag: str) -> Optional[Response]:
+    """Return a 304 response when If-None-Match matches etag; otherwise tag the response"""
+    if_none_match = request.headers.get("if-none-match", "")
+    tags = {tag.strip() for tag in if_none_match.split(",")}
+    if etag in tags or etag[2:] in tags or "*" in tags:
+        return Response(status_code=304, headers={"ETag": etag, "Cache-Control": CACHE_CONTROL})
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = CACHE_CONTROL
+    return None
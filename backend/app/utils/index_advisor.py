@@ -0,0 +1,138 @@
+import hashlib
+import threading
+from collections import Counter
+from datetime import datetime
+from typing import Optional
+from app.utils.config_reader import config
+from app.utils.query_log import SLOW_QUERY_SECONDS
+
+conf = config["index_advisor"]
+
+MAX_SHAPES = int(conf["max_shapes"])
+MAX_INDEX_NAME_BYTES = 63
+
+
+class FetchShapeStats:
+    """Aggregates /dbfetch calls by table, equality-filter columns and sort column.
+
+    Only column names are kept, never values, so one entry covers every call
+    with the same filter and sort; this is what the index advisor works from.
+    """
+
+    def __init__(self, max_shapes: int):
+        self.max_shapes = max_shapes
+        self._shapes = {}
+        self._lock = threading.Lock()
+
+    def add(self, database: str, tablename: str, where: Optional[dict], order_by, duration: float):
+        where_columns = tuple(sorted(where)) if where else ()
+        order_column = order_by.column if order_by else None
+        if not where_columns and order_column is None:
+            return
+        key = (database, tablename, where_columns, order_column)
+        with self._lock:
+            entry = self._shapes.get(key)
+            if entry is None:
+                if len(self._shapes) >= self.max_shapes:
+                    # Drop the shape with the lowest total time to make room
+                    victim = min(self._shapes, key=lambda shape: self._shapes[shape]["total_ms"])
+                    del self._shapes[victim]
+                entry = self._shapes[key] = {
+                    "database": database, "tablename": tablename, "where_columns": list(where_columns),
+                    "order_by": order_column, "count": 0, "slow_count": 0, "total_ms": 0.0, "max_ms": 0.0,
+                    "last_seen": None,
+                }
+            duration_ms = duration * 1000
+            entry["count"] += 1
+            entry["slow_count"] += duration >= SLOW_QUERY_SECONDS
+            entry["total_ms"] = round(entry["total_ms"] + duration_ms, 2)
+            entry["max_ms"] = round(max(entry["max_ms"], duration_ms), 2)
+            entry["last_seen"] = datetime.now().isoformat(timespec="seconds")
+
+    def shapes(self, database: str, tablename: Optional[str] = None) -> list:
+        with self._lock:
+            return [
+                dict(entry, where_columns=list(entry["where_columns"]))
+                for entry in self._shapes.values()
+                if entry["database"] == database and (tablename is None or entry["tablename"] == tablename)
+            ]
+
+
+fetch_shape_stats = FetchShapeStats(MAX_SHAPES)
+
+
+def serves(index_columns: list, where_columns: set, order_column: Optional[str]) -> bool:
+    """Whether a btree on index_columns answers the equality filter and then returns rows in sort order"""
+    leading = len(where_columns)
+    if set(index_columns[:leading]) != where_columns:
+        return False
+    if order_column is None or order_column in where_columns:
+        return True
+    return len(index_columns) > leading and index_columns[leading] == order_column
+
+
+def suggest_indexes(shapes: list, existing: list, min_count: int) -> list:
+    """Btree indexes that would serve the frequent or slow fetch shapes of one table.
+
+    Each index leads with the shape's equality columns, most widely filtered first so
+    the prefix is shared by other shapes, followed by its sort column. Shapes already
+    served by an existing index, or by a longer suggested one, are folded away.
+    """
+    weight = Counter()
+    for shape in shapes:
+        for column in shape["where_columns"]:
+            weight[column] += shape["count"]
+
+    candidates = {}
+    for shape in shapes:
+        if shape["count"] < min_count and not shape["slow_count"]:
+            continue
+        where_columns, order_column = set(shape["where_columns"]), shape["order_by"]
+        if any(serves(columns, where_columns, order_column) for columns in existing):
+            continue
+        columns = sorted(where_columns, key=lambda column: (-weight[column], column))
+        if order_column is not None and order_column not in where_columns:
+            columns.append(order_column)
+        candidate = candidates.setdefault(tuple(columns), {"columns": columns, "shapes": []})
+        candidate["shapes"].append(shape)
+
+    # A shape whose own candidate is a prefix of a longer one is served by the longer index too
+    for key in sorted(candidates, key=len):
+        for shape in candidates[key]["shapes"]:
+            where_columns, order_column = set(shape["where_columns"]), shape["order_by"]
+            wider = next((other for other in candidates
+                          if len(other) > len(key) and serves(list(other), where_columns, order_column)), None)
+            if wider is not None:
+                candidates[wider]["shapes"].append(shape)
+                candidates[key]["shapes"] = [s for s in candidates[key]["shapes"] if s is not shape]
+    suggestions = []
+    for candidate in candidates.values():
+        served = candidate["shapes"]
+        if not served:
+            continue
+        suggestions.append({
+            "columns": candidate["columns"],
+            "count": sum(shape["count"] for shape in served),
+            "slow_count": sum(shape["slow_count"] for shape in served),
+            "total_ms": round(sum(shape["total_ms"] for shape in served), 2),
+            "shapes": [
+                {key: shape[key] for key in ("where_columns", "order_by", "count", "slow_count", "total_ms", "max_ms")}
+                for shape in served
+            ],
+        })
+    return sorted(suggestions, key=lambda suggestion: suggestion["total_ms"], reverse=True)
+
+
+def index_name(tablename: str, columns: list, suffix: str = "idx") -> str:
+    """Postgres-style index name within the 63-byte identifier limit.
+
+    Longer names are cut and end with a short hash of the full name, so indexes
+    whose names differ only past the limit do not collide.
+    """
+    name = f"{tablename}_{'_'.join(columns)}_{suffix}"
+    encoded = name.encode("utf-8")
+    if len(encoded) <= MAX_INDEX_NAME_BYTES:
+        return name
+    digest = hashlib.md5(encoded).hexdigest()[:8]
+    prefix = encoded[:MAX_INDEX_NAME_BYTES - len(digest) - 1].decode("utf-8", "ignore")
+    return f"{prefix}_{digest}"
@@ -7,6 +7,7 @@ from app.models import users
 from app.database import SessionLocal
 import logging
 from app.utils.config_reader import config
+from app.utils.request_context import set_current_user_id
 
 # Set up logging
 logger = logging.getLogger(__name__)
@@ -30,7 +31,7 @@ def decode_token(token: str):
             token = token[7:]
         
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        logger.info(f"Token decoded successfully for user: {payload.get('sub')}")
+        logger.debug(f"Token decoded successfully for user: {payload.get('sub')}")
         return payload
     except jwt.ExpiredSignatureError:
         logger.warning("Token has expired")
@@ -61,7 +62,7 @@ def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(
     )
     
     try:
-        logger.info(f"Validating token (first 20 chars): {token[:20]}...")
+        logger.debug(f"Validating token (first 20 chars): {token[:20]}...")
         
         # Decode token
         payload = decode_token(token)
@@ -75,7 +76,7 @@ def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(
             logger.warning("No username found in token payload")
             raise credentials_exception
 
-        logger.info(f"Looking up user: {username}")
+        logger.debug(f"Looking up user: {username}")
         
         # Query user from database
         user = db.query(users.User).filter(users.User.username == username).first()
@@ -86,7 +87,8 @@ def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(
                 detail="User not found"
             )
         
-        logger.info(f"User {user.username} authenticated successfully")
+        logger.debug(f"User {user.username} authenticated successfully")
+        set_current_user_id(user.id)
         return user
         
     except HTTPException:
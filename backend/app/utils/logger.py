@@ -1,49 +1,164 @@
-
 import os
+import gzip
+import json
+import time
+import shutil
+import asyncio
 import logging
-from datetime import datetime, timedelta
+import logging.handlers
+from datetime import datetime
 from app.utils.config_reader import config
+from app.utils.request_context import get_request_context
 
 # Get logging settings from ini
 conf = config["logging"]
 
+# Attributes every LogRecord has; anything else was passed through `extra=`
+_RESERVED_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {
+    "message", "asctime", "request_id", "route", "user_id"
+}
+
+
+class RequestContextFilter(logging.Filter):
+    """Attach request id, route and user id of the current request to every record"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        ctx = get_request_context()
+        record.request_id = ctx.request_id if ctx else None
+        record.route = (ctx.route or ctx.path) if ctx else None
+        record.user_id = ctx.user_id if ctx else None
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """Format records as one JSON object per line"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "module": record.module,
+            "func": record.funcName,
+            "line": record.lineno,
+            "message": record.getMessage(),
+            "request_id": getattr(record, "request_id", None),
+            "route": getattr(record, "route", None),
+            "user_id": getattr(record, "user_id", None),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RESERVED_ATTRS and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class SizeAndTimeRotatingFileHandler(logging.handlers.TimedRotatingFileHandler):
+    """Rotate at the configured interval or once the file grows past max_bytes, gzipping rotated files"""
+
+    def __init__(self, filename: str, when: str = 'midnight', max_bytes: int = 0, compress: bool = True):
+        super().__init__(filename, when=when, backupCount=0, encoding='utf-8', delay=True)
+        self.max_bytes = max_bytes
+        if compress:
+            self.namer = lambda name: name + '.gz'
+            self.rotator = self._gzip_rotator
+
+    def shouldRollover(self, record: logging.LogRecord) -> bool:
+        if super().shouldRollover(record):
+            return True
+        if self.max_bytes > 0:
+            if self.stream is None:
+                self.stream = self._open()
+            if self.stream.tell() >= self.max_bytes:
+                return True
+        return False
+
+    def rotation_filename(self, default_name: str) -> str:
+        # Size based rollovers can happen several times per interval; never overwrite an earlier one
+        name = super().rotation_filename(default_name)
+        candidate, index = name, 1
+        while os.path.exists(candidate):
+            candidate = super().rotation_filename(f"{default_name}.{index}")
+            index += 1
+        return candidate
+
+    @staticmethod
+    def _gzip_rotator(source: str, dest: str):
+        with open(source, 'rb') as f_in, gzip.open(dest, 'wb') as f_out:
+            shutil.copyfileobj(f_in, f_out)
+        os.remove(source)
+
+
 class LoggerSetup:
     @staticmethod
     def setup_logger(name: str, log_dir: str) -> logging.Logger:
         os.makedirs(log_dir, exist_ok=True)
 
-        LoggerSetup._delete_old_logs(log_dir, int(conf['retention']))
-
         logger = logging.getLogger(name)
-        logger.setLevel(logging.DEBUG)
+        logger.setLevel(conf.get('level', 'INFO').upper())
+        if logger.handlers:
+            return logger
 
-        log_file = os.path.join(log_dir, datetime.now().strftime(f'{name}_%d%m%Y.log'))
+        log_file = os.path.join(log_dir, f'{name}.log')
 
-        file_handler = logging.FileHandler(log_file)
-        formatter = logging.Formatter(
-            '[%(levelname)s] :: %(asctime)s  :: %(module)s  :: %(funcName)s '
-            ':: %(lineno)d  :: %(message)s',
-            datefmt='%Y-%m-%d %H:%M:%S'
+        file_handler = SizeAndTimeRotatingFileHandler(
+            log_file,
+            when=conf.get('rotate_when', 'midnight'),
+            max_bytes=int(conf.get('max_bytes', 0)),
+            compress=conf.get('compress', 'true').lower() == 'true'
         )
-        file_handler.setFormatter(formatter)
+        file_handler.setFormatter(LoggerSetup._get_formatter())
+        file_handler.addFilter(RequestContextFilter())
         logger.addHandler(file_handler)
 
         return logger
 
     @staticmethod
-    def _delete_old_logs(log_dir: str, retention_days: int):
-        current_time = datetime.now()
-        retention_period = timedelta(days=retention_days)
+    def _get_formatter() -> logging.Formatter:
+        if conf.get('format', 'text').lower() == 'json':
+            return JsonFormatter()
+        return logging.Formatter(
+            '[%(levelname)s] :: %(asctime)s  :: %(request_id)s :: %(module)s  :: %(funcName)s '
+            ':: %(lineno)d  :: %(message)s',
+            datefmt='%Y-%m-%d %H:%M:%S'
+        )
+
+    @staticmethod
+    async def retention_loop(log_dir: str):
+        """Periodically delete log files older than the configured retention.
 
-        for filename in os.listdir(log_dir):
-            file_path = os.path.join(log_dir, filename)
-            if os.path.isfile(file_path):
-                file_creation_time = datetime.fromtimestamp(os.path.getmtime(file_path))
-                if current_time - file_creation_time > retention_period:
-                    try:
-                        os.remove(file_path)
-                        print(f"Deleted old log file: {file_path}")
-                    except OSError as e:
-                        print(f"Error deleting file {file_path}: {e}")
+        The first sweep runs one interval after startup so that importing the
+        routers never touches the log directory.
+        """
+        interval = int(conf.get('retention_interval', 3600))
+        retention_days = int(conf['retention'])
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await asyncio.to_thread(LoggerSetup._delete_old_logs, log_dir, retention_days)
+            except Exception as e:
+                logging.getLogger('access').error(f"Log retention sweep failed: {e}")
 
+    @staticmethod
+    def _delete_old_logs(log_dir: str, retention_days: int):
+        cutoff = time.time() - retention_days * 86400
+        # Never remove a file that a handler is still writing to
+        active_files = {
+            handler.baseFilename
+            for logger in logging.Logger.manager.loggerDict.values()
+            if isinstance(logger, logging.Logger)
+            for handler in logger.handlers
+            if isinstance(handler, logging.FileHandler)
+        }
 
+        with os.scandir(log_dir) as entries:
+            for entry in entries:
+                if not entry.is_file() or os.path.abspath(entry.path) in active_files:
+                    continue
+                if entry.stat().st_mtime >= cutoff:
+                    continue
+                try:
+                    os.remove(entry.path)
+                except OSError as e:
+                    print(f"Error deleting file {entry.path}: {e}")
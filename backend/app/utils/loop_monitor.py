@@ -0,0 +1,102 @@
+import sys
+import time
+import asyncio
+import threading
+import traceback
+from collections import deque
+from datetime import datetime
+from app.utils.config_reader import config
+from app.utils.metrics import registry
+
+conf = config["event_loop"]
+
+LAG_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+event_loop_lag_seconds = registry.histogram(
+    "event_loop_lag_seconds", "Delay between a scheduled wake-up of the loop sampler and when it ran", buckets=LAG_BUCKETS)
+event_loop_slow_callbacks_total = registry.counter(
+    "event_loop_slow_callbacks_total", "Times the event loop was blocked longer than the slow-callback threshold")
+
+
+class LoopMonitor:
+    """Samples event-loop lag and captures the stack of callbacks that block the loop.
+
+    A coroutine on the loop wakes up every `interval` seconds and records how late
+    it ran. A watchdog thread watches the coroutine's heartbeat; when the loop stops
+    turning for longer than the slow-callback threshold it snapshots the loop
+    thread's stack, which points at the blocking call.
+    """
+
+    def __init__(self, interval: float, slow_threshold: float, history: int):
+        self.interval = interval
+        self.slow_threshold = slow_threshold
+        self.lag_samples = deque(maxlen=history)
+        self.slow_callbacks = deque(maxlen=history)
+        self._heartbeat = time.monotonic()
+        self._loop_thread_id = None
+        self._stop = threading.Event()
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        self._loop_thread_id = threading.get_ident()
+        self._stop.clear()
+        watchdog = threading.Thread(target=self._watch, name="loop-monitor-watchdog", daemon=True)
+        watchdog.start()
+        try:
+            while True:
+                start = loop.time()
+                self._heartbeat = time.monotonic()
+                await asyncio.sleep(self.interval)
+                lag = max(0.0, loop.time() - start - self.interval)
+                self.lag_samples.append(lag)
+                event_loop_lag_seconds.observe(lag)
+                if lag >= self.slow_threshold and self.slow_callbacks:
+                    last = self.slow_callbacks[-1]
+                    if last.get("_heartbeat") == self._heartbeat:
+                        last["blocked_ms"] = round(lag * 1000, 2)
+        finally:
+            self._stop.set()
+
+    def _watch(self):
+        reported = None
+        while not self._stop.wait(self.slow_threshold / 2):
+            heartbeat = self._heartbeat
+            blocked = time.monotonic() - heartbeat - self.interval
+            if blocked < self.slow_threshold or reported == heartbeat:
+                continue
+            reported = heartbeat
+            frame = sys._current_frames().get(self._loop_thread_id)
+            self.slow_callbacks.append({
+                "detected_at": datetime.now().isoformat(timespec="milliseconds"),
+                "blocked_ms": round(blocked * 1000, 2),
+                "stack": traceback.format_stack(frame) if frame is not None else [],
+                "_heartbeat": heartbeat,
+            })
+            event_loop_slow_callbacks_total.inc()
+
+    def max_recent_lag(self):
+        """Largest lag in the sample window, or None before the first sample"""
+        samples = list(self.lag_samples)
+        return max(samples) if samples else None
+
+    def snapshot(self) -> dict:
+        samples = list(self.lag_samples)
+        return {
+            "interval_ms": self.interval * 1000,
+            "slow_callback_threshold_ms": self.slow_threshold * 1000,
+            "samples": len(samples),
+            "last_lag_ms": round(samples[-1] * 1000, 2) if samples else None,
+            "max_lag_ms": round(max(samples) * 1000, 2) if samples else None,
+            "avg_lag_ms": round(sum(samples) / len(samples) * 1000, 2) if samples else None,
+            "slow_callbacks": [
+                {key: value for key, value in record.items() if not key.startswith("_")}
+                for record in list(self.slow_callbacks)
+            ],
+        }
+
+
+loop_monitor = LoopMonitor(
+    interval=float(conf["interval_ms"]) / 1000,
+    slow_threshold=float(conf["slow_callback_ms"]) / 1000,
+    history=int(conf["history"]),
+)
@@ -0,0 +1,257 @@
+import time
+import zlib
+import asyncio
+from starlette.datastructures import Headers, MutableHeaders
+from app.utils.logger import LoggerSetup
+from app.utils.config_reader import config
+from app.utils.request_context import RequestContext, request_context_var, new_request_id
+from app.utils.metrics import http_requests_total, http_request_duration_seconds, registry
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+conf = config["logging"]
+access_logger = LoggerSetup.setup_logger("access", conf["log_dir"])
+compression_conf = config["compression"]
+
+REQUEST_ID_HEADER = b"x-request-id"
+
+COMPRESSION_RATIO_BUCKETS = (1.0, 1.5, 2.0, 3.0, 4.0, 6.0, 8.0, 12.0, 16.0, 32.0)
+COMPRESSION_CPU_BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+
+http_response_compression_ratio = registry.histogram(
+    "http_response_compression_ratio", "Uncompressed over compressed size of compressed responses", ("encoding",),
+    buckets=COMPRESSION_RATIO_BUCKETS)
+http_response_compression_cpu_seconds = registry.histogram(
+    "http_response_compression_cpu_seconds", "CPU time spent compressing one response", ("encoding",),
+    buckets=COMPRESSION_CPU_BUCKETS)
+http_response_compression_bytes_total = registry.counter(
+    "http_response_compression_bytes_total", "Response bytes before and after compression", ("encoding", "stage"))
+http_responses_uncompressed_total = registry.counter(
+    "http_responses_uncompressed_total", "Compressible responses sent uncompressed", ("reason",))
+
+# Scopes of the requests being served; the route is only known once routing has run,
+# so in-flight counts are grouped by route at scrape time
+_in_flight = {}
+
+
+def _in_flight_collector():
+    counts = {}
+    for scope in list(_in_flight.values()):
+        route = scope.get("route")
+        key = (scope["method"], route.path if route is not None else "unmatched")
+        counts[key] = counts.get(key, 0) + 1
+    samples = [({"method": method, "route": route}, count) for (method, route), count in counts.items()]
+    return [("http_requests_in_flight", "gauge", "HTTP requests currently being served by method and route template",
+             samples)]
+
+
+registry.register_collector(_in_flight_collector)
+
+
+class RequestContextMiddleware:
+    """Assign a request id to every HTTP request, record its metrics and write one access-log line when it finishes"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_id = None
+        for header, value in scope.get("headers", []):
+            if header == REQUEST_ID_HEADER:
+                request_id = value.decode("latin-1")[:64]
+                break
+        ctx = RequestContext(request_id or new_request_id(), scope["method"], scope["path"])
+        token = request_context_var.set(ctx)
+
+        status_code = 500
+        start = time.perf_counter()
+        _in_flight[id(scope)] = scope
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                headers = list(message.get("headers", []))
+                headers.append((REQUEST_ID_HEADER, ctx.request_id.encode("latin-1")))
+                message["headers"] = headers
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start
+            _in_flight.pop(id(scope), None)
+            route = scope.get("route")
+            if route is not None:
+                ctx.route = route.path
+            # Label unmatched paths with a constant to keep metric cardinality bounded
+            route_label = ctx.route or "unmatched"
+            http_requests_total.inc(method=ctx.method, route=route_label, status=status_code)
+            http_request_duration_seconds.observe(elapsed, method=ctx.method, route=route_label)
+            duration_ms = round(elapsed * 1000, 2)
+            client = scope.get("client")
+            access_logger.info(
+                f"{ctx.method} {ctx.path} {status_code} {duration_ms}ms",
+                extra={
+                    "method": ctx.method,
+                    "path": ctx.path,
+                    "status": status_code,
+                    "duration_ms": duration_ms,
+                    "client": client[0] if client else None,
+                },
+            )
+            request_context_var.reset(token)
+
+
+class _Compressor:
+    """Incremental gzip or brotli encoder that tracks bytes and CPU time for one response"""
+
+    def __init__(self, encoding: str):
+        self.encoding = encoding
+        if encoding == "br":
+            self._encoder = brotli.Compressor(quality=int(compression_conf["brotli_quality"]))
+        else:
+            self._encoder = zlib.compressobj(int(compression_conf["gzip_level"]), zlib.DEFLATED, 31)
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.cpu_seconds = 0.0
+
+    def compress(self, data: bytes, final: bool = False) -> bytes:
+        # thread_time also measures correctly when this runs in a worker thread
+        start = time.thread_time()
+        if self.encoding == "br":
+            out = self._encoder.process(data) if data else b""
+            if final:
+                out += self._encoder.finish()
+        else:
+            out = self._encoder.compress(data)
+            if final:
+                out += self._encoder.flush()
+        self.cpu_seconds += time.thread_time() - start
+        self.bytes_in += len(data)
+        self.bytes_out += len(out)
+        return out
+
+    def record(self):
+        http_response_compression_cpu_seconds.observe(self.cpu_seconds, encoding=self.encoding)
+        http_response_compression_bytes_total.inc(self.bytes_in, encoding=self.encoding, stage="in")
+        http_response_compression_bytes_total.inc(self.bytes_out, encoding=self.encoding, stage="out")
+        if self.bytes_out:
+            http_response_compression_ratio.observe(self.bytes_in / self.bytes_out, encoding=self.encoding)
+
+
+def _accepted_encodings(accept_encoding: str) -> set:
+    """Encodings listed in Accept-Encoding with a non-zero q value"""
+    accepted = set()
+    for part in accept_encoding.lower().split(","):
+        name, _, params = part.strip().partition(";")
+        params = params.replace(" ", "")
+        if params.startswith("q="):
+            try:
+                if float(params[2:]) == 0:
+                    continue
+            except ValueError:
+                continue
+        if name:
+            accepted.add(name)
+    return accepted
+
+
+class CompressionMiddleware:
+    """Compress response bodies with brotli (when installed and accepted) or gzip.
+
+    Complete responses are compressed only above minimum_size; streaming responses
+    are compressed chunk by chunk as they are sent. Bodies that are already encoded
+    or not worth compressing (archives, binary, event streams) pass through.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self.minimum_size = int(compression_conf["minimum_size"])
+        self.thread_offload_bytes = int(compression_conf["thread_offload_bytes"])
+        self.excluded_types = tuple(
+            media_type.strip() for media_type in compression_conf["excluded_types"].split(",") if media_type.strip()
+        )
+
+    def _choose_encoding(self, scope):
+        accepted = _accepted_encodings(Headers(scope=scope).get("accept-encoding", ""))
+        if brotli is not None and "br" in accepted:
+            return "br"
+        if "gzip" in accepted:
+            return "gzip"
+        return None
+
+    async def _compress(self, compressor: _Compressor, data: bytes, final: bool) -> bytes:
+        # Large bodies are compressed off the event loop so other requests keep being served
+        if len(data) >= self.thread_offload_bytes:
+            return await asyncio.to_thread(compressor.compress, data, final)
+        return compressor.compress(data, final)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = self._choose_encoding(scope)
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message = None
+        compressor = None
+        passthrough = False
+
+        async def send_wrapper(message):
+            nonlocal start_message, compressor, passthrough
+            if message["type"] == "http.response.start":
+                message["headers"] = list(message.get("headers", []))
+                headers = Headers(raw=message["headers"])
+                media_type = headers.get("content-type", "")
+                if "content-encoding" in headers or media_type.startswith(self.excluded_types):
+                    passthrough = True
+                    await send(message)
+                else:
+                    # Hold the start until the first body chunk tells whether to compress
+                    MutableHeaders(raw=message["headers"]).add_vary_header("Accept-Encoding")
+                    start_message = message
+                return
+            if message["type"] != "http.response.body" or passthrough:
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            if compressor is None:
+                if not more_body and len(body) < self.minimum_size:
+                    http_responses_uncompressed_total.inc(reason="below_minimum_size")
+                    passthrough = True
+                    await send(start_message)
+                    await send(message)
+                    return
+                compressor = _Compressor(encoding)
+                headers = MutableHeaders(raw=start_message["headers"])
+                headers["Content-Encoding"] = encoding
+                if more_body:
+                    del headers["Content-Length"]
+                    await send(start_message)
+                else:
+                    data = await self._compress(compressor, body, True)
+                    headers["Content-Length"] = str(len(data))
+                    compressor.record()
+                    await send(start_message)
+                    await send({"type": "http.response.body", "body": data})
+                    return
+
+            data = await self._compress(compressor, body, not more_body)
+            if not more_body:
+                compressor.record()
+            if data or not more_body:
+                await send({"type": "http.response.body", "body": data, "more_body": more_body})
+
+        await self.app(scope, receive, send_wrapper)
@@ -41,3 +41,17 @@ def get_user_permissions(user: User, db: Session) -> list:
     ).filter(RolePermission.role_id == user.role_id).all()
     
     return [perm.name for perm in permissions]
+
+def get_permissions_payload(user: User, db: Session) -> dict:
+    """Permissions of a user with their role, as returned by GET /user/permissions"""
+    role = db.query(Role).filter(Role.id == user.role_id).first() if user.role_id else None
+    return {
+        "permissions": get_user_permissions(user, db),
+        "role": {
+            "id": role.id if role else None,
+            "name": role.name if role else None,
+            "is_system": role.is_system if role else False
+        } if role else None,
+        "user_id": user.id,
+        "organization_id": user.organization_id
+    }
@@ -0,0 +1,162 @@
+import re
+import json
+import time
+import random
+import asyncio
+import threading
+from datetime import datetime
+from sqlalchemy import event
+from app.utils.config_reader import config
+from app.utils.logger import LoggerSetup
+from app.utils.metrics import registry
+from app.utils.request_context import get_request_context
+
+conf = config["query_log"]
+logger = LoggerSetup.setup_logger("slow_query", config["logging"]["log_dir"])
+
+SLOW_QUERY_SECONDS = float(conf["slow_query_ms"]) / 1000
+EXPLAIN_SAMPLE_RATE = float(conf["explain_sample_rate"])
+MAX_SHAPES = int(conf["max_shapes"])
+MAX_CONCURRENT_EXPLAINS = int(conf["max_concurrent_explains"])
+
+db_query_duration_seconds = registry.histogram(
+    "db_query_duration_seconds", "Database statement latency by driver", ("source",))
+db_slow_queries_total = registry.counter(
+    "db_slow_queries_total", "Statements slower than the slow-query threshold", ("source",))
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r"(?<![\w$\".])\d+(?:\.\d+)?\b")
+_IN_LIST = re.compile(r"\bIN\s*\((?:\s*(?:\?|\$\d+|%\(\w+\)s)\s*,?)+\)", re.IGNORECASE)
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_sql(sql: str) -> str:
+    """Reduce a statement to its shape: literals become ?, IN lists collapse, whitespace is folded"""
+    shape = _STRING_LITERAL.sub("?", sql)
+    shape = _NUMBER_LITERAL.sub("?", shape)
+    shape = _IN_LIST.sub("IN (...)", shape)
+    return _WHITESPACE.sub(" ", shape).strip()
+
+
+def param_shape(params):
+    """Type names of the bound parameters, never their values"""
+    if params is None:
+        return []
+    if isinstance(params, dict):
+        return {key: type(value).__name__ for key, value in params.items()}
+    if isinstance(params, (list, tuple)):
+        return [type(value).__name__ for value in params]
+    return [type(params).__name__]
+
+
+class SlowQueryStats:
+    """Aggregates slow statements by normalized shape"""
+
+    def __init__(self, max_shapes: int):
+        self.max_shapes = max_shapes
+        self._shapes = {}
+        self._lock = threading.Lock()
+
+    def add(self, shape: str, source: str, duration: float, route, params):
+        with self._lock:
+            entry = self._shapes.get(shape)
+            if entry is None:
+                if len(self._shapes) >= self.max_shapes:
+                    # Drop the shape with the lowest total time to make room
+                    victim = min(self._shapes, key=lambda key: self._shapes[key]["total_ms"])
+                    del self._shapes[victim]
+                entry = self._shapes[shape] = {
+                    "statement": shape, "source": source, "count": 0, "total_ms": 0.0,
+                    "max_ms": 0.0, "params": params, "routes": [], "last_seen": None, "plan": None,
+                }
+            duration_ms = duration * 1000
+            entry["count"] += 1
+            entry["total_ms"] = round(entry["total_ms"] + duration_ms, 2)
+            entry["max_ms"] = round(max(entry["max_ms"], duration_ms), 2)
+            entry["last_seen"] = datetime.now().isoformat(timespec="seconds")
+            if route and route not in entry["routes"]:
+                entry["routes"].append(route)
+
+    def set_plan(self, shape: str, plan):
+        with self._lock:
+            entry = self._shapes.get(shape)
+            if entry is not None:
+                entry["plan"] = plan
+
+    def top(self, limit: int, order_by: str = "max_ms") -> list:
+        with self._lock:
+            entries = [dict(entry, routes=list(entry["routes"])) for entry in self._shapes.values()]
+        for entry in entries:
+            entry["avg_ms"] = round(entry["total_ms"] / entry["count"], 2)
+        return sorted(entries, key=lambda entry: entry[order_by], reverse=True)[:limit]
+
+
+slow_query_stats = SlowQueryStats(MAX_SHAPES)
+
+
+def record_query(sql: str, params, duration: float, source: str) -> bool:
+    """Record a finished statement; returns True when it was over the slow-query threshold"""
+    db_query_duration_seconds.observe(duration, source=source)
+    if duration < SLOW_QUERY_SECONDS:
+        return False
+
+    shape = normalize_sql(sql)
+    ctx = get_request_context()
+    route = (ctx.route or ctx.path) if ctx else None
+    shapes = param_shape(params)
+    db_slow_queries_total.inc(source=source)
+    slow_query_stats.add(shape, source, duration, route, shapes)
+    logger.warning(
+        f"Slow query ({source}) {round(duration * 1000, 2)}ms: {shape}",
+        extra={"source": source, "statement": shape, "param_types": shapes, "duration_ms": round(duration * 1000, 2)},
+    )
+    return True
+
+
+def should_explain() -> bool:
+    return EXPLAIN_SAMPLE_RATE > 0 and random.random() < EXPLAIN_SAMPLE_RATE
+
+
+async def capture_explain(pool, sql: str, params):
+    """Capture the planner's plan for a slow statement and attach it to its shape.
+
+    Plain EXPLAIN only plans the statement; ANALYZE would run the slowest queries a
+    second time, outside admission control, exactly when the database is loaded.
+    """
+    try:
+        async with pool.acquire() as conn:
+            plan = await conn.fetchval(f"EXPLAIN (FORMAT JSON) {sql}", *(params or ()))
+        slow_query_stats.set_plan(normalize_sql(sql), json.loads(plan) if isinstance(plan, str) else plan)
+    except Exception as e:
+        logger.error(f"EXPLAIN capture failed: {str(e)}")
+
+
+# Strong references so pending EXPLAIN tasks are not garbage collected mid-flight
+_explain_tasks = set()
+
+
+def schedule_explain(pool, sql: str, params):
+    if len(_explain_tasks) >= MAX_CONCURRENT_EXPLAINS:
+        return
+    task = asyncio.get_running_loop().create_task(capture_explain(pool, sql, params))
+    _explain_tasks.add(task)
+    task.add_done_callback(_explain_tasks.discard)
+
+
+def instrument_engine(engine):
+    """Time every statement executed through a SQLAlchemy engine"""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        start = conn.info["query_start_time"].pop()
+        record_query(statement, parameters, time.perf_counter() - start, "sqlalchemy")
+
+    @event.listens_for(engine, "handle_error")
+    def _handle_error(exception_context):
+        conn = exception_context.connection
+        if conn is not None and conn.info.get("query_start_time"):
+            conn.info["query_start_time"].pop()
@@ -0,0 +1,34 @@
+import contextvars
+import uuid
+
+
+class RequestContext:
+    """Per-request values shared between the middleware, dependencies and log records"""
+
+    def __init__(self, request_id: str, method: str, path: str):
+        self.request_id = request_id
+        self.method = method
+        self.path = path
+        self.route = None
+        self.user_id = None
+
+
+# Holds a mutable RequestContext so that values set inside sync dependencies
+# (which run in the threadpool on a copied context) are visible to the middleware.
+request_context_var = contextvars.ContextVar("request_context", default=None)
+
+
+def new_request_id() -> str:
+    return uuid.uuid4().hex
+
+
+def get_request_context():
+    """Return the RequestContext of the current request, or None outside a request"""
+    return request_context_var.get()
+
+
+def set_current_user_id(user_id):
+    """Record the authenticated user on the current request context"""
+    ctx = request_context_var.get()
+    if ctx is not None:
+        ctx.user_id = user_id
@@ -0,0 +1,63 @@
+import datetime
+import decimal
+import uuid
+from typing import Any, Awaitable, Callable
+import anyio
+import orjson
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, StreamingResponse
+
+# orjson only encodes integers in the signed 64-bit range
+INT64_MIN, INT64_MAX = -2 ** 63, 2 ** 63 - 1
+
+
+def _default(obj):
+    """Encode types orjson does not handle itself the same way jsonable_encoder would"""
+    if isinstance(obj, decimal.Decimal):
+        # Whole numbers too large for orjson go out as floats, like fractional ones (NaN and
+        # infinities become null)
+        if obj.is_finite() and obj.as_tuple().exponent >= 0 and obj.adjusted() < 19:
+            value = int(obj)
+            if INT64_MIN <= value <= INT64_MAX:
+                return value
+        return float(obj)
+    if isinstance(obj, uuid.UUID):
+        # asyncpg returns its own UUID subclass, which orjson does not recognise
+        return str(obj)
+    if isinstance(obj, datetime.timedelta):
+        return obj.total_seconds()
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    return jsonable_encoder(obj)
+
+
+class FastJSONResponse(JSONResponse):
+    """JSON response rendered with orjson.
+
+    Used as the application's default response class. Endpoints returning large
+    prebuilt dicts can return it directly to skip FastAPI's jsonable_encoder pass;
+    datetime, date, UUID and Decimal values from asyncpg are encoded natively.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, default=_default, option=orjson.OPT_NON_STR_KEYS)
+
+
+class ManagedStreamingResponse(StreamingResponse):
+    """StreamingResponse that runs an async cleanup callback however the response ends.
+
+    A body generator's finally does not run if iteration never starts, and its awaits
+    are cancelled along with the response when the client disconnects, so resources
+    held for the stream are released here, shielded from that cancellation.
+    """
+
+    def __init__(self, content, cleanup: Callable[[], Awaitable[None]], **kwargs):
+        super().__init__(content, **kwargs)
+        self.cleanup = cleanup
+
+    async def __call__(self, scope, receive, send):
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            with anyio.CancelScope(shield=True):
+                await self.cleanup()
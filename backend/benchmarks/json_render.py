@@ -0,0 +1,108 @@
+"""Compare JSON rendering with FastAPI's default path against FastJSONResponse.
+
+Run from the backend directory:
+
+    python -m benchmarks.json_render [--rows 20000] [--projects 5000] [--repeat 5]
+
+The default path is what an endpoint returning a dict goes through without a
+response class: jsonable_encoder, then JSONResponse.render. The fast path is
+FastJSONResponse.render on the same dict. Both outputs are decoded and compared
+so the timings are for identical payloads. Reported times are the best of
+--repeat runs. Decimal values the default path cannot compare against (too large
+for 64 bits, or not finite) are checked separately before timing.
+"""
+import argparse
+import datetime
+import decimal
+import json
+import time
+import uuid
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from app.utils.responses import FastJSONResponse
+
+
+def dbfetch_payload(rows: int) -> dict:
+    """A /dbfetch response: rows with Decimal, UUID, datetime and text columns"""
+    now = datetime.datetime(2024, 1, 1, 12, 0, 0)
+    records = [
+        {
+            "id": i,
+            "uuid": uuid.UUID(int=i),
+            "amount": decimal.Decimal(i) / 100,
+            "quantity": decimal.Decimal(i % 50),
+            "created_at": now + datetime.timedelta(seconds=i),
+            "day": (now + datetime.timedelta(days=i % 365)).date(),
+            "name": f"row {i}",
+            "active": i % 2 == 0,
+            "note": None,
+        }
+        for i in range(rows)
+    ]
+    return {"success": True, "message": "Data fetched successfully", "data": {"records": records, "count": rows}}
+
+
+def projects_payload(projects: int) -> list:
+    """A GET /projects/ response: projects with their team members embedded"""
+    now = datetime.datetime(2024, 1, 1, 12, 0, 0)
+    return [
+        {
+            "id": i,
+            "name": f"Project {i}",
+            "description": "x" * 80,
+            "organization_id": i % 20,
+            "created_at": now,
+            "updated_at": now,
+            "team": [{"user_id": i * 10 + j, "role": "member", "joined_at": now} for j in range(5)],
+        }
+        for i in range(projects)
+    ]
+
+
+def check_edge_decimals():
+    """NUMERIC values outside orjson's integer range or not finite must still render"""
+    cases = {
+        "int64_max": (decimal.Decimal(2 ** 63 - 1), 2 ** 63 - 1),
+        "int64_min": (decimal.Decimal(-2 ** 63), -2 ** 63),
+        "huge": (decimal.Decimal("123456789012345678901234567890"), 1.2345678901234568e+29),
+        "huge_exponent": (decimal.Decimal("1E+30"), 1e30),
+        "nan": (decimal.Decimal("NaN"), None),
+        "infinity": (decimal.Decimal("-Infinity"), None),
+    }
+    rendered = json.loads(FastJSONResponse({name: value for name, (value, _) in cases.items()}).body)
+    for name, (_, expected) in cases.items():
+        assert rendered[name] == expected, f"{name}: rendered {rendered[name]!r}, expected {expected!r}"
+    print(f"edge decimals: {len(cases)} cases render as expected")
+
+
+def best_of(repeat: int, render) -> tuple:
+    timings = []
+    body = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        body = render()
+        timings.append(time.perf_counter() - start)
+    return min(timings) * 1000, body
+
+
+def compare(name: str, payload, repeat: int):
+    default_ms, default_body = best_of(repeat, lambda: JSONResponse(jsonable_encoder(payload)).body)
+    fast_ms, fast_body = best_of(repeat, lambda: FastJSONResponse(payload).body)
+    same = json.loads(default_body) == json.loads(fast_body)
+    print(f"{name:<10} default {default_ms:9.1f} ms   orjson {fast_ms:9.1f} ms   "
+          f"speedup {default_ms / fast_ms:5.1f}x   {len(fast_body):>10} bytes   identical={same}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=20000)
+    parser.add_argument("--projects", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    check_edge_decimals()
+    compare("dbfetch", dbfetch_payload(args.rows), args.repeat)
+    compare("projects", projects_payload(args.projects), args.repeat)
+
+
+if __name__ == "__main__":
+    main()